@@ -0,0 +1,117 @@
+"""Yard distributed mode: one coordinator owning the queue, any number of workers.
+
+    python cluster.py coordinator --port 8765 --token SECRET
+    python cluster.py worker http://192.168.1.10:8765 --token SECRET --folder ~/Downloads/yard
+    python cluster.py submit http://192.168.1.10:8765 --token SECRET URL [URL ...]
+
+Several workers can run on one machine (e.g. for testing on localhost);
+each gets its own Downloader and yt-dlp sessions.
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+
+from core.constants import CLUSTER_QUEUE_FILE, DEFAULT_FOLDER, FAILED_JOBS_FILE
+from core.http_client import HttpClient
+
+
+def run_coordinator(args):
+    from core.distributed import Coordinator
+    from core.persistence import flush_all
+    from core.queue_manager import QueueManager
+    from core.retry import FailedJobs
+    from core.scheduler import JobScheduler
+
+    queue_mgr = QueueManager(args.queue_file)
+    scheduler = JobScheduler(args.policy)
+    scheduler.extend(queue_mgr.load())
+    failed_jobs = FailedJobs(FAILED_JOBS_FILE)
+
+    def on_result(job, result):
+        if result['success']:
+            print(f"✓ {result['title'] or job['url']}")
+        else:
+            print(f"✗ {job['url']}: {result['error']}")
+            failed_jobs.add({'url': job['url'], 'settings': dict(job.get('settings', {}))},
+                            result['error'], result.get('category'), job.get('expired', 0) + 1)
+
+    coordinator = Coordinator(scheduler, queue_mgr, token=args.token, lease_seconds=args.lease,
+                              on_result=on_result, log_callback=print)
+    port = coordinator.start(args.host, args.port)
+    print(f"Coordinator on {args.host}:{port} with {len(scheduler)} queued job(s)")
+    if not args.token:
+        print(f"Token: {coordinator.token}")
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    stopped.wait()
+    coordinator.stop()
+    flush_all()
+
+
+def run_worker(args):
+    from core.distributed import Worker
+
+    worker = Worker(args.coordinator, args.token, os.path.expanduser(args.folder),
+                    worker_id=args.name, cookies_file=args.cookies)
+    # First signal gives the current job back; the coordinator requeues it
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    worker.run()
+
+
+def run_submit(args):
+    settings = json.loads(args.settings) if args.settings else {}
+    client = HttpClient()
+    for url in args.urls:
+        body = json.dumps({'url': url, 'settings': settings, 'priority': args.priority})
+        resp = client.request('POST', args.coordinator.rstrip('/') + '/jobs', body=body.encode('utf-8'),
+                              headers={'Authorization': f"Bearer {args.token}",
+                                       'Content-Type': 'application/json'})
+        if resp.status != 201:
+            print(f"✗ {url}: HTTP {resp.status}", file=sys.stderr)
+            return 1
+        print(f"{resp.json()['id']} {url}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Yard coordinator/worker mode")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    coord = sub.add_parser('coordinator', help="Own the queue and hand jobs to workers")
+    coord.add_argument('--host', default='0.0.0.0', help="Interface to listen on")
+    coord.add_argument('--port', type=int, default=8765)
+    coord.add_argument('--token', help="Shared secret (generated and printed if omitted)")
+    coord.add_argument('--lease', type=float, default=60, help="Lease length in seconds")
+    coord.add_argument('--policy', default='fifo', help="fifo, sjf, round_robin or deadline")
+    coord.add_argument('--queue-file', default=CLUSTER_QUEUE_FILE)
+    coord.set_defaults(func=run_coordinator)
+
+    work = sub.add_parser('worker', help="Run jobs leased from a coordinator")
+    work.add_argument('coordinator', help="Coordinator URL, e.g. http://127.0.0.1:8765")
+    work.add_argument('--token', required=True)
+    work.add_argument('--folder', default=DEFAULT_FOLDER, help="Download folder on this machine")
+    work.add_argument('--cookies', help="cookies.txt on this machine")
+    work.add_argument('--name', help="Worker name (default: host-pid)")
+    work.set_defaults(func=run_worker)
+
+    submit = sub.add_parser('submit', help="Queue URLs on a coordinator")
+    submit.add_argument('coordinator')
+    submit.add_argument('urls', nargs='+')
+    submit.add_argument('--token', required=True)
+    submit.add_argument('--settings', help='Job settings as JSON, e.g. \'{"audio": true, "format": "MP3"}\'')
+    submit.add_argument('--priority', type=int, default=0)
+    submit.set_defaults(func=run_submit)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
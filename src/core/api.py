@@ -0,0 +1,362 @@
+"""Local HTTP API for submitting jobs and streaming progress."""
+
+import json
+import selectors
+import socket
+import threading
+import time
+
+from core.http_server import JsonRequestHandler, JsonServer, serve
+
+DEFAULT_PORT = 8766
+
+# Settings a submitted job may carry; anything else is ignored
+JOB_SETTINGS = ('audio', 'quality', 'format', 'playlist', 'compat', 'outputs', 'folder')
+
+# Progress ticks are coalesced to at most one per job per interval (seconds)
+PROGRESS_INTERVAL = 0.25
+
+# Comment sent to idle streams so proxies and clients keep them open
+KEEPALIVE_SECONDS = 15
+
+# Unsent bytes a subscriber may fall behind by before it's disconnected
+MAX_CLIENT_BUFFER = 1024 * 1024
+
+
+def clean_settings(settings):
+    """Keep only known job settings; ValueError if settings or outputs has the wrong type."""
+    if settings is None:
+        return {}
+    if not isinstance(settings, dict):
+        raise ValueError("'settings' must be an object")
+    settings = {k: v for k, v in settings.items() if k in JOB_SETTINGS}
+    outputs = settings.get('outputs')
+    if isinstance(outputs, str):
+        outputs = outputs.split(',')
+    if outputs is not None:
+        if not isinstance(outputs, list) or not all(isinstance(o, str) for o in outputs):
+            raise ValueError("'outputs' must be a list of strings")
+        settings['outputs'] = [o.strip().upper() for o in outputs if o.strip()]
+    return settings
+
+
+class EventStream:
+    """
+    Server-Sent Events fan-out to any number of subscribers from one thread.
+
+    publish() only appends to a list and never blocks, so hooks on the
+    download thread aren't slowed by subscribers. The stream thread
+    serializes each event once and writes it to every non-blocking client
+    socket; progress ticks are coalesced per job, and a client that falls
+    MAX_CLIENT_BUFFER bytes behind is dropped (it can reconnect and gets a
+    fresh state snapshot) rather than buffering without bound.
+    """
+
+    def __init__(self, snapshot=None, interval=PROGRESS_INTERVAL, max_buffer=MAX_CLIENT_BUFFER):
+        """
+        Args:
+            snapshot: Returns the state sent to each new subscriber as a 'state' event (optional)
+            interval: Seconds between coalesced progress flushes
+            max_buffer: Unsent bytes allowed per subscriber
+        """
+        self.snapshot = snapshot
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self._events = []
+        self._latest = {}  # (event, key) -> data, for coalesced events
+        self._new = []
+        self._clients = {}  # socket -> bytearray of unsent data
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        self._running = False
+
+    def __len__(self):
+        return len(self._clients)
+
+    def publish(self, event, data, coalesce_key=None):
+        """
+        Queue an event for every subscriber.
+
+        Events with a coalesce_key replace the previous unsent event with
+        the same name and key, and go out on the next interval tick, or
+        just before the next uncoalesced event so order is kept (a job's
+        last tick precedes its 'finished' event).
+        """
+        with self._lock:
+            if coalesce_key is None:
+                if self._latest:
+                    self._events.extend((name, pending) for (name, _), pending in self._latest.items())
+                    self._latest = {}
+                self._events.append((event, data))
+            else:
+                first = not self._latest
+                self._latest[(event, coalesce_key)] = data
+                if not first:
+                    return  # The stream thread is already waiting to flush
+        self._wake()
+
+    def attach(self, sock):
+        """Take over a connection whose SSE response headers were sent."""
+        sock.setblocking(False)
+        with self._lock:
+            self._new.append(sock)
+        self._wake()
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass  # Buffer full: a wakeup is already pending
+
+    def _frame(self, event, data):
+        self._seq += 1
+        payload = json.dumps(data, default=str, separators=(',', ':'))
+        return f"id: {self._seq}\nevent: {event}\ndata: {payload}\n\n".encode('utf-8')
+
+    def _drop(self, sock):
+        self._clients.pop(sock, None)
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _send(self, sock):
+        buf = self._clients.get(sock)
+        if buf is None:
+            return
+        try:
+            sent = sock.send(buf)
+            del buf[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            return self._drop(sock)
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if buf else 0)
+        self._selector.modify(sock, events)
+
+    def _run(self):
+        next_flush = time.monotonic()
+        last_sent = time.monotonic()
+        while self._running:
+            now = time.monotonic()
+            timeout = max(next_flush - now, 0) if self._latest else KEEPALIVE_SECONDS
+            for key, mask in self._selector.select(timeout):
+                sock = key.fileobj
+                if sock is self._wake_r:
+                    try:
+                        while sock.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                elif mask & selectors.EVENT_READ:
+                    # Subscribers don't send anything; readable means closed
+                    try:
+                        if not sock.recv(4096):
+                            self._drop(sock)
+                            continue
+                    except BlockingIOError:
+                        pass
+                    except OSError:
+                        self._drop(sock)
+                        continue
+                if mask & selectors.EVENT_WRITE and sock is not self._wake_r:
+                    self._send(sock)
+
+            now = time.monotonic()
+            with self._lock:
+                new, self._new = self._new, []
+                events, self._events = self._events, []
+                if self._latest and now >= next_flush:
+                    # Coalesced ticks published after everything in events
+                    events += [(event, data) for (event, _), data in self._latest.items()]
+                    self._latest = {}
+                    next_flush = now + self.interval
+
+            if new:
+                greeting = b'retry: 3000\n\n'
+                if self.snapshot:
+                    greeting += self._frame('state', self.snapshot())
+                for sock in new:
+                    self._clients[sock] = bytearray(greeting)
+                    self._selector.register(sock, selectors.EVENT_READ)
+                    self._send(sock)
+
+            if events:
+                data = b''.join(self._frame(event, payload) for event, payload in events)
+            elif self._clients and now - last_sent >= KEEPALIVE_SECONDS:
+                data = b': keepalive\n\n'
+            else:
+                continue
+            last_sent = now
+            for sock, buf in list(self._clients.items()):
+                if len(buf) + len(data) > self.max_buffer:
+                    self._drop(sock)  # Too slow; better than holding memory for it
+                    continue
+                had_pending = bool(buf)
+                buf += data
+                if not had_pending:
+                    self._send(sock)
+
+        for sock in list(self._clients):
+            self._drop(sock)
+
+
+class _ApiHandler(JsonRequestHandler):
+    """
+    Routes:
+        GET    /jobs                  running job, pause state and queue (with ETAs)
+        POST   /jobs                  {'url' | 'urls' | 'jobs', 'settings', 'priority'}
+        GET    /jobs/<id>             one job
+        DELETE /jobs/<id>             remove from the queue, or cancel if running
+        POST   /jobs/<id>/priority    {'priority': n} or {'delta': n}
+        POST   /queue/pause           finish the running job, then hold the queue
+        POST   /queue/resume
+        GET    /metrics               event counters and subscriber queue stats
+        GET    /events                Server-Sent Events stream
+    """
+
+    def route(self, method, parts, query, body):
+        api = self.server.api
+        control = api.control
+
+        if parts == ['events'] and method == 'GET':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'keep-alive')
+            self.end_headers()
+            self.wfile.flush()
+            self.close_connection = True
+            self.server.detach(self.connection)
+            api.stream.attach(self.connection)
+            return None
+
+        if parts == ['jobs']:
+            if method == 'GET':
+                return 200, control.jobs()
+            if method == 'POST':
+                try:
+                    items = self._submitted_items(body)
+                except ValueError as e:
+                    return 400, {'error': str(e)}
+                if not items:
+                    return 400, {'error': "'url', 'urls' or 'jobs' required"}
+                return 201, control.submit(items)
+
+        if len(parts) >= 2 and parts[0] == 'jobs':
+            job_id = parts[1]
+            if len(parts) == 2 and method == 'GET':
+                job = control.job(job_id)
+                return (200, job) if job else (404, {'error': 'no such job'})
+            if len(parts) == 2 and method == 'DELETE':
+                return (200, {}) if control.cancel(job_id) else (404, {'error': 'no such job'})
+            if parts[2:] == ['priority'] and method == 'POST':
+                try:
+                    if 'delta' in body:
+                        job = control.bump(job_id, int(body['delta']))
+                    else:
+                        job = control.set_priority(job_id, int(body['priority']))
+                except (KeyError, TypeError, ValueError):
+                    return 400, {'error': "'priority' or 'delta' must be an integer"}
+                return (200, job) if job else (404, {'error': 'no such queued job'})
+
+        if parts == ['metrics'] and method == 'GET':
+            return 200, control.metrics()
+        if parts == ['queue', 'pause'] and method == 'POST':
+            control.pause()
+            return 200, {'paused': True}
+        if parts == ['queue', 'resume'] and method == 'POST':
+            control.resume()
+            return 200, {'paused': False}
+
+        return 404, {'error': 'not found'}
+
+    @staticmethod
+    def _submitted_items(body):
+        """Jobs from a POST /jobs body; ValueError if a field has the wrong type."""
+        settings = clean_settings(body.get('settings'))
+        if 'jobs' in body:
+            jobs = body['jobs']
+            if not isinstance(jobs, list) or not all(isinstance(j, dict) for j in jobs):
+                raise ValueError("'jobs' must be a list of objects")
+        else:
+            urls = body.get('urls') or ([body['url']] if body.get('url') else [])
+            if not isinstance(urls, list):
+                raise ValueError("'urls' must be a list")
+            jobs = [{'url': u} for u in urls]
+            for job in jobs:
+                for key in ('priority', 'deadline'):
+                    if key in body:
+                        job[key] = body[key]
+
+        items = []
+        for job in jobs:
+            url = job.get('url', '')
+            if not isinstance(url, str):
+                raise ValueError("'url' must be a string")
+            item = {'url': url.strip(),
+                    'settings': dict(settings, **clean_settings(job.get('settings')))}
+            for key in ('priority', 'deadline'):
+                if isinstance(job.get(key), (int, float)):
+                    item[key] = job[key]
+            items.append(item)
+        return items
+
+
+class ApiServer:
+    """
+    Local job API on 127.0.0.1.
+
+    The control object provides the app side: jobs(), job(id), submit(items),
+    cancel(id), set_priority(id, n), bump(id, delta), pause(), resume() and
+    metrics().
+    """
+
+    def __init__(self, control, token, port=DEFAULT_PORT):
+        """
+        Args:
+            control: App adapter (see class docstring)
+            token: Secret clients must send
+            port: Loopback port to listen on
+        """
+        self.control = control
+        self.token = token
+        self.port = port
+        self.stream = EventStream(snapshot=control.jobs)
+        self._server = None
+
+    def start(self):
+        """Start serving; returns the port."""
+        self._server = JsonServer(('127.0.0.1', self.port), _ApiHandler, self.token)
+        self._server.api = self
+        self.stream.start()
+        self.port = serve(self._server)
+        return self.port
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.stream.stop()
+
+    def publish(self, event, data, coalesce_key=None):
+        """Send an event to every /events subscriber (non-blocking)."""
+        self.stream.publish(event, data, coalesce_key)
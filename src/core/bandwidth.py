@@ -0,0 +1,242 @@
+"""Throughput estimation and bandwidth-adaptive quality planning."""
+
+import math
+import threading
+import time
+
+# Height ladder the planner chooses from, best first
+LADDER = (2160, 1440, 1080, 720, 480, 360)
+
+# Typical video bitrates (bits/s) per height, for jobs whose formats aren't known yet
+TYPICAL_BITRATES = {2160: 20e6, 1440: 10e6, 1080: 5e6, 720: 2.5e6, 480: 1.2e6, 360: 0.7e6}
+AUDIO_BITRATE = 160e3
+
+# Assumed length of queued items nothing is known about yet
+DEFAULT_DURATION = 600
+
+# Without a finish-by time, the queue should download at least this fast
+# relative to playback (1.0 = no slower than realtime)
+REALTIME_FACTOR = 1.0
+
+
+class ThroughputModel:
+    """
+    Smoothed download throughput, fed by progress hooks.
+
+    Speed samples are averaged with a time-based exponential decay (time
+    constant tau seconds), so ticks arriving in bursts don't dominate and
+    the estimate follows a link that gets slower or faster within a minute.
+    """
+
+    def __init__(self, tau=30.0, initial=None):
+        self.tau = tau
+        self._rate = initial
+        self._last = None
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        """Estimated bytes per second, or None before the first sample."""
+        return self._rate
+
+    def observe(self, speed, now=None):
+        """Record an instantaneous speed in bytes/s."""
+        if not speed or speed <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._rate is None or self._last is None:
+                self._rate = float(speed)
+            else:
+                alpha = 1 - math.exp(-max(now - self._last, 0.0) / self.tau)
+                self._rate += alpha * (speed - self._rate)
+            self._last = now
+
+    def update(self, d):
+        """Record a yt-dlp progress dict (uses the combined speed of parallel streams)."""
+        if d.get('status') != 'downloading':
+            return
+        combined = d.get('combined') or {}
+        self.observe(combined.get('speed') or d.get('speed'))
+
+
+def _format_bytes(fmt, duration):
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return size
+    if fmt.get('tbr') and duration:
+        return fmt['tbr'] * 1000 / 8 * duration
+    return None
+
+
+def format_ladder(info):
+    """
+    Estimated download bytes per ladder height from a resolved info dict.
+
+    Mirrors the downloader's format string: the best video stream at or
+    below each height plus the best audio stream.
+
+    Returns:
+        dict: {height: bytes}, keyed by the height actually picked
+    """
+    formats = info.get('formats') or []
+    duration = info.get('duration')
+    audio = [_format_bytes(f, duration) for f in formats
+             if f.get('vcodec') == 'none' and f.get('acodec') != 'none']
+    audio_bytes = max([a for a in audio if a] or [AUDIO_BITRATE / 8 * (duration or 0)])
+
+    ladder = {}
+    for height in LADDER:
+        candidates = [f for f in formats if f.get('height') and f['height'] <= height
+                      and f.get('vcodec') != 'none']
+        if not candidates:
+            continue
+        top = max(f['height'] for f in candidates)
+        if top in ladder:
+            continue  # Same pick as the step above
+        sizes = [_format_bytes(f, duration) for f in candidates if f['height'] == top]
+        sizes = [s for s in sizes if s]
+        if sizes:
+            ladder[top] = max(sizes) + audio_bytes
+        elif duration:
+            ladder[top] = (TYPICAL_BITRATES[height] + AUDIO_BITRATE) / 8 * duration
+    return ladder
+
+
+def typical_ladder(duration):
+    """Ladder estimated from duration alone, for jobs without metadata."""
+    duration = duration or DEFAULT_DURATION
+    return {h: (TYPICAL_BITRATES[h] + AUDIO_BITRATE) / 8 * duration for h in LADDER}
+
+
+def quality_height(quality):
+    """Height cap for a quality setting, or None for Best/Auto."""
+    text = (quality or '').rstrip('p')
+    return int(text) if text.isdigit() else None
+
+
+def parse_finish_by(text, now=None):
+    """
+    Parse a "finish by" clock time such as "23:30".
+
+    Returns:
+        float or None: Epoch time of its next occurrence, None if empty or invalid
+    """
+    text = (text or '').strip()
+    parts = text.split(':')
+    if len(parts) != 2 or not all(p.isdigit() for p in parts):
+        return None
+    hour, minute = int(parts[0]), int(parts[1])
+    if hour > 23 or minute > 59:
+        return None
+    now = time.time() if now is None else now
+    local = time.localtime(now)
+    target = time.mktime((local.tm_year, local.tm_mon, local.tm_mday, hour, minute, 0, 0, 0, -1))
+    if target <= now:
+        target += 86400
+    return target
+
+
+def plan_heights(jobs, rate, budget):
+    """
+    Choose a height per job so everything downloads within budget.
+
+    Every adaptive job starts at its lowest height; the job currently at
+    the lowest height is upgraded one step at a time while the total still
+    fits, so quality is spread evenly rather than spent on the first job.
+
+    Args:
+        jobs: [{'ladder': {height: bytes}, 'fixed': bytes or None}]; fixed jobs
+            aren't adapted but use up budget
+        rate: Throughput in bytes/s
+        budget: Seconds available
+
+    Returns:
+        list: Chosen height per job (None for fixed jobs)
+    """
+    allowance = rate * budget - sum(j['fixed'] or 0 for j in jobs if j.get('fixed') is not None)
+    steps = [sorted(j['ladder']) if j.get('fixed') is None and j.get('ladder') else []
+             for j in jobs]
+    level = [0 if s else None for s in steps]
+    used = sum(jobs[i]['ladder'][s[0]] for i, s in enumerate(steps) if s)
+
+    while True:
+        upgradable = [i for i, s in enumerate(steps) if s and level[i] + 1 < len(s)]
+        upgradable.sort(key=lambda i: (steps[i][level[i]], i))
+        for i in upgradable:
+            ladder, current, nxt = jobs[i]['ladder'], steps[i][level[i]], steps[i][level[i] + 1]
+            extra = ladder[nxt] - ladder[current]
+            if used + extra <= allowance:
+                used += extra
+                level[i] += 1
+                break
+        else:
+            break
+    return [s[level[i]] if s else None for i, s in enumerate(steps)]
+
+
+class QualityPlanner:
+    """
+    Picks the video height for 'Auto' quality jobs from measured bandwidth.
+
+    The current job's real format sizes, the backlog's estimates and the
+    time left (until the finish-by time, or the backlog's playback length
+    otherwise) are planned together at every job start, so the plan follows
+    the throughput estimate as it changes.
+    """
+
+    def __init__(self, throughput):
+        """
+        Args:
+            throughput: ThroughputModel with the current estimate
+        """
+        self.throughput = throughput
+
+    def _queued_job(self, item):
+        settings = item.get('settings', {})
+        duration = item.get('duration')
+        if settings.get('audio'):
+            return {'fixed': AUDIO_BITRATE / 8 * (duration or DEFAULT_DURATION)}
+        if settings.get('quality') == 'Auto':
+            return {'ladder': typical_ladder(duration), 'fixed': None}
+        height = quality_height(settings.get('quality'))
+        if height is None and item.get('filesize'):
+            return {'fixed': item['filesize']}
+        ladder = typical_ladder(duration)
+        return {'fixed': ladder.get(height) or ladder[1080]}
+
+    def plan(self, info, backlog=(), finish_by=None, now=None):
+        """
+        Height for the job about to start.
+
+        Args:
+            info: Resolved info dict of that job
+            backlog: Queued items still waiting after it
+            finish_by: Epoch time the whole queue should be done by (optional)
+
+        Returns:
+            tuple: (height or None for best, human-readable reason)
+        """
+        ladder = format_ladder(info)
+        rate = self.throughput.rate
+        if not ladder:
+            return None, "no format sizes known"
+        if not rate:
+            return None, "no throughput measured yet"
+
+        jobs = [{'ladder': ladder, 'fixed': None}] + [self._queued_job(i) for i in backlog]
+        if finish_by:
+            budget = finish_by - (time.time() if now is None else now)
+            basis = "finish-by time"
+        else:
+            durations = [info.get('duration') or DEFAULT_DURATION] + [
+                i.get('duration') or DEFAULT_DURATION for i in backlog]
+            budget = sum(durations) / REALTIME_FACTOR
+            basis = "realtime"
+
+        heights = plan_heights(jobs, rate, max(budget, 0))
+        height = heights[0]
+        reason = f"{rate * 8 / 1e6:.1f} Mbit/s, {len(backlog)} queued, {basis}"
+        if height == max(ladder):
+            return None, reason
+        return height, reason
@@ -0,0 +1,195 @@
+"""Bulk URL import: parsing, duplicate detection and parallel validation."""
+
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+URL_RE = re.compile(r'https?://[^\s<>"\'`]+', re.IGNORECASE)
+
+# Query parameters ignored when comparing URLs. Only used to spot duplicates:
+# the URL as written is what gets queued, in case a site does read one.
+TRACKING_PARAMS = {'fbclid', 'gclid', 'igshid', 'si', 'feature', 'ref', 'ref_src', 'pp'}
+
+
+class _LinkParser(HTMLParser):
+    """Collects href targets from <a> tags (HTML pages and bookmark exports)."""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag.lower() == 'a':
+            for name, value in attrs:
+                if name.lower() == 'href' and value:
+                    self.links.append(value)
+
+
+def _json_urls(node):
+    """Walk a JSON bookmarks tree (e.g. Chromium 'Bookmarks') for url fields."""
+    if isinstance(node, dict):
+        url = node.get('url') or node.get('uri')
+        if isinstance(url, str):
+            yield url
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                yield from _json_urls(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _json_urls(value)
+
+
+def extract_urls(text):
+    """
+    Extract raw URLs from plain text, HTML/bookmark exports or JSON bookmarks.
+
+    Returns:
+        list: URLs in document order (not yet canonical or unique)
+    """
+    stripped = text.lstrip()
+    if stripped[:1] in ('{', '['):
+        try:
+            return list(_json_urls(json.loads(stripped)))
+        except ValueError:
+            pass
+
+    if re.search(r'<a\s', text, re.IGNORECASE):
+        parser = _LinkParser()
+        try:
+            parser.feed(text)
+            parser.close()
+        except Exception:
+            pass
+        if parser.links:
+            return parser.links
+
+    return [m.group(0).rstrip('.,;)]') for m in URL_RE.finditer(text)]
+
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so equivalent links compare equal (for duplicate detection).
+
+    Lowercases scheme and host, drops default ports, fragments and tracking
+    parameters, and rewrites youtu.be / mobile YouTube links to the watch form.
+
+    Returns:
+        str or None: Canonical URL, or None if it isn't an http(s) URL
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https') or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+
+    path = parts.path or '/'
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith('utm_')
+    ]
+
+    if host == 'youtu.be' and len(path) > 1:
+        query.insert(0, ('v', path.lstrip('/').split('/')[0]))
+        host, path = 'www.youtube.com', '/watch'
+    elif host in ('youtube.com', 'm.youtube.com'):
+        host = 'www.youtube.com'
+
+    if host.endswith('youtube.com'):
+        # Timestamps don't change the download
+        query = [(k, v) for k, v in query if k != 't']
+
+    return urlunsplit(('https' if scheme == 'https' or 'youtube.com' in host else scheme,
+                       host, path, urlencode(query), ''))
+
+
+def parse_import(text, existing=()):
+    """
+    Parse URLs and drop duplicates in one pass.
+
+    URLs are compared by canonical form but returned as written, so
+    parameters a site might need are never stripped from what's queued.
+
+    Args:
+        text: Plain text, HTML, bookmark export or JSON bookmarks
+        existing: URLs already queued (canonicalized before comparison)
+
+    Returns:
+        tuple: (new_urls, duplicate_count); the first spelling of each new URL
+    """
+    seen = {canonicalize_url(u) for u in existing}
+    urls = []
+    duplicates = 0
+    for raw in extract_urls(text):
+        key = canonicalize_url(raw)
+        if not key:
+            continue
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        urls.append(raw.strip())
+    return urls, duplicates
+
+
+def read_import_file(path):
+    """Read an import file as text, tolerating unknown encodings."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    for encoding in ('utf-8-sig', 'utf-16'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('latin-1')
+
+
+def validate_urls(urls, probe_func, max_workers=4, on_result=None):
+    """
+    Validate URLs concurrently before they are queued.
+
+    Args:
+        urls: URLs to check
+        probe_func: Called as probe_func(url); returns an info dict or raises
+        max_workers: Maximum concurrent probes
+        on_result: Called with each result dict as it completes (optional)
+
+    Returns:
+        list: [{'url': str, 'ok': bool, 'title': str or None,
+                'duration': float or None, 'error': str or None}]
+              in the same order as urls
+    """
+    results = {}
+
+    def probe(url):
+        try:
+            info = probe_func(url) or {}
+            return {'url': url, 'ok': True, 'title': info.get('title'),
+                    'duration': info.get('duration'), 'error': None}
+        except Exception as e:
+            message = str(e).replace('ERROR: ', '')
+            if 'Unsupported URL' in message:
+                message = 'Unsupported site'
+            return {'url': url, 'ok': False, 'title': None, 'duration': None, 'error': message}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [pool.submit(probe, url) for url in urls]
+        for future in as_completed(futures):
+            result = future.result()
+            results[result['url']] = result
+            if on_result:
+                on_result(result)
+
+    return [results[url] for url in urls]
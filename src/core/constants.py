@@ -11,6 +11,14 @@ SETTINGS_FILE = os.path.join(SCRIPT_DIR, '.yard_settings.json')
 QUEUE_FILE = os.path.join(SCRIPT_DIR, '.yard_queue.json')
 UPDATE_CHECK_FILE = os.path.join(SCRIPT_DIR, '.yard_update_check.json')
 LOCK_FILE = os.path.join(SCRIPT_DIR, '.yard.lock')
+FAILED_JOBS_FILE = os.path.join(SCRIPT_DIR, '.yard_failed.json')
+HOST_LIMITS_FILE = os.path.join(SCRIPT_DIR, '.yard_host_limits.json')
+FRAGMENT_TUNING_FILE = os.path.join(SCRIPT_DIR, '.yard_fragment_tuning.json')
+ENCODER_CALIBRATION_FILE = os.path.join(SCRIPT_DIR, '.yard_encoder_calibration.json')
+SUBSCRIPTIONS_FILE = os.path.join(SCRIPT_DIR, '.yard_subscriptions.json')
+HTTP_CACHE_DIR = os.path.join(SCRIPT_DIR, '.yard_http_cache')
+ENCODE_SPEEDS_FILE = os.path.join(SCRIPT_DIR, '.yard_encode_speeds.json')
+CLUSTER_QUEUE_FILE = os.path.join(SCRIPT_DIR, '.yard_cluster_queue.json')
 
 # Color scheme
 BG = "#1c1c1c"
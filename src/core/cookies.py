@@ -0,0 +1,129 @@
+"""cookies.txt loaded once and shared by every yt-dlp session."""
+
+import os
+import threading
+
+from yt_dlp.cookies import YoutubeDLCookieJar
+
+# Seconds to coalesce cookie changes before writing the file back
+WRITE_DELAY = 5
+
+
+def _file_state(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class SharedCookieJar(YoutubeDLCookieJar):
+    """
+    Cookie jar whose save() schedules a debounced, atomic write-back.
+
+    yt-dlp saves the cookie file every time a YoutubeDL closes; with one
+    jar shared by all sessions that would mean concurrent rewrites of the
+    same file. Here save() only writes when cookies actually changed, a
+    few seconds later, via a temporary file renamed over the original.
+    """
+
+    def __init__(self, filename, write_delay=WRITE_DELAY):
+        super().__init__(filename)
+        self.write_delay = write_delay
+        self.dirty = False
+        self.file_state = None  # (mtime_ns, size) of the file as we last read or wrote it
+        self._loading = False
+        self._timer = None
+        self._io_lock = threading.Lock()
+
+    def set_cookie(self, cookie):
+        super().set_cookie(cookie)
+        if not self._loading:
+            self.dirty = True
+
+    def clear(self, *args):
+        super().clear(*args)
+        if not self._loading:
+            self.dirty = True
+
+    def reload(self):
+        """Read the file into the jar; changes not yet written back are kept."""
+        with self._io_lock:
+            self._loading = True
+            try:
+                if not self.dirty:
+                    super().clear()
+                if os.access(self.filename, os.R_OK):
+                    self.load()
+            finally:
+                self._loading = False
+            self.file_state = _file_state(self.filename)
+
+    def save(self, filename=None, ignore_discard=True, ignore_expires=True):
+        if filename not in (None, self.filename):
+            return super().save(filename, ignore_discard, ignore_expires)
+        if not self.dirty:
+            return
+        with self._io_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write pending changes now."""
+        with self._io_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self.dirty:
+                return
+            # Cleared first so changes made while writing are saved next time
+            self.dirty = False
+            temp = self.filename + '.yardtmp'
+            try:
+                super().save(temp)
+                os.replace(temp, self.filename)
+            except OSError:
+                self.dirty = True
+                try:
+                    os.remove(temp)
+                except OSError:
+                    pass
+                return
+            self.file_state = _file_state(self.filename)
+
+
+class CookieService:
+    """
+    One SharedCookieJar per cookies file, parsed once.
+
+    jar() is called whenever a session is leased; if the file changed on
+    disk since it was last read or written (e.g. a fresh browser export),
+    the same jar object is reloaded in place so every session sees it.
+    """
+
+    def __init__(self, write_delay=WRITE_DELAY):
+        self.write_delay = write_delay
+        self._jars = {}  # absolute path -> SharedCookieJar
+        self._lock = threading.Lock()
+
+    def jar(self, path):
+        """Shared jar for path, refreshed if the file changed."""
+        path = os.path.abspath(os.path.expanduser(path))
+        with self._lock:
+            jar = self._jars.get(path)
+            if jar is None:
+                jar = self._jars[path] = SharedCookieJar(path, self.write_delay)
+                jar.reload()
+                return jar
+        if _file_state(path) != jar.file_state:
+            jar.reload()
+        return jar
+
+    def flush(self):
+        """Write every pending change (call before exit)."""
+        with self._lock:
+            jars = list(self._jars.values())
+        for jar in jars:
+            jar.flush()
@@ -0,0 +1,452 @@
+"""Coordinator/worker mode: one queue, downloads spread over several machines."""
+
+import json
+import os
+import secrets
+import socket
+import threading
+import time
+
+from core.bandwidth import QualityPlanner
+from core.downloader import Downloader
+from core.http_client import HttpClient
+from core.http_server import JsonRequestHandler, JsonServer, serve
+from core.jobs import JobRecord
+from core.retry import CATEGORY_LABELS, RetryPolicy
+from core.transcode import downloads_video
+
+# Seconds a worker holds a job without a heartbeat before it's requeued
+LEASE_SECONDS = 60
+
+# A job whose lease expired this many times is failed instead of requeued,
+# so one job that crashes every worker can't take the whole cluster down
+MAX_LEASES = 3
+
+# Seconds an idle worker waits before asking for work again
+POLL_INTERVAL = 5
+
+
+class Lease:
+    """A job handed out to a worker."""
+
+    __slots__ = ('job', 'worker', 'expires', 'progress', 'cancelled')
+
+    def __init__(self, job, worker, expires):
+        self.job = job
+        self.worker = worker
+        self.expires = expires
+        self.progress = None
+        self.cancelled = False
+
+    def to_dict(self):
+        return {'job': self.job.to_dict(), 'worker': self.worker,
+                'expires_in': max(self.expires - time.monotonic(), 0), 'progress': self.progress}
+
+
+class Coordinator:
+    """
+    Owns the queue and leases jobs to workers over HTTP.
+
+    Leased jobs leave the scheduler but are still saved with the queue, so
+    a coordinator restart requeues them. Workers extend their lease with
+    heartbeats; a lease that runs out (crashed worker, lost network) puts
+    the job back in the scheduler with its id, priority and submission
+    time, so it keeps its place in line.
+    """
+
+    def __init__(self, scheduler, queue_mgr, token=None, lease_seconds=LEASE_SECONDS,
+                 on_result=None, log_callback=None):
+        """
+        Initialize coordinator.
+
+        Args:
+            scheduler: JobScheduler holding queued jobs
+            queue_mgr: QueueManager persisting them
+            token: Shared secret workers must send (generated if not given)
+            lease_seconds: Lease length; heartbeats renew it
+            on_result: Called with (job, result) when a job finishes for good
+            log_callback: Called for logging messages (optional)
+        """
+        self.scheduler = scheduler
+        self.queue_mgr = queue_mgr
+        self.token = token or secrets.token_hex(16)
+        self.lease_seconds = lease_seconds
+        self.on_result = on_result
+        self.log = log_callback or (lambda msg: None)
+        self.leases = {}  # job id -> Lease
+        self.port = None
+        self._server = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _save(self):
+        with self._lock:
+            leased = [lease.job for lease in self.leases.values()]
+        self.queue_mgr.save(self.scheduler.snapshot() + leased)
+
+    def submit(self, job):
+        """Queue a job dict ({'url', 'settings', optional 'priority'/'deadline'})."""
+        job = self.scheduler.push(job)
+        self._save()
+        return job
+
+    def lease(self, worker):
+        """Hand the next job to worker, or return None if the queue is empty."""
+        with self._lock:
+            job = self.scheduler.pop()
+            if job is None:
+                return None
+            lease = self.leases[job['id']] = Lease(job, worker, time.monotonic() + self.lease_seconds)
+        self._save()
+        self.log(f"{worker} took {job['url']}")
+        return lease
+
+    def _held(self, job_id, worker):
+        lease = self.leases.get(job_id)
+        return lease if lease is not None and lease.worker == worker else None
+
+    def heartbeat(self, job_id, worker, progress=None):
+        """
+        Renew a lease and record the worker's latest progress.
+
+        Returns:
+            Lease or None: None if worker no longer holds the job
+        """
+        with self._lock:
+            lease = self._held(job_id, worker)
+            if lease is not None:
+                lease.expires = time.monotonic() + self.lease_seconds
+                if progress is not None:
+                    lease.progress = progress
+            return lease
+
+    def complete(self, job_id, worker, result):
+        """
+        Record a worker's final result for a job.
+
+        A 'Cancelled' result the coordinator didn't ask for means the worker
+        is shutting down, so the job goes back in the queue. One it did ask
+        for (cancel()) is dropped: the job isn't a failure.
+
+        Returns:
+            bool: False if worker no longer holds the job
+        """
+        with self._lock:
+            lease = self._held(job_id, worker)
+            if lease is None:
+                return False
+            del self.leases[job_id]
+        if result.get('error') == 'Cancelled' and not lease.cancelled:
+            self.scheduler.push(lease.job)
+            self.log(f"{worker} gave back {lease.job['url']}")
+        elif lease.cancelled and not result.get('success'):
+            self.log(f"Cancelled {lease.job['url']} on {worker}")
+        elif self.on_result:
+            self.on_result(lease.job, result)
+        self._save()
+        return True
+
+    def cancel(self, job_id):
+        """Drop a queued job, or tell the worker running it to stop."""
+        if self.scheduler.remove(job_id) is not None:
+            self._save()
+            return True
+        with self._lock:
+            lease = self.leases.get(job_id)
+            if lease is not None:
+                lease.cancelled = True
+            return lease is not None
+
+    def expire(self, now=None):
+        """Requeue (or fail) jobs whose lease ran out. Returns how many expired."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [lease for lease in self.leases.values() if lease.expires <= now]
+            for lease in expired:
+                del self.leases[lease.job['id']]
+        for lease in expired:
+            job = lease.job
+            if lease.cancelled:
+                continue
+            job['expired'] = job.get('expired', 0) + 1
+            if job['expired'] >= MAX_LEASES:
+                self.log(f"⚠ Giving up on {job['url']}: lost {MAX_LEASES} workers")
+                if self.on_result:
+                    self.on_result(job, {'success': False, 'title': None, 'category': None,
+                                         'error': f"Lease expired {MAX_LEASES} times"})
+            else:
+                self.log(f"⚠ Lease on {job['url']} held by {lease.worker} expired, requeued")
+                self.scheduler.push(job)
+        if expired:
+            self._save()
+        return len(expired)
+
+    def status(self):
+        """Queue and lease overview."""
+        with self._lock:
+            leases = [lease.to_dict() for lease in self.leases.values()]
+        return {'queued': [job.to_dict() for job in self.scheduler.ordered()], 'leased': leases}
+
+    def _reap(self):
+        while not self._stop.wait(1):
+            self.expire()
+
+    def start(self, host='0.0.0.0', port=0):
+        """
+        Serve the worker API and start expiring leases.
+
+        Args:
+            host: Interface to listen on ('0.0.0.0' for the local network)
+            port: TCP port (0 picks a free one)
+
+        Returns:
+            int: Port listened on
+        """
+        self._server = JsonServer((host, port), _CoordinatorHandler, self.token)
+        self._server.coordinator = self
+        self._stop.clear()
+        self.port = serve(self._server)
+        threading.Thread(target=self._reap, daemon=True).start()
+        return self.port
+
+    def stop(self):
+        """Stop serving. Leased jobs stay saved and are requeued on the next start."""
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self.queue_mgr.flush()
+
+
+class _CoordinatorHandler(JsonRequestHandler):
+    """Worker API: /lease, /jobs/<id>/heartbeat|complete|cancel, /jobs, /status."""
+
+    def route(self, method, parts, query, body):
+        coordinator = self.server.coordinator
+        worker = str(body.get('worker', ''))
+        if method == 'GET' and parts == ['status']:
+            return 200, coordinator.status()
+        if method != 'POST':
+            return 404, {'error': 'not found'}
+
+        if parts == ['jobs']:
+            try:
+                job = coordinator.submit(self._submitted_job(body))
+            except ValueError as e:
+                return 400, {'error': str(e)}
+            return 201, {'id': job['id']}
+        if parts == ['lease']:
+            lease = coordinator.lease(worker)
+            if lease is None:
+                return 204, None
+            return 200, {'job': lease.job.to_dict(), 'lease_seconds': coordinator.lease_seconds}
+        if len(parts) == 3 and parts[0] == 'jobs':
+            job_id, action = parts[1], parts[2]
+            if action == 'heartbeat':
+                lease = coordinator.heartbeat(job_id, worker, body.get('progress'))
+                if lease is None:
+                    return 410, {'error': 'lease lost'}
+                return 200, {'cancel': lease.cancelled}
+            if action == 'complete':
+                if not coordinator.complete(job_id, worker, body.get('result') or {}):
+                    return 410, {'error': 'lease lost'}
+                return 200, {}
+            if action == 'cancel':
+                return (200 if coordinator.cancel(job_id) else 404), {}
+        return 404, {'error': 'not found'}
+
+    @staticmethod
+    def _submitted_job(body):
+        """Job from a POST /jobs body; ValueError if a field is missing or mistyped."""
+        url = body.get('url')
+        if not isinstance(url, str) or not url.startswith('http'):
+            raise ValueError('url required')
+        settings = body.get('settings')
+        if settings is None:
+            settings = {}
+        if not isinstance(settings, dict) or not all(
+                _is_scalar(v) or (isinstance(v, list) and all(_is_scalar(i) for i in v))
+                for v in settings.values()):
+            raise ValueError("'settings' must be an object of scalars or lists of scalars")
+        job = {'url': url, 'settings': settings}
+        for key in ('priority', 'deadline'):
+            if key in body:
+                value = body[key]
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise ValueError(f"'{key}' must be a number")
+                job[key] = value
+        return job
+
+
+def _is_scalar(value):
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+class CoordinatorError(Exception):
+    """The coordinator rejected a request or couldn't be reached."""
+
+
+class Worker:
+    """
+    Runs leased jobs with a local Downloader.
+
+    While a job downloads, a heartbeat thread renews the lease every third
+    of its length and reports progress; if the coordinator says the job was
+    cancelled, or the lease was lost to another worker, the download is
+    cancelled. Files are saved to the worker's own folder.
+    """
+
+    def __init__(self, coordinator_url, token, folder, worker_id=None, cookies_file=None,
+                 log_callback=print):
+        """
+        Initialize worker.
+
+        Args:
+            coordinator_url: Base URL of the coordinator, e.g. http://192.168.1.10:8765
+            token: The coordinator's shared secret
+            folder: Download folder on this machine
+            worker_id: Name reported to the coordinator (default: host name and PID)
+            cookies_file: Path to cookies.txt on this machine (optional)
+            log_callback: Called for logging messages
+        """
+        self.url = coordinator_url.rstrip('/')
+        self.token = token
+        self.folder = folder
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.cookies_file = cookies_file
+        self.log = log_callback
+        self.client = HttpClient(timeout=15)
+        self.downloader = Downloader(self._on_progress, self._on_postprocessor, self._log_job)
+        self.planner = QualityPlanner(self.downloader.throughput)
+        self.retry_policy = RetryPolicy()
+        self.progress = None
+        self._stop = threading.Event()
+
+    def _call(self, path, payload):
+        """POST to the coordinator; returns (status, decoded body or None)."""
+        body = json.dumps(dict(payload, worker=self.worker_id)).encode('utf-8')
+        try:
+            resp = self.client.request('POST', self.url + path, body=body, headers={
+                'Authorization': f"Bearer {self.token}", 'Content-Type': 'application/json'})
+        except OSError as e:
+            raise CoordinatorError(f"Coordinator unreachable: {e}") from e
+        if resp.status == 401:
+            raise CoordinatorError("Coordinator rejected the token")
+        return resp.status, (resp.json() if resp.body else None)
+
+    def _log_job(self, msg):
+        self.log(f"[{self.worker_id}] {msg}")
+
+    def _on_progress(self, d):
+        combined = d.get('combined') or {}
+        self.progress = {
+            'status': d.get('status'),
+            'downloaded_bytes': combined.get('downloaded_bytes') or d.get('downloaded_bytes'),
+            'total_bytes': combined.get('total_bytes') or d.get('total_bytes') or d.get('total_bytes_estimate'),
+            'speed': combined.get('speed') or d.get('speed'),
+            'eta': combined.get('eta') if combined else d.get('eta'),
+        }
+
+    def _on_postprocessor(self, d):
+        self.progress = {'status': 'postprocessing', 'postprocessor': d.get('postprocessor'),
+                         'stage': d.get('status')}
+
+    def run(self):
+        """Lease and run jobs until stop() is called."""
+        self.log(f"Worker {self.worker_id} polling {self.url}")
+        while not self._stop.is_set():
+            try:
+                status, reply = self._call('/lease', {})
+            except CoordinatorError as e:
+                self.log(f"⚠ {e}")
+                self._stop.wait(POLL_INTERVAL)
+                continue
+            if status != 200:
+                self._stop.wait(POLL_INTERVAL)
+                continue
+            self._run_job(JobRecord.from_dict(reply['job']), reply.get('lease_seconds', LEASE_SECONDS))
+        self.downloader.close()
+
+    def stop(self):
+        """Stop after giving the current job back to the coordinator."""
+        self._stop.set()
+        self.downloader.cancel()
+
+    def _heartbeat(self, job_id, interval, done):
+        while not done.wait(interval):
+            try:
+                status, reply = self._call(f"/jobs/{job_id}/heartbeat", {'progress': self.progress})
+            except CoordinatorError as e:
+                self._log_job(f"⚠ {e}")
+                continue  # Keep going; the coordinator may come back before the lease runs out
+            if status == 410 or (reply or {}).get('cancel'):
+                self._log_job("Job cancelled by coordinator" if status != 410 else "⚠ Lease lost")
+                self.downloader.cancel()
+                return
+
+    def _run_job(self, job, lease_seconds):
+        self.progress = None
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job['id'], max(lease_seconds / 3, 1), done),
+                         daemon=True).start()
+        try:
+            result = self._download(job)
+        finally:
+            done.set()
+        try:
+            self._call(f"/jobs/{job['id']}/complete", {'result': result})
+        except CoordinatorError as e:
+            self._log_job(f"⚠ Couldn't report result, lease will expire: {e}")
+
+    def _download(self, job):
+        """Run a job with the same retry rules as the app."""
+        settings = job.get('settings', {})
+        audio = settings.get('audio', False)
+        quality = settings.get('quality', 'Best')
+        fmt = settings.get('format') or ('MP3' if audio else 'MP4')
+        playlist = settings.get('playlist', False)
+        self._log_job(f"Starting {job['url']}")
+
+        info = None
+        retries = 0
+        while True:
+            if self._stop.is_set():
+                return {'success': False, 'title': None, 'error': 'Cancelled', 'category': None}
+            job_quality = quality
+            if quality == 'Auto' and downloads_video(audio, settings.get('outputs')) and not playlist:
+                job_quality, info = self._plan_quality(job['url'], playlist, info)
+            result = self.downloader.download(
+                job['url'], audio, job_quality, fmt, playlist, settings.get('compat', True),
+                self.folder, self.cookies_file, info=info, outputs=list(settings.get('outputs', [])),
+                plan_entry=self._plan_entry if playlist else None)
+            if result['success'] or result['error'] == 'Cancelled':
+                return result
+            delay = self.retry_policy.next_delay(result['category'], retries)
+            if delay is None:
+                return result
+            retries += 1
+            label = CATEGORY_LABELS.get(result['category'], "Error")
+            self._log_job(f"{label}, retrying in {delay:.0f}s (attempt {retries + 1})")
+            if self.downloader.wait(delay):
+                return {'success': False, 'title': None, 'error': 'Cancelled', 'category': None}
+            info = None
+
+    def _plan_quality(self, url, playlist, info):
+        """Auto quality from this worker's own throughput; the queue lives elsewhere."""
+        if info is None:
+            try:
+                info = self.downloader.fetch_info(url, playlist, self.cookies_file)
+            except Exception:
+                return "Best", None
+        height, reason = self.planner.plan(info)
+        quality = f"{height}p" if height else "Best"
+        self._log_job(f"Auto quality: {quality} ({reason})")
+        return quality, info
+
+    def _plan_entry(self, entry):
+        """Auto quality for one playlist entry (height or None for best)."""
+        height, reason = self.planner.plan(entry)
+        self._log_job(f"Auto quality for {(entry.get('title') or 'entry')[:40]}: "
+                      f"{f'{height}p' if height else 'Best'} ({reason})")
+        return height
@@ -1,39 +1,131 @@
 """Download functionality using yt-dlp."""
 
 import os
+import contextlib
 import glob
+import itertools
 import subprocess
 import shutil
-import yt_dlp
+import time
 import imageio_ffmpeg
+from yt_dlp.utils import PagedList, PostProcessingError
+
+from core.host_limiter import host_key
+from core.jobs import trim_info
+from core.retry import classify_error
+from core.transcode import (
+    AUDIO_FORMATS, AUDIO_SOURCE_FORMATS, COMPAT_PROFILES, CompatEncodePP, DeriveOutputsPP,
+    PooledExtractAudioPP, TranscodePool,
+)
+from core.bandwidth import ThroughputModel, quality_height
+from core.cookies import CookieService
+from core.sessions import SessionPool, pooling_supported
+from core.ytdl import CombinedProgress, YardYoutubeDL, YtdlLogger
+
+# Options that read info dict fields trim_info() drops
+FULL_INFO_OPTIONS = ('writesubtitles', 'writeautomaticsub', 'writethumbnail', 'write_all_thumbnails',
+                     'writedescription', 'writeinfojson', 'embedsubtitles', 'embedthumbnail',
+                     'addmetadata', 'embed_metadata')
+
+# Extractor messages that mean the site is rate limiting us
+THROTTLE_MARKERS = ("not a bot", "rate-limit", "rate limit", "too many requests")
+
+BEST_VIDEO_FORMAT = 'bestvideo+bestaudio[ext=m4a]/bestvideo+bestaudio/best'
+
+
+def video_format(height):
+    """yt-dlp format string for video at most height pixels tall (None: best)."""
+    if height is None:
+        return BEST_VIDEO_FORMAT
+    return f'bestvideo[height<={height}]+bestaudio[ext=m4a]/bestvideo[height<={height}]+bestaudio/best[height<={height}]'
 
 
 class Downloader:
     """Handles video/audio downloads with yt-dlp."""
     
-    def __init__(self, progress_callback, postprocessor_callback, log_callback):
+    def __init__(self, progress_callback, postprocessor_callback, log_callback, host_limiter=None,
+                 fragment_tuner=None, encoder_calibration=None, scratch=None, http_cache=None):
         """
         Initialize downloader.
         
         Args:
-            progress_callback: Called during download progress
+            progress_callback: Called during download progress; d['combined'] sums
+                concurrently downloading streams
             postprocessor_callback: Called during post-processing
             log_callback: Called for logging messages
+            host_limiter: Shared HostLimiter for per-site caps and pacing (optional)
+            fragment_tuner: FragmentTuner choosing fragment parallelism per site (optional)
+            encoder_calibration: EncoderCalibration picking compat encoder settings (optional)
+            scratch: ScratchSpace for intermediate files (optional, may be changed later)
+            http_cache: HttpCache for extractor requests (optional, may be changed later)
         """
         self.progress_callback = progress_callback
         self.postprocessor_callback = postprocessor_callback
         self.log = log_callback
+        self.limiter = host_limiter
+        self.fragment_tuner = fragment_tuner
+        self.encoder_calibration = encoder_calibration
+        self.scratch = scratch
+        self.http_cache = http_cache
+        self.job_stats = None
+        self.combined = CombinedProgress()
+        self.throughput = ThroughputModel()
+        # Shared across jobs: audio transcodes overlap the next downloads
+        self.transcode_pool = TranscodePool()
+        # Shared across jobs: warm connections, cookies and extractor caches
+        self.cookies = CookieService()
+        self.sessions = SessionPool(cookies=self.cookies) if pooling_supported() else None
+        if self.sessions is None:
+            self.log("⚠ Unrecognized yt-dlp internals, connection pooling disabled")
         self.is_cancelled = False
     
     def cancel(self):
         """Cancel the current download."""
         self.is_cancelled = True
     
+    def close(self):
+        """Close pooled sessions and write back pending cookie changes."""
+        if self.sessions:
+            self.sessions.close_all()
+        self.cookies.flush()
+    
+    def wait(self, seconds):
+        """
+        Sleep between attempts, waking early on cancel.
+        
+        Returns:
+            bool: True if cancelled while waiting
+        """
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            if self.is_cancelled:
+                return True
+            time.sleep(min(0.25, deadline - time.monotonic()))
+        return self.is_cancelled
+    
+    def _ydl(self, opts, **kwargs):
+        """Create a YoutubeDL wired to the shared host limiter, HTTP cache and session pool."""
+        return YardYoutubeDL(opts, limiter=self.limiter, http_cache=self.http_cache,
+                             session_pool=self.sessions, **kwargs)
+    
+    def _host_slot(self, url):
+        """Hold a per-site job slot while talking to url's site."""
+        if self.limiter is None:
+            return contextlib.nullcontext()
+        return self.limiter.slot(host_key(url), cancelled=lambda: self.is_cancelled)
+    
     def _progress_hook(self, d):
         """Internal progress hook for yt-dlp."""
         if self.is_cancelled:
             raise Exception("Download cancelled by user.")
         
+        if self.job_stats:
+            self.job_stats.on_progress(d)
+        
+        # Video and audio streams of a merged format download concurrently
+        self.combined.update(d)
+        self.throughput.update(d)
+        
         if self.progress_callback:
             self.progress_callback(d)
     
@@ -99,23 +191,114 @@ class Downloader:
         
         return custom_opts
     
-    def _configure_deno(self):
+    def _configure_deno(self, quiet=False):
         """Configure Deno JS runtime for yt-dlp."""
         deno = self._get_deno_path()
         
         if deno:
             try:
                 subprocess.run([deno, '--version'], capture_output=True, check=False)
-                self.log("Deno JS runtime configured")
+                if not quiet:
+                    self.log("Deno JS runtime configured")
                 return {'js_runtimes': {'deno': {'args': [deno]}}}
             except Exception:
                 pass
         
-        self.log(f"⚠ Deno not found")
-        self.log("  YouTube downloads may not work properly")
+        if not quiet:
+            self.log(f"⚠ Deno not found")
+            self.log("  YouTube downloads may not work properly")
         return {}
     
-    def download(self, url, audio, quality, fmt, playlist, compat, path, cookies_file=None, custom_args=None):
+    def fetch_info(self, url, playlist=False, cookies_file=None, quiet=True, trim=True):
+        """
+        Extract video info without downloading.
+        
+        Args:
+            url: Video URL
+            playlist: Resolve the entire playlist
+            cookies_file: Path to cookies.txt file (optional)
+            quiet: Suppress Deno configuration log messages
+            trim: Drop fields the download never reads (see core.jobs.trim_info)
+            
+        Returns:
+            dict: yt-dlp info dict
+        """
+        info_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': not playlist,
+            'cookiefile': cookies_file if cookies_file and os.path.exists(cookies_file) else None,
+            **self._configure_deno(quiet=quiet),
+        }
+        with self._host_slot(url), self._ydl(info_opts) as ydl_info:
+            info = ydl_info.extract_info(url, download=False)
+        return trim_info(info) if trim else info
+    
+    def probe(self, url, cookies_file=None):
+        """
+        Cheaply check that a URL is supported and reachable.
+        
+        Uses flat extraction, so playlists and channels are listed without
+        resolving each entry.
+        
+        Returns:
+            dict: Flat yt-dlp info dict
+        """
+        opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            'socket_timeout': 15,
+            'cookiefile': cookies_file if cookies_file and os.path.exists(cookies_file) else None,
+            **self._configure_deno(quiet=True),
+        }
+        with self._host_slot(url), self._ydl(opts) as ydl:
+            return ydl.extract_info(url, download=False)
+    
+    def list_entries(self, url, cookies_file=None, on_info=None, start=0):
+        """
+        Lazily list a playlist or channel in the order the site lists it.
+        
+        Entries are flat (id/url/title only) and further pages are only
+        requested as the caller keeps iterating, so stopping early is cheap.
+        
+        Args:
+            url: Playlist or channel URL
+            cookies_file: Path to cookies.txt file (optional)
+            on_info: Called with the playlist's own info dict (title, uploader)
+                before the first entry (optional)
+            start: Index of the first entry to list; paged sources skip the
+                pages before it
+        
+        Yields:
+            dict: Flat entry info dicts
+        """
+        opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': True,
+            'lazy_playlist': True,
+            'socket_timeout': 15,
+            'cookiefile': cookies_file if cookies_file and os.path.exists(cookies_file) else None,
+            **self._configure_deno(quiet=True),
+        }
+        with self._ydl(opts) as ydl:
+            info = ydl.extract_info(url, download=False, process=False)
+            if on_info:
+                on_info({k: v for k, v in info.items() if k != 'entries'})
+            entries = info.get('entries') or []
+            if start:
+                if isinstance(entries, PagedList):
+                    entries = entries.getslice(start)
+                else:
+                    entries = itertools.islice(entries, start, None)
+            for entry in entries:
+                if entry:
+                    yield entry
+    
+    def download(self, url, audio, quality, fmt, playlist, compat, path, cookies_file=None, custom_args=None,
+                 info=None, outputs=None, plan_entry=None):
         """
         Download video or audio.
         
@@ -129,33 +312,54 @@ class Downloader:
             path: Download path
             cookies_file: Path to cookies.txt file (optional)
             custom_args: Custom yt-dlp arguments as string (optional)
+            info: Prefetched info dict for this URL (optional)
+            outputs: Extra formats to derive from the same download, e.g. ['MP3', 'WAV']
+            plan_entry: With Auto quality, called with each video's info dict to
+                pick its height (None for best); used for playlists (optional)
             
         Returns:
-            dict: {'success': bool, 'title': str, 'error': str or None}
+            dict: {'success': bool, 'title': str, 'error': str or None,
+                   'category': failure category (see core.retry) or None}
         """
         self.is_cancelled = False
+        self.job_stats = None
+        self.combined.reset()
         os.makedirs(path, exist_ok=True)
+        job_dir = None
+        extract = None
         
         try:
             ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
             self.log("FFmpeg ready")
             
+            # Extra outputs are derived from one download; fetch video if any needs it
+            extra = [f for f in (outputs or []) if f != fmt]
+            if audio:
+                video_extra = [f for f in extra if f not in AUDIO_FORMATS]
+                if video_extra:
+                    extra = [fmt] + [f for f in extra if f != video_extra[0]]
+                    audio, fmt = False, video_extra[0]
+            if extra:
+                self.log(f"Saving as {fmt} + {' + '.join(extra)} from one download")
+            
             # Build format string
             if audio:
-                fstr = 'bestaudio/best'
-            elif quality == "Best":
-                fstr = 'bestvideo+bestaudio[ext=m4a]/bestvideo+bestaudio/best'
-            else:
-                # Safely parse quality (e.g., "1080p" -> "1080")
-                try:
-                    h = quality.rstrip('p')  # Remove 'p' suffix safely
-                    if not h.isdigit():
-                        raise ValueError(f"Invalid quality format: {quality}")
-                    fstr = f'bestvideo[height<={h}]+bestaudio[ext=m4a]/bestvideo[height<={h}]+bestaudio/best[height<={h}]'
-                except (ValueError, AttributeError):
+                # Prefer a source whose codec already matches, so it's a remux
+                fstr = AUDIO_SOURCE_FORMATS.get(fmt.lower(), 'bestaudio/best')
+            elif quality_height(quality) is None:
+                if quality not in ("Best", "Auto"):
                     self.log(f"⚠ Invalid quality '{quality}', using Best")
-                    fstr = 'bestvideo+bestaudio[ext=m4a]/bestvideo+bestaudio/best'
-
+                # Unresolved Auto (no measurement yet) means Best
+                fstr = BEST_VIDEO_FORMAT
+            else:
+                fstr = video_format(quality_height(quality))
+            
+            # Auto for playlists: plan each entry from its own formats as it starts
+            format_planner = None
+            if plan_entry and quality == "Auto" and not audio:
+                def plan_format(entry):
+                    return video_format(plan_entry(entry))
+                format_planner = plan_format
             
             # Build yt-dlp options
             opts = {
@@ -168,75 +372,37 @@ class Downloader:
                 'quiet': True,
                 'cookiefile': cookies_file if cookies_file and os.path.exists(cookies_file) else None,
                 'no_warnings': True,
-                'paths': {'home': path}
+                'paths': {'home': path},
+                # Keep .part files so a retried job resumes where it stopped
+                'continuedl': True,
+                'retries': 5,
+                'fragment_retries': 5,
             }
             
             # Configure post-processors
-            if audio:
-                opts['postprocessors'] = [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': fmt.lower(),
-                    'preferredquality': '192'
-                }]
-            else:
+            compat_encoder = None
+            # Audio extraction is added once the YoutubeDL exists (see below)
+            if not audio:
                 opts['merge_output_format'] = fmt.lower()
                 
                 if compat:
-                    # Format-specific codec selection for compatibility mode
+                    # Merge (if needed) and re-encode in one ffmpeg pass
                     fmt_lower = fmt.lower()
-                    
-                    if fmt_lower == 'mp4':
-                        # MP4: Use H.264 + AAC (maximum compatibility)
-                        self.log("Compatibility mode: H.264/AAC for MP4")
-                        opts['postprocessors'] = [{
-                            'key': 'FFmpegVideoConvertor',
-                            'preferredformat': 'mp4',
-                        }]
-                        opts['postprocessor_args'] = [
-                            '-c:v', 'libx264',
-                            '-preset', 'veryfast',
-                            '-crf', '23',
-                            '-vsync', 'cfr',
-                            '-c:a', 'aac',
-                            '-b:a', '192k',
-                            '-movflags', '+faststart'
-                        ]
-                    
-                    elif fmt_lower == 'webm':
-                        # WEBM: Use VP9 + Opus (standard for WebM)
-                        self.log("Compatibility mode: VP9/Opus for WebM")
-                        opts['postprocessors'] = [{
-                            'key': 'FFmpegVideoConvertor',
-                            'preferredformat': 'webm',
-                        }]
-                        opts['postprocessor_args'] = [
-                            '-c:v', 'libvpx-vp9',
-                            '-crf', '30',
-                            '-b:v', '0',
-                            '-vsync', 'cfr',
-                            '-c:a', 'libopus',
-                            '-b:a', '128k'
-                        ]
-                    
-                    elif fmt_lower == 'mkv':
-                        # MKV: Use H.264 + AAC (widely compatible, MKV supports everything)
-                        self.log("Compatibility mode: H.264/AAC for MKV")
-                        opts['postprocessors'] = [{
-                            'key': 'FFmpegVideoConvertor',
-                            'preferredformat': 'mkv',
-                        }]
-                        opts['postprocessor_args'] = [
-                            '-c:v', 'libx264',
-                            '-preset', 'veryfast',
-                            '-crf', '23',
-                            '-vsync', 'cfr',
-                            '-c:a', 'aac',
-                            '-b:a', '192k'
-                        ]
+                    if fmt_lower in COMPAT_PROFILES:
+                        self.log(f"Compatibility mode: {COMPAT_PROFILES[fmt_lower][0]}")
+                        compat_encoder = CompatEncodePP(target_ext=fmt_lower,
+                                                        calibration=self.encoder_calibration)
                 else:
                     self.log("Using original format (may contain variable framerate)")
 
             
+            # Fragment parallelism and chunk size learned for this site
+            if self.fragment_tuner:
+                site = host_key(url)
+                opts.update(self.fragment_tuner.options_for(site))
+                self.job_stats = self.fragment_tuner.start_job(site, opts['concurrent_fragment_downloads'])
+                opts['logger'] = YtdlLogger(on_retry=self.job_stats.on_retry)
+            
             # Configure Deno runtime
             deno_config = self._configure_deno()
             
@@ -248,7 +414,7 @@ class Downloader:
                     if custom_opts:
                         # Protect critical settings from being overridden
                         protected_keys = {'ffmpeg_location', 'paths', 'progress_hooks', 
-                                         'postprocessor_hooks', 'outtmpl'}
+                                         'postprocessor_hooks', 'outtmpl', 'logger'}
                         for key in protected_keys:
                             custom_opts.pop(key, None)
                         
@@ -261,15 +427,23 @@ class Downloader:
             if cookies_file and os.path.exists(cookies_file):
                 self.log(f"Using cookies from: {os.path.basename(cookies_file)}")
             
-            # Fetch video info
-            self.log("Fetching video info...")
-            try:
-                info_opts = {'quiet': True, 'no_warnings': True, **deno_config}
-                with yt_dlp.YoutubeDL(info_opts) as ydl_info:
-                    info = ydl_info.extract_info(url, download=False)
-            except Exception as e:
-                self.log(f"⚠ Failed to fetch video info: {e}")
-                raise
+            # Prefetched info is trimmed; options that write those fields need it
+            # whole, and so may any custom argument (chapter splitting, metadata
+            # parsing, sponsorblock...)
+            full_info = bool(custom_args) or any(opts.get(k) for k in FULL_INFO_OPTIONS)
+            if full_info:
+                info = None
+            
+            # Fetch video info (skipped when prefetched)
+            if info is None:
+                self.log("Fetching video info...")
+                try:
+                    info = self.fetch_info(url, playlist, cookies_file, trim=not full_info)
+                except Exception as e:
+                    self.log(f"⚠ Failed to fetch video info: {e}")
+                    raise
+            else:
+                self.log("Using prefetched video info")
             
             # Livestream detection
             if info.get('is_live'):
@@ -302,8 +476,8 @@ class Downloader:
                     reverse=True
                 )
                 
-                if quality != "Best" and available_heights:
-                    requested_h = int(quality.replace('p', ''))
+                requested_h = quality_height(quality)
+                if requested_h and available_heights:
                     if requested_h not in available_heights:
                         fallback = min(
                             [h for h in available_heights if h],
@@ -311,8 +485,7 @@ class Downloader:
                         )
                         self.log(f"⚠ {quality} not available")
                         self.log(f"  Using {fallback}p instead")
-                        h = fallback
-                        fstr = f'bestvideo[height<={h}]+bestaudio[ext=m4a]/bestvideo[height<={h}]+bestaudio/best[height<={h}]'
+                        fstr = video_format(fallback)
                         opts['format'] = fstr
             
             # Disk space validation
@@ -335,19 +508,66 @@ class Downloader:
                 if "Insufficient disk space" in str(e):
                     raise
             
+            # Stage intermediate files on fast scratch storage when configured
+            if self.scratch:
+                job_dir = self.scratch.acquire(url, expected_bytes=info.get('filesize') or
+                                               info.get('filesize_approx') or 0)
+                if job_dir:
+                    opts['paths'] = {'home': job_dir}
+                else:
+                    self.log("⚠ Scratch space full, writing directly to destination")
+            
             # Download
             self.log("Downloading...")
             opts.update(deno_config)
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=True)
+            with self._host_slot(url), self._ydl(opts, compat_encoder=compat_encoder,
+                                                    format_planner=format_planner) as ydl:
+                if extra:
+                    ydl.add_post_processor(DeriveOutputsPP(ydl, [f.lower() for f in extra], compat=compat))
+                if audio:
+                    # Runs after extras are derived from the source audio; tracks
+                    # that need a transcode convert while the next one downloads
+                    extract = PooledExtractAudioPP(ydl, fmt.lower(), '192', pool=self.transcode_pool)
+                    ydl.add_post_processor(extract, when='after_move')
+                if info.get('_type', 'video') == 'video':
+                    # Reuse the resolved info instead of extracting again
+                    info = ydl.process_ie_result(ydl.sanitize_info(info, True), download=True)
+                else:
+                    info = ydl.extract_info(url, download=True)
                 title = info.get('title', 'video')
-                self.log(f"✓ {title[:60]}")
             
-            return {'success': True, 'title': title, 'error': None}
+            if extract and extract.futures:
+                pending = sum(not f.done() for f in extract.futures)
+                if pending:
+                    self.log(f"Finishing {pending} audio conversion(s)...")
+                errors = TranscodePool.wait(extract.futures)
+                if errors:
+                    raise PostProcessingError(f"Audio conversion failed: {errors[0]}")
+            
+            if job_dir:
+                moved = self.scratch.finalize(job_dir, path)
+                self.scratch.release(job_dir)
+                self.log(f"Moved {len(moved)} file(s) to destination")
+            self.log(f"✓ {title[:60]}")
+            
+            if self.job_stats:
+                # Learn from the parallelism actually used (custom args may override)
+                self.job_stats.fragments = opts.get('concurrent_fragment_downloads', 1)
+                self.fragment_tuner.finish(self.job_stats)
+            
+            return {'success': True, 'title': title, 'error': None, 'category': None}
             
         except Exception as e:
             if "cancelled" in str(e).lower():
                 self.log("Cancelled")
+                if job_dir:
+                    # Keep what already finished, as without scratch; drop the rest
+                    TranscodePool.wait(extract.futures if extract else [])
+                    try:
+                        self.scratch.finalize(job_dir, path)
+                    except OSError:
+                        pass
+                    self.scratch.release(job_dir)
                 # Clean up temporary files (.part and .ytdl)
                 try:
                     for part_file in glob.glob(os.path.join(path, '*.part')):
@@ -356,7 +576,13 @@ class Downloader:
                         os.remove(ytdl_file)
                 except Exception:
                     pass
-                return {'success': False, 'title': None, 'error': 'Cancelled'}
+                return {'success': False, 'title': None, 'error': 'Cancelled', 'category': None}
             else:
+                if self.limiter and any(m in str(e).lower() for m in THROTTLE_MARKERS):
+                    self.limiter.report_throttled(host_key(url))
+                if job_dir:
+                    # Left in scratch so a retry resumes (or skips) what's there
+                    self.scratch.release(job_dir, keep=True)
                 self.log(f"Error: {e}")
-                return {'success': False, 'title': None, 'error': str(e)}
+                return {'success': False, 'title': None, 'error': str(e),
+                        'category': classify_error(e)}
@@ -0,0 +1,238 @@
+"""Per-machine calibration of software video encoder settings."""
+
+import contextlib
+import os
+import platform
+import subprocess
+import threading
+import time
+
+import imageio_ffmpeg
+
+from core.persistence import JsonStore
+from core.transcode import ENCODES, encode_threads
+
+# Synthetic 720p30 test clip generated by ffmpeg itself (no file needed)
+CLIP_FPS = 30
+CLIP_SECONDS = 2
+CLIP_SOURCE = f'testsrc2=size=1280x720:rate={CLIP_FPS}:duration={CLIP_SECONDS}'
+
+# Candidates, fastest first
+X264_PRESETS = ['ultrafast', 'superfast', 'veryfast', 'faster', 'fast', 'medium']
+VP9_CPU_USED = [8, 6, 5, 4]
+
+# Encode speed (multiples of realtime at 720p) each priority aims for
+SPEED_TARGETS = {'speed': 8.0, 'balanced': 3.0, 'quality': 1.0}
+
+PRIORITIES = {
+    'speed': "Fastest encodes",
+    'balanced': "Balanced",
+    'quality': "Best quality",
+}
+
+# Thread counts timed at the chosen x264 preset (plus all cores)
+THREAD_COUNTS = (1, 2, 4)
+
+# Fewer threads are used when they reach this share of the best speed
+THREAD_EFFICIENCY = 0.9
+
+
+def machine_id():
+    """Identify this machine's CPU so cached results aren't reused elsewhere."""
+    return '|'.join(str(p) for p in (
+        platform.node(), platform.machine(), platform.processor(), os.cpu_count()))
+
+
+class EncoderCalibration:
+    """
+    Picks x264 presets and VP9 speed settings that suit this machine.
+
+    calibrate() encodes a short synthetic clip with each candidate setting
+    and records frames per second; results are cached per machine and
+    ffmpeg build. Candidates are measured down to the slowest priority's
+    target, so priority can change without recalibrating. It then times
+    the chosen x264 preset with 1, 2, 4 and all threads, since x264 stops
+    scaling well before core counts run out on many machines.
+
+    session() returns the slowest (best quality) setting whose measured
+    speed, shared between concurrent transcodes, still meets the speed
+    target, with the fewest threads that keep x264 near its best speed
+    within those transcodes' share of the CPU.
+    """
+
+    def __init__(self, calibration_file=None, ffmpeg=None, priority='balanced', encodes=ENCODES):
+        """
+        Initialize calibration.
+
+        Args:
+            calibration_file: JSON file caching benchmark results (optional)
+            ffmpeg: Path to the ffmpeg executable (default: looked up when first needed)
+            priority: Key of SPEED_TARGETS
+            encodes: EncodeCounter shared with the other ffmpeg encodes
+        """
+        self._ffmpeg = ffmpeg
+        self.priority = priority
+        self.encodes = encodes
+        self.store = JsonStore(calibration_file, default=dict) if calibration_file else None
+        self._results = None
+        self._loaded = False
+        self._calibrating = threading.Lock()
+
+    @property
+    def ffmpeg(self):
+        """ffmpeg executable, or None if there isn't one (calibration is then skipped)."""
+        if self._ffmpeg is None:
+            try:
+                self._ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+            except Exception:
+                return None  # Downloads report the missing ffmpeg themselves
+        return self._ffmpeg
+
+    def _cache_key(self):
+        return f"{machine_id()}|{self.ffmpeg}"
+
+    def _load(self):
+        """Read cached results for this machine once ffmpeg is known."""
+        if not self._loaded:
+            if self.store and self.ffmpeg:
+                self._results = self.store.load().get(self._cache_key())
+            self._loaded = True
+        return self._results
+
+    @property
+    def calibrated(self):
+        return self._load() is not None
+
+    def _benchmark(self, codec_args, threads):
+        """Encode the test clip; return frames per second (0 if it failed)."""
+        cmd = [self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-nostdin',
+               '-f', 'lavfi', '-i', CLIP_SOURCE, *codec_args, '-threads', str(threads),
+               '-an', '-f', 'null', '-']
+        started = time.perf_counter()
+        try:
+            result = subprocess.run(cmd, capture_output=True, timeout=60, check=False)
+        except (OSError, subprocess.TimeoutExpired):
+            return 0.0
+        if result.returncode != 0:
+            return 0.0
+        return CLIP_FPS * CLIP_SECONDS / (time.perf_counter() - started)
+
+    def calibrate(self, force=False):
+        """
+        Benchmark encoder settings (blocking, a few seconds to a minute).
+
+        Returns:
+            dict: {'threads': int, 'x264': {preset: fps}, 'vp9': {cpu_used: fps}},
+                or None without ffmpeg
+        """
+        with self._calibrating:
+            if self._load() is not None and not force:
+                return self._results
+            if not self.ffmpeg:
+                return None
+
+            threads = os.cpu_count() or 1
+            # Once a setting misses every target, slower ones can't be picked
+            target_fps = min(SPEED_TARGETS.values()) * CLIP_FPS
+            results = {'threads': threads, 'x264': {}, 'vp9': {}, 'x264_threads': {},
+                       'measured_at': time.time()}
+            for preset in X264_PRESETS:
+                fps = results['x264'][preset] = round(self._benchmark(
+                    ['-c:v', 'libx264', '-preset', preset, '-crf', '23'], threads), 1)
+                if fps < target_fps:
+                    break
+            for cpu_used in VP9_CPU_USED:
+                fps = results['vp9'][str(cpu_used)] = round(self._benchmark(
+                    ['-c:v', 'libvpx-vp9', '-crf', '30', '-b:v', '0', '-row-mt', '1',
+                     '-deadline', 'good', '-cpu-used', str(cpu_used)], threads), 1)
+                if fps < target_fps:
+                    break
+
+            preset = self._pick(results['x264'], X264_PRESETS, 1)
+            if preset is not None:
+                results['x264_threads_preset'] = preset
+                for count in sorted({n for n in THREAD_COUNTS if n < threads} | {threads}):
+                    results['x264_threads'][str(count)] = round(self._benchmark(
+                        ['-c:v', 'libx264', '-preset', preset, '-crf', '23'], count), 1)
+
+            self._results = results
+            if self.store:
+                saved = dict(self.store.get())
+                saved[self._cache_key()] = results
+                self.store.set(saved)
+            return results
+
+    def calibrate_async(self, delay=0, on_done=None):
+        """Calibrate in the background unless this machine already has results."""
+        def run():
+            # Checked here so looking up ffmpeg stays off the caller's thread
+            if self.calibrated:
+                return
+            results = self.calibrate()
+            if results and on_done:
+                on_done(results)
+
+        timer = threading.Timer(delay, run)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _pick(self, measured, candidates, jobs):
+        """Slowest candidate still fast enough when jobs share the CPU."""
+        target_fps = SPEED_TARGETS.get(self.priority, SPEED_TARGETS['balanced']) * CLIP_FPS
+        chosen = None
+        for candidate in candidates:
+            fps = measured.get(str(candidate), 0)
+            if not fps:
+                break
+            if chosen is not None and fps / jobs < target_fps:
+                break
+            chosen = candidate
+        return chosen
+
+    def _x264_threads(self, jobs):
+        """Fewest threads within THREAD_EFFICIENCY of the best speed in jobs' share of the CPU."""
+        limit = encode_threads(jobs)
+        measured = {int(n): fps for n, fps in self._results.get('x264_threads', {}).items()
+                    if fps and int(n) <= limit}
+        if not measured:
+            return limit
+        best = max(measured.values())
+        count = min(n for n, fps in measured.items() if fps >= best * THREAD_EFFICIENCY)
+        # Still scaling at the largest count measured: use the whole share
+        return limit if count == max(measured) else count
+
+    def video_args(self, target_ext, jobs=1):
+        """
+        Encoder arguments for target_ext with jobs concurrent transcodes.
+
+        Returns:
+            list or None: ffmpeg video args, or None before calibration
+        """
+        if self._load() is None:
+            return None
+
+        threads = encode_threads(jobs)
+        if target_ext == 'webm':
+            cpu_used = self._pick(self._results['vp9'], VP9_CPU_USED, jobs)
+            if cpu_used is None:
+                return None
+            return ['-c:v', 'libvpx-vp9', '-crf', '30', '-b:v', '0', '-row-mt', '1',
+                    '-deadline', 'good', '-cpu-used', str(cpu_used), '-threads', str(threads)]
+
+        preset = self._pick(self._results['x264'], X264_PRESETS, jobs)
+        if preset is None:
+            return None
+        return ['-c:v', 'libx264', '-preset', preset, '-crf', '23',
+                '-threads', str(self._x264_threads(jobs))]
+
+    @contextlib.contextmanager
+    def session(self, target_ext):
+        """
+        Register one running transcode and yield its video args (or None).
+
+        Sessions count in the shared EncodeCounter with derived outputs and
+        pooled audio transcodes, so thread counts allow for all of them.
+        """
+        with self.encodes.running() as jobs:
+            yield self.video_args(target_ext, jobs)
@@ -0,0 +1,388 @@
+"""Typed, non-blocking publish/subscribe bus for job, progress and log events."""
+
+import itertools
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# What a full subscription does with a new event
+DROP_OLDEST = 'drop_oldest'  # Make room by discarding the oldest pending event
+DROP_NEWEST = 'drop_newest'  # Discard the new event
+
+
+def progress_event(d):
+    """JSON-safe summary of a yt-dlp progress hook dict."""
+    combined = d.get('combined') or {}
+    total = combined.get('total_bytes') or d.get('total_bytes') or d.get('total_bytes_estimate')
+    done = combined.get('downloaded_bytes') or d.get('downloaded_bytes')
+    fraction = combined.get('fraction')
+    if fraction is None and total and done is not None:
+        fraction = done / total
+    return {
+        'status': d.get('status'),
+        'downloaded_bytes': done,
+        'total_bytes': total,
+        'fraction': fraction,
+        'speed': combined.get('speed') or d.get('speed'),
+        'eta': combined.get('eta') if combined else d.get('eta'),
+        'pending': combined.get('pending', 0),
+        'streams': [{'kind': s['kind'], 'fraction': s['fraction']} for s in combined.get('streams', [])],
+        'filename': d.get('filename'),
+    }
+
+
+def postprocessor_event(d):
+    """JSON-safe summary of a yt-dlp postprocessor hook dict."""
+    info = d.get('info_dict') or {}
+    return {
+        'postprocessor': d.get('postprocessor'),
+        'status': d.get('status'),
+        'filename': info.get('filepath'),
+        'duration': info.get('duration'),
+    }
+
+
+class Event:
+    """
+    Base event. Subclasses set name and list their fields in __slots__.
+
+    Events are created on the publishing thread and read by subscriber
+    threads, so they hold summaries, never live yt-dlp dicts. Control
+    events (droppable = False) are kept even when a subscription is full:
+    losing one would leave the queue stopped or the UI stuck.
+    """
+
+    __slots__ = ('time',)
+    name = 'event'
+    droppable = True
+
+    def __init__(self):
+        self.time = time.monotonic()
+
+    @property
+    def coalesce_key(self):
+        """Pending events with the same key are replaced by the newest one (None: never)."""
+        return None
+
+    def to_dict(self):
+        """JSON-safe payload."""
+        return {}
+
+
+class JobStarted(Event):
+    __slots__ = ('job', 'info')
+    name = 'started'
+    droppable = False
+
+    def __init__(self, job, info=None):
+        """
+        Args:
+            job: {'id', 'url', 'settings'}
+            info: Prefetched info dict, if any (not serialized)
+        """
+        super().__init__()
+        self.job = job
+        self.info = info
+
+    def to_dict(self):
+        return dict(self.job)
+
+
+class JobFinished(Event):
+    __slots__ = ('job', 'result', 'attempts')
+    name = 'finished'
+    droppable = False
+
+    def __init__(self, job, result, attempts=1):
+        """
+        Args:
+            job: {'id', 'url', 'settings'}
+            result: Downloader.download() result dict
+            attempts: Attempts made, retries included
+        """
+        super().__init__()
+        self.job = job
+        self.result = result
+        self.attempts = attempts
+
+    def to_dict(self):
+        return dict(self.result, job=self.job['id'], url=self.job['url'], attempts=self.attempts)
+
+
+class JobRetrying(Event):
+    __slots__ = ('job_id', 'label', 'delay', 'attempt')
+    name = 'retrying'
+
+    def __init__(self, job_id, label, delay, attempt):
+        """
+        Args:
+            job_id: Running job
+            label: Failure category label, e.g. "Network error"
+            delay: Seconds until the next attempt
+            attempt: Number of the next attempt
+        """
+        super().__init__()
+        self.job_id = job_id
+        self.label = label
+        self.delay = delay
+        self.attempt = attempt
+
+    def to_dict(self):
+        return {'job': self.job_id, 'label': self.label, 'delay': self.delay, 'attempt': self.attempt}
+
+
+class Progress(Event):
+    __slots__ = ('job_id', 'data')
+    name = 'progress'
+
+    def __init__(self, job_id, data):
+        super().__init__()
+        self.job_id = job_id
+        self.data = data
+
+    @classmethod
+    def from_hook(cls, job_id, d):
+        return cls(job_id, progress_event(d))
+
+    @property
+    def coalesce_key(self):
+        # Only ticks; status changes (stream finished, error) are all kept
+        return ('progress', self.job_id) if self.data['status'] == 'downloading' else None
+
+    def to_dict(self):
+        return dict(self.data, job=self.job_id)
+
+
+class PostProcess(Event):
+    __slots__ = ('job_id', 'data')
+    name = 'postprocessor'
+
+    def __init__(self, job_id, data):
+        super().__init__()
+        self.job_id = job_id
+        self.data = data
+
+    @classmethod
+    def from_hook(cls, job_id, d):
+        return cls(job_id, postprocessor_event(d))
+
+    def to_dict(self):
+        return dict(self.data, job=self.job_id)
+
+
+class LogMessage(Event):
+    __slots__ = ('message',)
+    name = 'log'
+
+    def __init__(self, message):
+        super().__init__()
+        self.message = message
+
+    def to_dict(self):
+        return {'message': self.message}
+
+
+class QueueChanged(Event):
+    __slots__ = ('length', 'paused')
+    name = 'queue'
+    droppable = False  # Persistence saves the queue on it
+
+    def __init__(self, length, paused=False):
+        super().__init__()
+        self.length = length
+        self.paused = paused
+
+    @property
+    def coalesce_key(self):
+        return 'queue'
+
+    def to_dict(self):
+        return {'length': self.length, 'paused': self.paused}
+
+
+class StartNext(Event):
+    """
+    Ask the UI to start the next queued job, unless one is running.
+
+    Enqueues from the instance handoff, API and import threads publish this
+    instead of starting the job themselves, so loading the job into the
+    form happens on the UI subscriber's thread. The slot itself is claimed
+    through DownloadSlot, which is safe from any thread.
+    """
+
+    __slots__ = ()
+    name = 'start_next'
+    droppable = False
+
+    @property
+    def coalesce_key(self):
+        return 'start_next'
+
+
+class Subscription:
+    """
+    One consumer: a bounded queue drained by its own daemon thread.
+
+    offer() never waits for the consumer. A coalescable event replaces its
+    pending predecessor and moves to the back, so it is never delivered
+    ahead of events published before it. When the queue is full the policy
+    decides whether the oldest droppable pending event or the new event is
+    dropped; control events are queued regardless.
+    """
+
+    def __init__(self, handler, types=None, maxsize=256, policy=DROP_OLDEST, coalesce=True, name=None):
+        self.handler = handler
+        self.types = types
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce = coalesce
+        self.name = name or getattr(handler, '__name__', 'subscriber')
+        self.delivered = self.dropped = self.coalesced = self.errors = 0
+        self._pending = OrderedDict()  # coalesce key or sequence number -> event
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        threading.Thread(target=self._run, name=f"events-{self.name}", daemon=True).start()
+
+    def wants(self, event):
+        return self.types is None or isinstance(event, self.types)
+
+    def offer(self, event):
+        """Queue an event for this consumer without blocking on it."""
+        key = event.coalesce_key if self.coalesce else None
+        with self._cond:
+            if self._closed:
+                return
+            if key is not None and key in self._pending:
+                self._pending[key] = event
+                self._pending.move_to_end(key)
+                self.coalesced += 1
+                return
+            if len(self._pending) >= self.maxsize and not self._make_room(event):
+                return
+            self._pending[next(self._seq) if key is None else key] = event
+            self._cond.notify()
+
+    def _make_room(self, event):
+        """Apply the policy to a full queue; False if event is dropped (lock held)."""
+        if self.policy == DROP_NEWEST:
+            if event.droppable:
+                self.dropped += 1
+                return False
+            return True
+        for pending_key, pending in self._pending.items():
+            if pending.droppable:
+                del self._pending[pending_key]
+                self.dropped += 1
+                return True
+        return True  # Only control events pending: grow past maxsize
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify()
+
+    def stats(self):
+        return {'name': self.name, 'queued': len(self._pending), 'delivered': self.delivered,
+                'dropped': self.dropped, 'coalesced': self.coalesced, 'errors': self.errors}
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                _, event = self._pending.popitem(last=False)
+            try:
+                self.handler(event)
+                self.delivered += 1
+            except Exception:
+                self.errors += 1  # A failing consumer mustn't stop its own queue
+
+
+class EventBus:
+    """
+    Fans published events out to subscriptions.
+
+    publish() costs a type check and a short lock per subscriber, so it is
+    safe to call from yt-dlp hooks on the download thread: however slow a
+    consumer is (UI repaint, notification, disk), it only falls behind in
+    its own queue.
+    """
+
+    def __init__(self):
+        self._subscriptions = ()
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler, types=None, maxsize=256, policy=DROP_OLDEST, coalesce=True, name=None):
+        """
+        Register a consumer.
+
+        Args:
+            handler: Called with each event on the subscription's thread
+            types: Event class or tuple of classes to receive (default: all)
+            maxsize: Pending events kept before the policy applies
+            policy: DROP_OLDEST or DROP_NEWEST
+            coalesce: Replace pending progress ticks/queue changes with newer ones
+            name: Label for stats (default: handler name)
+
+        Returns:
+            Subscription
+        """
+        sub = Subscription(handler, types, maxsize, policy, coalesce, name)
+        with self._lock:
+            self._subscriptions = self._subscriptions + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if s is not sub)
+        sub.close()
+
+    def publish(self, event):
+        """Deliver an event to every interested subscription (non-blocking)."""
+        for sub in self._subscriptions:
+            if sub.wants(event):
+                sub.offer(event)
+
+    def stats(self):
+        return [sub.stats() for sub in self._subscriptions]
+
+    def close(self):
+        with self._lock:
+            subs, self._subscriptions = self._subscriptions, ()
+        for sub in subs:
+            sub.close()
+
+
+class EventMetrics:
+    """Counters kept by a metrics subscription."""
+
+    def __init__(self):
+        self.events = Counter()  # event name -> count
+        self.outcomes = Counter()  # 'success' / 'failed' / 'cancelled' -> jobs
+        self.bytes_downloaded = 0
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        with self._lock:
+            self.events[event.name] += 1
+            if isinstance(event, Progress):
+                data = event.data
+                # Counted once all streams of a format are done (combined bytes)
+                if data['status'] == 'finished' and not data['pending']:
+                    self.bytes_downloaded += data['downloaded_bytes'] or 0
+            elif isinstance(event, JobFinished):
+                result = event.result
+                if result['success']:
+                    outcome = 'success'
+                else:
+                    outcome = 'cancelled' if result['error'] == 'Cancelled' else 'failed'
+                self.outcomes[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'events': dict(self.events), 'jobs': dict(self.outcomes),
+                    'bytes_downloaded': self.bytes_downloaded}
@@ -0,0 +1,176 @@
+"""Queue-level ETA forecasting from sizes, throughput and encode speeds."""
+
+import threading
+import time
+from itertools import accumulate
+
+from core.bandwidth import AUDIO_BITRATE, DEFAULT_DURATION, quality_height, typical_ladder
+from core.persistence import JsonStore
+from core.scheduler import ASSUMED_RATE
+
+# Media seconds processed per wall second, per postprocessor, until measured
+DEFAULT_SPEEDS = {
+    'CompatEncode': 2.0,
+    'PooledExtractAudio': 40.0,
+    'DeriveOutputs': 20.0,
+}
+
+# Weight of each new measurement in the encode speed averages
+SPEED_ALPHA = 0.3
+
+
+def estimate_bytes(settings, duration=None, filesize=None):
+    """Download size of a job from metadata, or from duration and typical bitrates."""
+    duration = duration or DEFAULT_DURATION
+    if settings.get('audio'):
+        return AUDIO_BITRATE / 8 * duration
+    if filesize:
+        return filesize
+    ladder = typical_ladder(duration)
+    return ladder.get(quality_height(settings.get('quality'))) or ladder[1080]
+
+
+def postprocessors_for(settings):
+    """Postprocessors with real encode cost that a job will run."""
+    pps = []
+    if settings.get('audio'):
+        pps.append('PooledExtractAudio')
+    elif settings.get('compat', True):
+        pps.append('CompatEncode')
+    if settings.get('outputs'):
+        pps.append('DeriveOutputs')
+    return pps
+
+
+class EncodeSpeeds:
+    """Smoothed encode speed (realtime multiples) per postprocessor, persisted."""
+
+    def __init__(self, speeds_file=None):
+        self.store = JsonStore(speeds_file, default=dict) if speeds_file else None
+        self._speeds = dict(DEFAULT_SPEEDS)
+        if self.store:
+            self._speeds.update(self.store.load())
+        self._started = {}  # (postprocessor, filepath) -> monotonic start
+        self._lock = threading.Lock()
+
+    def seconds(self, postprocessor, duration):
+        return (duration or DEFAULT_DURATION) / self._speeds.get(postprocessor, 20.0)
+
+    def on_postprocessor(self, d):
+        """Record a yt-dlp postprocessor hook dict."""
+        info = d.get('info_dict') or {}
+        self.record(d.get('postprocessor'), d['status'], info.get('filepath'), info.get('duration'))
+
+    def record(self, postprocessor, status, filepath, duration, now=None):
+        """
+        Record a postprocessor status change.
+
+        Args:
+            postprocessor: Postprocessor name
+            status: 'started', 'processing' or 'finished'
+            filepath: File being processed (pairs start with finish)
+            duration: Media length in seconds, if known
+            now: Monotonic time of the change (default: now)
+        """
+        if postprocessor not in DEFAULT_SPEEDS:
+            return
+        key = (postprocessor, filepath)
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if status == 'started':
+                self._started[key] = now
+            elif status == 'finished' and key in self._started:
+                elapsed = now - self._started.pop(key)
+                if elapsed < 1 or not duration:
+                    return  # Remux or unknown length: says nothing about encode speed
+                speed = duration / elapsed
+                self._speeds[postprocessor] += SPEED_ALPHA * (speed - self._speeds[postprocessor])
+                if self.store:
+                    self.store.set(self._speeds)
+
+
+class QueueForecast:
+    """
+    ETA for the running job and every queued one.
+
+    Queue costs (bytes to download, seconds to encode) are summed once per
+    queue change in set_queue(); a progress tick only updates the running
+    job's remaining bytes, so job_eta() and queue_eta() are O(1). Jobs are
+    assumed to run one after another, with encodes after each download.
+    """
+
+    def __init__(self, throughput, speeds):
+        """
+        Args:
+            throughput: ThroughputModel for the link
+            speeds: EncodeSpeeds for transcode time
+        """
+        self.throughput = throughput
+        self.speeds = speeds
+        self._queue_bytes = []  # cumulative, per queued item
+        self._queue_encode = []
+        self._current = None
+        self._lock = threading.Lock()
+
+    def _rate(self):
+        return self.throughput.rate or ASSUMED_RATE
+
+    def _costs(self, settings, duration=None, filesize=None):
+        encode = sum(self.speeds.seconds(pp, duration) for pp in postprocessors_for(settings))
+        return estimate_bytes(settings, duration, filesize), encode
+
+    def set_queue(self, items):
+        """Queued items in the order they'll run."""
+        costs = [self._costs(i.get('settings', {}), i.get('duration'), i.get('filesize'))
+                 for i in items]
+        with self._lock:
+            self._queue_bytes = list(accumulate(c[0] for c in costs))
+            self._queue_encode = list(accumulate(c[1] for c in costs))
+
+    def start_job(self, settings, info=None):
+        """A job started; info is its resolved info dict if already known."""
+        info = info or {}
+        duration = info.get('duration')
+        total, encode = self._costs(settings, duration,
+                                    info.get('filesize') or info.get('filesize_approx'))
+        with self._lock:
+            self._current = {'total': total, 'done': 0, 'encode': encode}
+
+    def finish_job(self):
+        with self._lock:
+            self._current = None
+
+    def on_progress(self, d):
+        """Record a progress dict for the running job."""
+        current = self._current
+        if current is None:
+            return
+        combined = d.get('combined') or {}
+        total = combined.get('total_bytes') or d.get('total_bytes') or d.get('total_bytes_estimate')
+        done = combined.get('downloaded_bytes') or d.get('downloaded_bytes')
+        if total:
+            current['total'] = total
+        if done is not None:
+            current['done'] = done
+
+    def job_eta(self):
+        """Seconds until the running job is done (download and encodes), or None."""
+        current = self._current
+        if current is None:
+            return None
+        remaining = max(current['total'] - current['done'], 0)
+        return remaining / self._rate() + current['encode']
+
+    def queue_eta(self):
+        """Seconds until the running job and the whole queue are done."""
+        with self._lock:
+            queued_bytes = self._queue_bytes[-1] if self._queue_bytes else 0
+            queued_encode = self._queue_encode[-1] if self._queue_encode else 0
+        return (self.job_eta() or 0) + queued_bytes / self._rate() + queued_encode
+
+    def item_etas(self):
+        """Seconds until each queued item is done, in queue order."""
+        base = self.job_eta() or 0
+        rate = self._rate()
+        with self._lock:
+            return [base + b / rate + e for b, e in zip(self._queue_bytes, self._queue_encode)]
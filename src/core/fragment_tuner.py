@@ -0,0 +1,158 @@
+"""Adaptive fragment concurrency and chunk size for DASH/HLS downloads."""
+
+import threading
+import time
+
+from core.persistence import JsonStore
+
+# Global ceiling on parallel fragment requests for one job
+MAX_FRAGMENTS = 8
+
+DEFAULT_CHUNK = 10 * 1024 * 1024
+MIN_CHUNK = 1024 * 1024
+MAX_CHUNK = 64 * 1024 * 1024
+
+# Fraction of fragments retried above which parallelism is cut back
+ERROR_THRESHOLD = 0.05
+
+# Relative throughput gain needed to keep climbing
+GAIN_THRESHOLD = 0.10
+
+
+class JobStats:
+    """Throughput and error counters for one download, fed by progress hooks."""
+
+    def __init__(self, site, fragments):
+        self.site = site
+        self.fragments = fragments
+        self.started = None
+        self.finished = None
+        self.bytes = {}  # filename -> downloaded bytes
+        self.fragment_count = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def on_progress(self, d):
+        """Record a yt-dlp progress dict."""
+        with self._lock:
+            now = time.monotonic()
+            if self.started is None:
+                self.started = now
+            self.finished = now
+            name = d.get('filename') or d.get('tmpfilename') or ''
+            downloaded = d.get('downloaded_bytes') or d.get('total_bytes') or 0
+            self.bytes[name] = max(self.bytes.get(name, 0), downloaded)
+            if d.get('fragment_count'):
+                self.fragment_count = max(self.fragment_count, d['fragment_count'])
+
+    def on_retry(self):
+        """Record one retried request."""
+        with self._lock:
+            self.retries += 1
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return self.finished - self.started
+
+    @property
+    def total_bytes(self):
+        return sum(self.bytes.values())
+
+
+class FragmentTuner:
+    """
+    Hill-climbs fragment parallelism per site from measured jobs.
+
+    After each fragmented download the aggregate throughput at the
+    parallelism used is compared with the other levels tried: a clear gain
+    over the level below probes one step higher, otherwise the tuner settles
+    on the best level seen, and a high retry rate halves parallelism. Chunk size for ranged HTTP downloads
+    grows with per-connection throughput and shrinks on errors. The result
+    is clamped by MAX_FRAGMENTS and by the site's request budget.
+    """
+
+    def __init__(self, tuning_file=None, host_limiter=None):
+        """
+        Initialize tuner.
+
+        Args:
+            tuning_file: JSON file to persist learned settings (optional)
+            host_limiter: HostLimiter whose request rate caps parallelism (optional)
+        """
+        self.limiter = host_limiter
+        self.store = JsonStore(tuning_file, default=dict) if tuning_file else None
+        self._sites = dict(self.store.load()) if self.store else {}
+        self._lock = threading.Lock()
+
+    def _site(self, site):
+        state = self._sites.get(site)
+        if state is None:
+            state = {'fragments': 2, 'chunk': DEFAULT_CHUNK, 'throughput': {}}
+            self._sites[site] = state
+        return state
+
+    def _cap(self, site):
+        """Highest parallelism allowed for site right now."""
+        cap = MAX_FRAGMENTS
+        if self.limiter:
+            limits = self.limiter.limits(site)
+            cap = min(cap, max(1, int(limits['rate'] // 2)))
+        return cap
+
+    def options_for(self, site):
+        """yt-dlp options for the next job against site."""
+        with self._lock:
+            state = self._site(site)
+            return {
+                'concurrent_fragment_downloads': max(1, min(state['fragments'], self._cap(site))),
+                'http_chunk_size': state['chunk'],
+            }
+
+    def start_job(self, site, fragments):
+        """Create a stats collector for a job using the given parallelism."""
+        return JobStats(site, fragments)
+
+    def finish(self, stats):
+        """Learn from a completed job."""
+        if stats.elapsed < 2 or stats.total_bytes < 1024 * 1024:
+            return  # Too small to say anything about throughput
+
+        throughput = stats.total_bytes / stats.elapsed
+        with self._lock:
+            state = self._site(stats.site)
+            n = stats.fragments
+            key = str(n)  # JSON object keys are strings
+
+            # Exponentially weighted throughput per parallelism level
+            previous = state['throughput'].get(key)
+            state['throughput'][key] = throughput if previous is None else 0.7 * previous + 0.3 * throughput
+
+            if stats.fragment_count > 1:
+                error_rate = stats.retries / stats.fragment_count
+                measured = state['throughput']
+                best = max(measured, key=lambda k: measured[k])
+                if error_rate > ERROR_THRESHOLD:
+                    state['fragments'] = max(1, n // 2)
+                elif best == key:
+                    # Best so far: probe one level up if it hasn't been measured,
+                    # but only while the last step up still paid off
+                    below = measured.get(str(n - 1))
+                    paid_off = below is None or measured[key] > below * (1 + GAIN_THRESHOLD)
+                    if str(n + 1) not in measured and paid_off:
+                        state['fragments'] = min(self._cap(stats.site), n + 1)
+                    else:
+                        state['fragments'] = n
+                else:
+                    state['fragments'] = int(best)
+            else:
+                # Single-file HTTP: tune ranged request size instead
+                if stats.retries:
+                    state['chunk'] = max(MIN_CHUNK, state['chunk'] // 2)
+                elif throughput * 5 > state['chunk']:
+                    # Chunks finishing in under ~5s waste round-trips
+                    state['chunk'] = min(MAX_CHUNK, state['chunk'] * 2)
+
+            if self.store:
+                self.store.set(self._sites)
@@ -0,0 +1,205 @@
+"""Per-host concurrency caps, request pacing and adaptive backoff."""
+
+import contextlib
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from core.persistence import JsonStore
+
+# Status codes treated as "slow down" signals. 403 isn't one: it is more
+# often an expired format URL or a login wall than rate limiting, and bot
+# checks are caught by their error message instead (report_throttled).
+THROTTLE_STATUSES = {429, 503}
+
+# Second-level labels that sit under a country TLD (e.g. example.co.uk)
+_SHARED_SLDS = {'co', 'com', 'net', 'org', 'gov', 'ac', 'edu', 'ne', 'or'}
+
+
+def host_key(url):
+    """
+    Group a URL's host by site, so CDN shards share one limit.
+
+    e.g. rr3---sn-abc.googlevideo.com -> googlevideo.com
+    """
+    try:
+        host = (urlsplit(url).hostname or '').lower()
+    except ValueError:
+        return ''
+    labels = host.split('.')
+    if len(labels) <= 2 or host.replace('.', '').isdigit():
+        return host
+    if len(labels[-1]) == 2 and labels[-2] in _SHARED_SLDS:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter:
+    """
+    Shared limiter for extraction and transfer traffic.
+
+    Each site gets a concurrency cap for whole jobs and a token bucket for
+    individual HTTP requests. Throttling responses halve the request rate,
+    drop the cap by one and pause the site (honouring Retry-After); sustained
+    success slowly raises them again. Learned limits persist across restarts.
+    """
+
+    def __init__(self, limits_file=None, default_rate=20.0, default_concurrency=2,
+                 max_rate=50.0, max_concurrency=4, min_rate=0.5):
+        """
+        Initialize host limiter.
+
+        Args:
+            limits_file: JSON file to persist learned per-host limits (optional)
+            default_rate: Requests per second for a site with no history
+            default_concurrency: Concurrent jobs per site with no history
+            max_rate: Upper bound for recovered request rate
+            max_concurrency: Upper bound for recovered concurrency
+            min_rate: Lower bound for backed-off request rate
+        """
+        self.default_rate = default_rate
+        self.default_concurrency = default_concurrency
+        self.max_rate = max_rate
+        self.max_concurrency = max_concurrency
+        self.min_rate = min_rate
+        self.store = JsonStore(limits_file, default=dict) if limits_file else None
+        self._saved = dict(self.store.load()) if self.store else {}
+        self._hosts = {}
+        self._cond = threading.Condition()
+
+    def _state(self, host):
+        """Get (or create) mutable state for host. Caller holds the lock."""
+        state = self._hosts.get(host)
+        if state is None:
+            saved = self._saved.get(host, {})
+            rate = saved.get('rate', self.default_rate)
+            state = {
+                'rate': rate,
+                'concurrency': saved.get('concurrency', self.default_concurrency),
+                'tokens': max(1.0, rate),
+                'refilled': time.monotonic(),
+                'active': 0,
+                'blocked_until': 0.0,
+                'strikes': 0,
+                'successes': 0,
+            }
+            self._hosts[host] = state
+        return state
+
+    def limits(self, host):
+        """Current {'rate', 'concurrency'} for a host."""
+        with self._cond:
+            state = self._state(host)
+            return {'rate': state['rate'], 'concurrency': state['concurrency']}
+
+    @contextlib.contextmanager
+    def slot(self, host, cancelled=None):
+        """
+        Hold one of the host's concurrent job slots.
+
+        Args:
+            host: Site key (see host_key)
+            cancelled: Callable returning True to abandon waiting (optional)
+        """
+        with self._cond:
+            while True:
+                state = self._state(host)
+                if state['active'] < state['concurrency']:
+                    state['active'] += 1
+                    break
+                if cancelled and cancelled():
+                    raise Exception("Download cancelled by user.")
+                self._cond.wait(timeout=0.5)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._state(host)['active'] -= 1
+                self._cond.notify_all()
+
+    def throttle(self, host):
+        """Block until a request to host is allowed by its pause and token bucket."""
+        while True:
+            with self._cond:
+                state = self._state(host)
+                now = time.monotonic()
+                wait = state['blocked_until'] - now
+                if wait <= 0:
+                    elapsed = now - state['refilled']
+                    burst = max(1.0, state['rate'] * 2)
+                    state['tokens'] = min(burst, state['tokens'] + elapsed * state['rate'])
+                    state['refilled'] = now
+                    if state['tokens'] >= 1:
+                        state['tokens'] -= 1
+                        return
+                    wait = (1 - state['tokens']) / state['rate']
+            time.sleep(min(wait, 5))
+
+    def report(self, host, status, retry_after=None):
+        """
+        Feed a response status back into the host's limits.
+
+        Args:
+            host: Site key
+            status: HTTP status code (None counts as success; other errors
+                change nothing)
+            retry_after: Retry-After header value or seconds (optional)
+        """
+        if status is not None and status >= 400 and status not in THROTTLE_STATUSES:
+            return
+        with self._cond:
+            state = self._state(host)
+            if status in THROTTLE_STATUSES:
+                state['strikes'] += 1
+                state['successes'] = 0
+                state['rate'] = max(self.min_rate, state['rate'] / 2)
+                state['concurrency'] = max(1, state['concurrency'] - 1)
+                state['tokens'] = 0.0
+                delay = parse_retry_after(retry_after) if isinstance(retry_after, str) else retry_after
+                if delay is None:
+                    delay = min(300, 2 ** state['strikes'])
+                state['blocked_until'] = max(state['blocked_until'], time.monotonic() + delay)
+                self._persist(host, state)
+                return
+
+            state['successes'] += 1
+            state['strikes'] = 0
+            changed = False
+            if state['successes'] % 20 == 0 and state['rate'] < self.max_rate:
+                state['rate'] = min(self.max_rate, state['rate'] + 1)
+                changed = True
+            if state['successes'] % 200 == 0 and state['concurrency'] < self.max_concurrency:
+                state['concurrency'] += 1
+                self._cond.notify_all()
+                changed = True
+            if changed:
+                self._persist(host, state)
+
+    def report_throttled(self, host, retry_after=None):
+        """Record a throttling signal that didn't come with a status code."""
+        self.report(host, 429, retry_after)
+
+    def _persist(self, host, state):
+        """Remember learned limits (caller holds the lock)."""
+        if not self.store:
+            return
+        self._saved[host] = {
+            'rate': round(state['rate'], 2),
+            'concurrency': state['concurrency'],
+        }
+        self.store.set(self._saved)
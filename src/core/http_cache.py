@@ -0,0 +1,318 @@
+"""Disk-backed cache for extractor HTTP requests (pages and API calls)."""
+
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+
+from yt_dlp.networking.common import Request, Response
+from yt_dlp.networking.exceptions import HTTPError, TransportError
+
+from core.persistence import JsonStore
+
+MODES = ('cache', 'record', 'replay')
+
+# (URL pattern, seconds to serve without revalidating); first match wins, 0 = never cache.
+# Extractor endpoints mostly send no-store, so these rules decide instead; URLs
+# no rule matches are never cached.
+DEFAULT_TTLS = [
+    # Player JS is immutable per URL
+    (r'/s/player/[^/]+/.*\.js', 7 * 24 * 3600),
+    # Player responses carry signed media URLs that expire
+    (r'/youtubei/v\d+/player', 30 * 60),
+    (r'youtube\.com/watch\?', 30 * 60),
+    (r'/youtubei/v\d+/(browse|next|search)', 60 * 60),
+    (r'/oembed', 24 * 3600),
+]
+
+# Streaming manifests (live playlists, rotating signed URLs) are never cached,
+# whatever a rule or the Content-Type says
+_MANIFEST_URL_RE = re.compile(r'\.(m3u8|mpd)([?#]|$)|/manifest/', re.IGNORECASE)
+
+# Content types worth caching; everything else (media, manifests) passes through
+_CACHEABLE_TYPE_RE = re.compile(
+    r'^(text/(html|plain|xml|javascript)|application/([\w.-]+\+)?(json|xml|javascript|x-javascript))\b')
+_MANIFEST_TYPE_RE = re.compile(r'mpegurl|dash\+xml')
+
+# Largest single response kept
+MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+# Request headers left out of the cache key (the cache adds them itself)
+_UNKEYED_HEADERS = ('if-none-match', 'if-modified-since')
+
+# Response headers stored with the body
+# (bodies are stored decoded, so no Content-Encoding)
+KEPT_HEADERS = ('content-type', 'etag', 'last-modified', 'date')
+
+
+class CacheMiss(TransportError):
+    """Replay mode was asked for a request that was never recorded."""
+
+
+class _PrefixedReader(io.RawIOBase):
+    """Reads already-buffered bytes, then the rest of the original response."""
+
+    def __init__(self, prefix, rest):
+        self._prefix = io.BytesIO(prefix)
+        self._rest = rest
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._prefix.readinto(b)
+        if n:
+            return n
+        data = self._rest.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._rest.close()
+        super().close()
+
+
+def _normalize(req):
+    """Return a networking Request, or None for request types the cache skips."""
+    if isinstance(req, str):
+        return Request(req)
+    if isinstance(req, Request):
+        return req
+    return None
+
+
+class HttpCache:
+    """
+    LRU, size-capped cache of extractor responses shared by all YoutubeDL instances.
+
+    Only GET/POST requests to URLs with a TTL rule, without a Range header,
+    whose 200 responses are HTML, JSON, XML or JavaScript are stored, so
+    media bytes and streaming manifests never enter the cache. Entries are
+    keyed on method, URL, body and request headers. Fresh entries are served directly;
+    stale ones with an ETag or Last-Modified are revalidated with a
+    conditional request and reused on 304.
+
+    Modes:
+        cache: normal operation
+        record: always fetch, store every cacheable response regardless of TTL
+        replay: serve only stored responses, ignoring TTLs; anything else fails
+            with CacheMiss, so extraction can be benchmarked offline
+    """
+
+    def __init__(self, cache_dir, max_bytes=200 * 1024 * 1024, mode='cache', ttls=None):
+        """
+        Initialize cache.
+
+        Args:
+            cache_dir: Directory for bodies and the index (created if missing)
+            max_bytes: Total body size kept before least recently used entries go
+            mode: One of MODES
+            ttls: [(url_regex, seconds)] overriding DEFAULT_TTLS
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or DEFAULT_TTLS)]
+        os.makedirs(cache_dir, exist_ok=True)
+        self.store = JsonStore(os.path.join(cache_dir, 'index.json'), default=dict, debounce=2)
+        self._index = self.store.load()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.revalidated = 0
+
+    def ttl_for(self, url):
+        if _MANIFEST_URL_RE.search(url):
+            return 0
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return 0
+
+    @staticmethod
+    def _key(req, scope):
+        digest = hashlib.sha256()
+        headers = sorted((k.lower(), str(v)) for k, v in req.headers.items()
+                         if k.lower() not in _UNKEYED_HEADERS)
+        parts = [scope or '', req.method, req.url] + [f"{k}: {v}" for k, v in headers]
+        for part in parts:
+            digest.update(part.encode('utf-8', 'replace') + b'\0')
+        digest.update(req.data or b'')
+        return digest.hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _response(self, entry, body):
+        headers = dict(entry['headers'])
+        headers['Content-Length'] = str(len(body))
+        return Response(io.BytesIO(body), entry['url'], headers, status=200)
+
+    def _lookup(self, key):
+        """Entry and body for key, or (None, None)."""
+        with self._lock:
+            entry = self._index.get(key)
+        if entry is None:
+            return None, None
+        try:
+            with open(self._body_path(key), 'rb') as f:
+                return entry, f.read()
+        except OSError:
+            with self._lock:
+                self._index.pop(key, None)
+            return None, None
+
+    def _touch(self, key, **changes):
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None:
+                entry.update(changes, used=time.time())
+                self.store.set(self._index)
+
+    def _save(self, key, req, response, body, ttl):
+        path = self._body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = path + '.tmp'
+        with open(temp, 'wb') as f:
+            f.write(body)
+        os.replace(temp, path)
+
+        now = time.time()
+        headers = {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+        with self._lock:
+            self._index[key] = {
+                'url': response.url or req.url,
+                'headers': headers,
+                'size': len(body),
+                'stored': now,
+                'expires': now + ttl,
+                'used': now,
+            }
+            self._evict()
+            self.store.set(self._index)
+
+    def _evict(self):
+        total = sum(e['size'] for e in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self._index, key=lambda k: self._index[k]['used']):
+            total -= self._index.pop(key)['size']
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+            if total <= self.max_bytes:
+                break
+
+    def _cacheable(self, response):
+        content_type = (response.headers.get('Content-Type') or '').lower()
+        if response.status != 200 or _MANIFEST_TYPE_RE.search(content_type) \
+                or not _CACHEABLE_TYPE_RE.match(content_type):
+            return False
+        length = response.headers.get('Content-Length')
+        return not (length and length.isdigit() and int(length) > MAX_ENTRY_BYTES)
+
+    def _store_response(self, key, req, response, ttl):
+        """Read and store response if eligible; return a response for the caller."""
+        if not self._cacheable(response):
+            return response
+        chunks, size = [], 0
+        while size <= MAX_ENTRY_BYTES:
+            chunk = response.read(MAX_ENTRY_BYTES + 1 - size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        body = b''.join(chunks)
+        if len(body) > MAX_ENTRY_BYTES:
+            # Longer than announced: hand the rest through untouched
+            return Response(io.BufferedReader(_PrefixedReader(body, response.fp)),
+                            response.url, response.headers, response.status, response.reason)
+        response.close()
+        if not body.lstrip().startswith(b'#EXTM3U'):  # HLS playlists sent as text/plain
+            try:
+                self._save(key, req, response, body, ttl)
+            except OSError:
+                pass  # A full or read-only disk only costs the cache
+        return Response(io.BytesIO(body), response.url, response.headers, response.status,
+                        response.reason)
+
+    def fetch(self, req, send, scope=None):
+        """
+        Serve req from the cache or via send(req).
+
+        Args:
+            req: Request or URL as passed to YoutubeDL.urlopen
+            send: Performs the real request
+            scope: Distinguishes otherwise equal requests (e.g. the cookies in use)
+        """
+        request = _normalize(req)
+        if request is None or request.method not in ('GET', 'POST') or 'Range' in request.headers \
+                or not isinstance(request.data, (bytes, type(None))):
+            return send(req)
+        ttl = self.ttl_for(request.url)
+        if ttl <= 0 and (self.mode == 'cache' or _MANIFEST_URL_RE.search(request.url)):
+            return send(req)
+
+        key = self._key(request, scope)
+        if self.mode == 'record':
+            return self._store_response(key, request, send(request), ttl)
+
+        entry, body = self._lookup(key)
+        if self.mode == 'replay':
+            if entry is None:
+                raise CacheMiss(f"Not in recording: {request.method} {request.url}")
+            self.hits += 1
+            self._touch(key)
+            return self._response(entry, body)
+
+        if entry is not None and entry['expires'] > time.time():
+            self.hits += 1
+            self._touch(key)
+            return self._response(entry, body)
+
+        if entry is not None:
+            validators = {}
+            headers = {k.lower(): v for k, v in entry['headers'].items()}
+            if headers.get('etag'):
+                validators['If-None-Match'] = headers['etag']
+            if headers.get('last-modified'):
+                validators['If-Modified-Since'] = headers['last-modified']
+            if validators:
+                conditional = request.copy()
+                conditional.headers.update(validators)
+                try:
+                    return self._store_response(key, request, send(conditional), ttl)
+                except HTTPError as e:
+                    if e.status != 304:
+                        raise
+                    e.response.close()
+                self.revalidated += 1
+                self._touch(key, expires=time.time() + ttl)
+                return self._response(entry, body)
+
+        self.misses += 1
+        return self._store_response(key, request, send(request), ttl)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._index),
+                'bytes': sum(e['size'] for e in self._index.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+            }
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    os.remove(self._body_path(key))
+                except OSError:
+                    pass
+            self._index.clear()
+            self.store.set(self._index)
@@ -0,0 +1,143 @@
+"""Shared HTTP client with keep-alive connection pooling."""
+
+import http.client
+import json
+import threading
+from urllib.parse import urlsplit
+
+from core.constants import APP_VERSION
+
+
+class HttpResponse:
+    """Fully-read HTTP response."""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers  # lower-cased header names
+        self.body = body
+
+    def json(self):
+        """Decode body as JSON."""
+        return json.loads(self.body.decode('utf-8'))
+
+
+class HttpClient:
+    """Small thread-safe HTTP/1.1 client that reuses connections per host."""
+
+    def __init__(self, user_agent=None, max_idle_per_host=4, timeout=10):
+        """
+        Initialize HTTP client.
+
+        Args:
+            user_agent: User-Agent header sent with every request
+            max_idle_per_host: Idle keep-alive connections kept per host
+            timeout: Default socket timeout in seconds
+        """
+        self.user_agent = user_agent or f"Yard/{APP_VERSION}"
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self._idle = {}  # (scheme, host, port) -> [connection]
+        self._lock = threading.Lock()
+
+    def _checkout(self, key, timeout):
+        """Take an idle connection for key or open a new one."""
+        with self._lock:
+            conns = self._idle.get(key)
+            if conns:
+                conn = conns.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+
+        scheme, host, port = key
+        conn_cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return conn_cls(host, port, timeout=timeout), False
+
+    def _checkin(self, key, conn):
+        """Return a connection to the idle pool, closing it if the pool is full."""
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self.max_idle_per_host:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, headers=None, body=None, timeout=None):
+        """
+        Send a request and read the full response.
+
+        Args:
+            method: HTTP method
+            url: Absolute http(s) URL
+            headers: Extra request headers (optional)
+            body: Request body bytes (optional)
+            timeout: Socket timeout in seconds (optional)
+
+        Returns:
+            HttpResponse
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {scheme}")
+
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        req_headers = {'User-Agent': self.user_agent, 'Accept-Encoding': 'identity'}
+        req_headers.update(headers or {})
+        timeout = timeout or self.timeout
+
+        # A pooled connection may have been closed by the server while idle;
+        # retry such failures once on a fresh connection.
+        for attempt in range(2):
+            conn, reused = self._checkout(key, timeout)
+            try:
+                conn.request(method, path, body=body, headers=req_headers)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+            resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+            if resp.will_close:
+                conn.close()
+            else:
+                self._checkin(key, conn)
+            return HttpResponse(resp.status, resp_headers, data)
+
+    def get(self, url, headers=None, timeout=None):
+        """Send a GET request."""
+        return self.request('GET', url, headers=headers, timeout=timeout)
+
+    def close(self):
+        """Close all idle connections."""
+        with self._lock:
+            pools = list(self._idle.values())
+            self._idle.clear()
+        for conns in pools:
+            for conn in conns:
+                conn.close()
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide shared HttpClient."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
@@ -0,0 +1,110 @@
+"""Token-protected JSON-over-HTTP server shared by the worker and job APIs."""
+
+import json
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class JsonServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server with a shared-secret token.
+
+    Handlers can detach() their connection to keep it open after the
+    request (e.g. to hand it to an event stream); the server then leaves
+    closing it to whoever took it over.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, handler_class, token):
+        super().__init__(address, handler_class)
+        self.token = token
+        self._detached = set()
+        self._detached_lock = threading.Lock()
+
+    def detach(self, sock):
+        with self._detached_lock:
+            self._detached.add(sock)
+
+    def shutdown_request(self, request):
+        with self._detached_lock:
+            if request in self._detached:
+                self._detached.discard(request)
+                return
+        super().shutdown_request(request)
+
+
+class JsonRequestHandler(BaseHTTPRequestHandler):
+    """
+    Dispatches authorized requests to route().
+
+    Subclasses implement route(method, parts, query, body), returning
+    (status, payload) or None if the handler already wrote the response.
+    The token is accepted as a Bearer header, or as ?token= for clients
+    that can't set headers (browser EventSource).
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, payload=None):
+        body = json.dumps(payload, default=str).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self, query):
+        expected = self.server.token
+        sent = self.headers.get('Authorization', '')
+        if secrets.compare_digest(sent, f"Bearer {expected}"):
+            return True
+        return secrets.compare_digest(query.get('token', [''])[0], expected)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request too large")
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not isinstance(body, dict):
+            raise ValueError("Expected a JSON object")
+        return body
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if not self._authorized(query):
+            return self.reply(401, {'error': 'unauthorized'})
+        try:
+            body = self._body() if method in ('POST', 'PUT') else {}
+        except ValueError as e:
+            return self.reply(400, {'error': str(e)})
+        parts = [p for p in url.path.split('/') if p]
+        result = self.route(method, parts, query, body)
+        if result is not None:
+            self.reply(*result)
+
+    def route(self, method, parts, query, body):
+        return 404, {'error': 'not found'}
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+
+def serve(server):
+    """Run a server on a daemon thread."""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
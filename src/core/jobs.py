@@ -0,0 +1,158 @@
+"""Compact job records, shared settings profiles and trimmed info dicts."""
+
+import sys
+import threading
+import weakref
+
+# Info dict fields dropped right after extraction: nothing downstream reads
+# them with the options Yard uses, and on large sites they dominate the size
+# (automatic_captions alone lists every translation language). Jobs with
+# custom yt-dlp arguments re-extract the full info instead.
+HEAVY_INFO_FIELDS = (
+    'automatic_captions', 'subtitles', 'thumbnails', 'heatmap', 'description', 'tags',
+    'categories', 'chapters', 'comments',
+)
+
+# Fields kept for each playlist entry
+ENTRY_FIELDS = ('id', 'url', 'webpage_url', 'title', 'duration', 'filesize', 'filesize_approx',
+                'ie_key', '_type')
+
+
+class SettingsProfile(dict):
+    """Read-only settings dict shared by every job with the same settings."""
+
+    __slots__ = ('__weakref__',)
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Settings profiles are shared; copy with dict() before changing")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+
+_profiles = weakref.WeakValueDictionary()
+_profiles_lock = threading.Lock()
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def intern_settings(settings):
+    """
+    Shared SettingsProfile equal to settings.
+
+    Queues usually hold thousands of jobs with a handful of distinct
+    settings; interning stores each combination once.
+    """
+    if isinstance(settings, SettingsProfile):
+        return settings
+    frozen = {k: _freeze(v) for k, v in (settings or {}).items()}
+    key = tuple(sorted(frozen.items()))
+    with _profiles_lock:
+        profile = _profiles.get(key)
+        if profile is None:
+            profile = SettingsProfile(frozen)
+            _profiles[key] = profile
+        return profile
+
+
+_MISSING = object()
+
+
+class JobRecord:
+    """
+    Queue entry with fixed slots instead of a per-job dict.
+
+    Supports the dict operations the queue code uses (item['url'],
+    item.get(...), setdefault, 'key' in item), so it can stand in for the
+    dicts queue items used to be. Keys outside the slots go to a lazily
+    created extra dict.
+    """
+
+    __slots__ = ('id', 'url', 'settings', 'priority', 'submitted', 'duration', 'filesize',
+                 'deadline', 'extra')
+
+    FIELDS = __slots__[:-1]
+
+    def __init__(self, url, settings=None, **fields):
+        self.url = sys.intern(url)
+        self.settings = intern_settings(settings)
+        self.extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, job):
+        if isinstance(job, cls):
+            return job
+        fields = dict(job)
+        return cls(fields.pop('url', ''), fields.pop('settings', None), **fields)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key == 'settings':
+            value = intern_settings(value)
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            return getattr(self, key, default)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def setdefault(self, key, default=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            self[key] = default
+            return self[key]
+        return value
+
+    def to_dict(self):
+        """Plain dict for persistence."""
+        data = {k: getattr(self, k) for k in self.FIELDS if hasattr(self, k)}
+        data['settings'] = dict(self.settings)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"JobRecord({self.to_dict()!r})"
+
+
+def trim_info(info):
+    """
+    Drop info dict fields the pipeline never reads, in place.
+
+    Playlist entries are reduced to what queueing and size estimates use;
+    single videos keep their formats, which the download reuses.
+
+    Returns:
+        dict: The same info dict
+    """
+    if not info:
+        return info
+    for field in HEAVY_INFO_FIELDS:
+        info.pop(field, None)
+    entries = info.get('entries')
+    if entries is not None:
+        info['entries'] = [
+            {k: e[k] for k in ENTRY_FIELDS if k in e} if isinstance(e, dict) else e
+            for e in entries
+        ]
+    return info
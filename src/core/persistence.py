@@ -0,0 +1,251 @@
+"""Atomic, debounced JSON persistence shared by settings, queue and caches."""
+
+import atexit
+import json
+import os
+import shutil
+import threading
+import time
+
+from utils.helpers import atomic_write_json
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Cross-process advisory lock backed by a sidecar .lock file."""
+
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self._fh = None
+
+    def acquire(self):
+        """Acquire the lock, waiting up to timeout seconds."""
+        self._fh = open(self.path, 'a+')
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                if fcntl:
+                    fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    self._fh.seek(0)
+                    msvcrt.locking(self._fh.fileno(), msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                if time.time() >= deadline:
+                    self._fh.close()
+                    self._fh = None
+                    raise TimeoutError(f"Could not lock {self.path}")
+                time.sleep(0.05)
+
+    def release(self):
+        """Release the lock."""
+        if self._fh is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            pass
+        self._fh.close()
+        self._fh = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class _Writer:
+    """Background thread that performs debounced store writes."""
+
+    def __init__(self):
+        self._due = {}  # JsonStore -> monotonic deadline
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def schedule(self, store, delay):
+        """Schedule store to be written after delay (coalescing repeats)."""
+        with self._cond:
+            # Keep the earliest deadline so a steady stream of changes still lands
+            deadline = time.monotonic() + delay
+            self._due[store] = min(self._due.get(store, deadline), deadline)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self, store):
+        """Drop a pending write for store."""
+        with self._cond:
+            self._due.pop(store, None)
+
+    def flush(self, store=None):
+        """Write pending changes now, for one store or all of them."""
+        with self._cond:
+            if store is None:
+                stores = list(self._due)
+                self._due.clear()
+            elif self._due.pop(store, None) is not None:
+                stores = [store]
+            else:
+                stores = []
+        for s in stores:
+            s._write()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due:
+                    if not self._cond.wait(timeout=30):
+                        if not self._due:
+                            self._thread = None
+                            return
+                now = time.monotonic()
+                ready = [s for s, t in self._due.items() if t <= now]
+                if not ready:
+                    self._cond.wait(timeout=min(self._due.values()) - now)
+                    continue
+                for s in ready:
+                    del self._due[s]
+            for s in ready:
+                s._write()
+
+
+_writer = _Writer()
+atexit.register(_writer.flush)
+
+
+def flush_all():
+    """Write every pending store change to disk immediately."""
+    _writer.flush()
+
+
+class JsonStore:
+    """
+    In-memory JSON document persisted atomically in the background.
+
+    Files are stored as {"schema": N, "data": ...}. Files written before
+    versioning existed are treated as schema 0 and migrated on load. A file
+    from a newer version of the app can't be read safely: it is copied to
+    <path>.schema<N> and the store starts from the default.
+    """
+
+    def __init__(self, path, schema_version=1, default=None, migrations=None, debounce=0.5):
+        """
+        Initialize store.
+
+        Args:
+            path: JSON file path
+            schema_version: Current schema version of the data
+            default: Factory for the initial value (e.g. dict or list)
+            migrations: {from_version: func(data) -> data} upgrade steps
+            debounce: Seconds to coalesce changes before writing
+        """
+        self.path = path
+        self.schema_version = schema_version
+        self.default = default or dict
+        self.migrations = migrations or {}
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._data = None
+        self._loaded = False
+        self._dirty = False
+
+    def _read_file(self):
+        """Read and migrate the file contents."""
+        if not os.path.exists(self.path):
+            return self.default()
+
+        with open(self.path, 'r') as f:
+            raw = json.load(f)
+
+        if isinstance(raw, dict) and 'schema' in raw and 'data' in raw:
+            schema, data = raw['schema'], raw['data']
+        else:
+            schema, data = 0, raw
+
+        if schema > self.schema_version:
+            # Written after an upgrade we've since rolled back: keep it for that version
+            shutil.copyfile(self.path, f"{self.path}.schema{schema}")
+            return self.default()
+
+        while schema < self.schema_version:
+            migrate = self.migrations.get(schema)
+            if migrate:
+                data = migrate(data)
+            schema += 1
+        return data
+
+    def load(self):
+        """Load data from disk (once) and return the in-memory copy."""
+        with self._lock:
+            if not self._loaded:
+                try:
+                    self._data = self._read_file()
+                except Exception:
+                    self._data = self.default()
+                self._loaded = True
+            return self._data
+
+    def get(self):
+        """Return the in-memory data, loading it first if needed."""
+        return self.load()
+
+    def set(self, data):
+        """Replace the data and schedule a debounced write."""
+        if isinstance(data, list):
+            data = list(data)
+        elif isinstance(data, dict):
+            data = dict(data)
+        with self._lock:
+            self._data = data
+            self._loaded = True
+            self._dirty = True
+        _writer.schedule(self, self.debounce)
+
+    def delete(self):
+        """Reset to the default value and remove the file."""
+        _writer.cancel(self)
+        with self._write_lock:
+            with self._lock:
+                self._data = self.default()
+                self._loaded = True
+                self._dirty = False
+            try:
+                with FileLock(self.path + '.lock'):
+                    if os.path.exists(self.path):
+                        os.remove(self.path)
+            except Exception:
+                pass
+
+    def flush(self):
+        """Write pending changes now."""
+        _writer.flush(self)
+
+    def _write(self):
+        """Serialize and atomically replace the file under the process lock."""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                payload = {'schema': self.schema_version, 'data': self._data}
+                self._dirty = False
+            try:
+                with FileLock(self.path + '.lock'):
+                    atomic_write_json(self.path, payload)
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                _writer.schedule(self, 5)
@@ -0,0 +1,200 @@
+"""Speculative metadata prefetching for URLs before download starts."""
+
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlparse
+
+
+class MetadataCache:
+    """Small LRU cache of resolved yt-dlp info dicts with expiry."""
+
+    def __init__(self, max_entries=32, ttl=1800):
+        """
+        Initialize metadata cache.
+
+        Args:
+            max_entries: Maximum number of info dicts kept in memory
+            ttl: Seconds an entry stays valid (format URLs expire upstream)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return cached info for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, info = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return info
+
+    def put(self, key, info):
+        """Store info for key, evicting the least recently used entry."""
+        with self._lock:
+            self._entries[key] = (time.time(), info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        """Drop a cached entry."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+class Prefetcher:
+    """Resolves video info in the background so downloads start warm."""
+
+    def __init__(self, fetch_func, cache=None, max_pending=4, log_callback=None, on_result=None):
+        """
+        Initialize prefetcher.
+
+        Args:
+            fetch_func: Called as fetch_func(url, playlist) and returns an info dict
+            cache: MetadataCache to store results in (optional)
+            max_pending: Maximum queued prefetches; oldest are dropped beyond this
+            log_callback: Called for logging messages (optional)
+            on_result: Called as on_result(url, playlist, info) after a fetch (optional)
+        """
+        self.fetch_func = fetch_func
+        self.cache = cache or MetadataCache()
+        self.max_pending = max_pending
+        self.log = log_callback
+        self.on_result = on_result
+        self._pending = deque()
+        self._inflight = {}  # key -> threading.Event
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    @staticmethod
+    def _key(url, playlist):
+        return (url.strip(), bool(playlist))
+
+    def submit(self, url, playlist=False):
+        """
+        Queue a URL for background info extraction.
+
+        Returns:
+            bool: True if the URL was queued, False if skipped
+        """
+        if not url or not url.strip().startswith('http'):
+            return False
+
+        key = self._key(url, playlist)
+        if self.cache.get(key) is not None:
+            return False
+
+        with self._lock:
+            if key in self._inflight or key in self._pending:
+                return False
+            self._cancelled.discard(key)
+            self._pending.append(key)
+            # Bound the backlog so rapid pastes can't pile up work
+            while len(self._pending) > self.max_pending:
+                self._pending.popleft()
+
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        return True
+
+    def cancel(self, url=None, playlist=False):
+        """
+        Cancel prefetching for one URL, or everything if url is None.
+
+        In-flight extractions can't be interrupted; their result is discarded.
+        """
+        with self._lock:
+            if url is None:
+                self._cancelled.update(self._pending)
+                self._cancelled.update(self._inflight)
+                self._pending.clear()
+                return
+
+            key = self._key(url, playlist)
+            try:
+                self._pending.remove(key)
+            except ValueError:
+                pass
+            if key in self._inflight:
+                self._cancelled.add(key)
+
+    def take(self, url, playlist=False, timeout=None):
+        """
+        Get prefetched info for a URL.
+
+        Waits for an in-flight prefetch of the same URL (up to timeout) rather
+        than starting a duplicate extraction. Pending prefetches are dropped.
+
+        Returns:
+            dict or None: Info dict if available
+        """
+        key = self._key(url, playlist)
+        info = self.cache.get(key)
+        if info is not None:
+            return info
+
+        with self._lock:
+            try:
+                self._pending.remove(key)
+            except ValueError:
+                pass
+            event = self._inflight.get(key)
+            self._cancelled.discard(key)
+
+        if event is not None and event.wait(timeout):
+            return self.cache.get(key)
+        return None
+
+    def _warm_dns(self, url):
+        """Resolve the URL's host so the OS resolver cache is warm."""
+        try:
+            host = urlparse(url).hostname
+            if host:
+                socket.getaddrinfo(host, 443, proto=socket.IPPROTO_TCP)
+        except Exception:
+            pass
+
+    def _run(self):
+        """Worker loop; exits once the backlog is empty."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._worker = None
+                    return
+                key = self._pending.popleft()
+                event = threading.Event()
+                self._inflight[key] = event
+
+            url, playlist = key
+            try:
+                self._warm_dns(url)
+                info = self.fetch_func(url, playlist)
+                with self._lock:
+                    keep = key not in self._cancelled
+                if info and keep:
+                    self.cache.put(key, info)
+                    if self.on_result:
+                        self.on_result(url, playlist, info)
+            except Exception as e:
+                if self.log:
+                    self.log(f"Prefetch skipped: {str(e)[:60]}")
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                    self._cancelled.discard(key)
+                event.set()
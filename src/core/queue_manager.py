@@ -1,37 +1,40 @@
 """Queue persistence manager."""
 
-import json
-import os
+from core.jobs import JobRecord
+from core.persistence import JsonStore
 
 
 class QueueManager:
     """Manages download queue persistence."""
     
+    SCHEMA_VERSION = 1
+    
     def __init__(self, queue_file):
         self.queue_file = queue_file
+        self.store = JsonStore(queue_file, self.SCHEMA_VERSION, default=list,
+                               migrations={0: self._migrate_v0})
+    
+    @staticmethod
+    def _migrate_v0(queue):
+        """Unversioned queues may hold bare URL strings; wrap them as items."""
+        return [
+            item if isinstance(item, dict) else {'url': item, 'settings': {}}
+            for item in queue
+        ]
     
     def load(self):
         """Load queue from disk."""
-        try:
-            if os.path.exists(self.queue_file):
-                with open(self.queue_file, 'r') as f:
-                    return json.load(f)
-        except Exception:
-            pass
-        return []
+        queue = self.store.load()
+        return list(queue) if isinstance(queue, list) else []
     
     def save(self, queue):
-        """Save queue to disk."""
-        try:
-            with open(self.queue_file, 'w') as f:
-                json.dump(queue, f)
-        except Exception:
-            pass
+        """Save queue to disk (debounced, atomic)."""
+        self.store.set([job.to_dict() if isinstance(job, JobRecord) else job for job in queue])
     
     def clear(self):
         """Remove queue file."""
-        try:
-            if os.path.exists(self.queue_file):
-                os.remove(self.queue_file)
-        except Exception:
-            pass
+        self.store.delete()
+    
+    def flush(self):
+        """Write pending queue changes immediately."""
+        self.store.flush()
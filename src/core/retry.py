@@ -0,0 +1,152 @@
+"""Failure classification, retry backoff and the persisted failed-jobs list."""
+
+import random
+import socket
+import time
+
+from yt_dlp.networking.exceptions import HTTPError, TransportError
+from yt_dlp.utils import GeoRestrictedError, PostProcessingError
+
+from core.persistence import JsonStore
+
+# Failure categories
+TRANSIENT = 'transient'
+THROTTLED = 'throttled'
+GEO_AUTH = 'geo_auth'
+UNAVAILABLE = 'unavailable'
+FFMPEG = 'ffmpeg'
+UNKNOWN = 'unknown'
+
+CATEGORY_LABELS = {
+    TRANSIENT: "Network error",
+    THROTTLED: "Rate limited",
+    GEO_AUTH: "Geo-blocked or login required",
+    UNAVAILABLE: "Unavailable",
+    FFMPEG: "FFmpeg error",
+    UNKNOWN: "Error",
+}
+
+_MESSAGE_RULES = (
+    (THROTTLED, ("429", "403", "too many requests", "rate-limit", "rate limit", "not a bot")),
+    (GEO_AUTH, ("geo", "not available in your country", "sign in", "login", "log in",
+                "members-only", "private video", "cookies", "age-restricted")),
+    (UNAVAILABLE, ("unavailable", "removed", "does not exist", "404", "410",
+                   "unsupported url", "no video formats", "requested format is not available",
+                   "copyright", "terminated")),
+    (FFMPEG, ("ffmpeg", "postprocessing", "conversion failed", "encoder")),
+    (TRANSIENT, ("timed out", "timeout", "connection", "reset by peer", "temporarily",
+                 "incompleteread", "content too short", "getaddrinfo", "network", "ssl",
+                 "500", "502", "503", "504", "unable to download")),
+)
+
+
+def _error_chain(error):
+    """Yield an exception and everything it wraps."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        exc_info = getattr(error, 'exc_info', None)
+        wrapped = exc_info[1] if exc_info else None
+        error = wrapped or error.__cause__ or error.__context__
+
+
+def classify_error(error):
+    """
+    Classify a download failure.
+
+    Args:
+        error: Exception (or error message string)
+
+    Returns:
+        str: One of TRANSIENT, THROTTLED, GEO_AUTH, UNAVAILABLE, FFMPEG, UNKNOWN
+    """
+    if isinstance(error, BaseException):
+        for e in _error_chain(error):
+            if isinstance(e, HTTPError):
+                # 403 from media hosts usually means throttling or an expired
+                # format URL; both clear up on a later re-extraction
+                if e.status in (403, 429, 503):
+                    return THROTTLED
+                if e.status == 401:
+                    return GEO_AUTH
+                if e.status in (404, 410):
+                    return UNAVAILABLE
+                if e.status >= 500:
+                    return TRANSIENT
+            if isinstance(e, GeoRestrictedError):
+                return GEO_AUTH
+            if isinstance(e, PostProcessingError):
+                return FFMPEG
+            if isinstance(e, (TransportError, socket.timeout, ConnectionError)):
+                return TRANSIENT
+
+    message = str(error).lower()
+    for category, markers in _MESSAGE_RULES:
+        if any(m in message for m in markers):
+            return category
+    return UNKNOWN
+
+
+class RetryPolicy:
+    """Decides whether and when to retry, using jittered exponential backoff."""
+
+    # Attempts allowed after the first try, per category
+    MAX_RETRIES = {TRANSIENT: 4, THROTTLED: 3, UNKNOWN: 1}
+    BASE_DELAY = {TRANSIENT: 2.0, THROTTLED: 30.0, UNKNOWN: 5.0}
+
+    def __init__(self, max_delay=300.0):
+        self.max_delay = max_delay
+
+    def next_delay(self, category, retries_done):
+        """
+        Seconds to wait before the next attempt.
+
+        Args:
+            category: Failure category
+            retries_done: Retries already made for this job
+
+        Returns:
+            float or None: Delay, or None if the job should not be retried
+        """
+        if retries_done >= self.MAX_RETRIES.get(category, 0):
+            return None
+        cap = min(self.max_delay, self.BASE_DELAY[category] * (2 ** retries_done))
+        # Never retry instantly: keep at least a fraction of the base delay
+        return random.uniform(self.BASE_DELAY[category] / 2, max(cap, self.BASE_DELAY[category] / 2))
+
+
+class FailedJobs:
+    """Persisted list of jobs that failed permanently or ran out of retries."""
+
+    def __init__(self, failed_file):
+        self.store = JsonStore(failed_file, default=list)
+
+    def __len__(self):
+        return len(self.store.get())
+
+    def add(self, job, error, category, attempts):
+        """Record a failed job."""
+        entries = [e for e in self.store.get() if e['job'].get('url') != job.get('url')]
+        entries.append({
+            'job': job,
+            'error': str(error)[:500],
+            'category': category,
+            'attempts': attempts,
+            'failed_at': time.time(),
+        })
+        self.store.set(entries)
+
+    def all(self):
+        """List of failed entries."""
+        return list(self.store.get())
+
+    def take_all(self):
+        """Remove and return all failed jobs (for bulk retry)."""
+        jobs = [e['job'] for e in self.store.get()]
+        self.store.set([])
+        return jobs
+
+    def clear(self):
+        """Forget all failed jobs."""
+        self.store.delete()
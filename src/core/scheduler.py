@@ -0,0 +1,257 @@
+"""Priority job scheduler with pluggable ordering policies."""
+
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from core.jobs import JobRecord
+
+# One priority level is worth this many seconds of waiting. A job can jump
+# ahead of work submitted up to PRIORITY_STEP seconds before it, but never
+# indefinitely, so low-priority jobs age into service instead of starving.
+PRIORITY_STEP = 600
+
+# Shortest-job-first: cost penalty per second of estimated work, capped so a
+# huge job is delayed by at most SJF_MAX_PENALTY seconds of virtual time.
+SJF_WEIGHT = 0.5
+SJF_MAX_PENALTY = 3600
+ASSUMED_RATE = 2 * 1024 * 1024  # bytes/s, used when only a filesize is known
+
+# Round-robin: virtual time each job consumes from its site's share.
+RR_QUANTUM = 60
+
+# Deadline-first: implicit deadline for jobs that don't set one.
+DEFAULT_SLACK = 86400
+
+POLICIES = {
+    'fifo': "First in, first out",
+    'sjf': "Shortest first",
+    'round_robin': "Round-robin by site",
+    'deadline': "Deadline first",
+}
+
+
+def job_host(job):
+    """Site a job belongs to, used for round-robin fairness."""
+    host = (urlsplit(job.get('url', '')).hostname or '').lower()
+    for prefix in ('www.', 'm.', 'music.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+
+def estimated_cost(job):
+    """Estimated seconds of work for a job, or None if unknown."""
+    if job.get('duration'):
+        return float(job['duration'])
+    if job.get('filesize'):
+        return float(job['filesize']) / ASSUMED_RATE
+    return None
+
+
+class JobScheduler:
+    """
+    Heap-backed job queue.
+
+    Push, pop, remove and reprioritize are O(log n). Removed or re-keyed
+    heap entries are invalidated in place and skipped lazily; the heap is
+    rebuilt when stale entries outnumber live ones.
+    """
+
+    def __init__(self, policy='fifo'):
+        self.policy = policy if policy in POLICIES else 'fifo'
+        self._heap = []
+        self._entries = {}  # job id -> heap entry [key, seq, job, base key]
+        self._host_clock = {}
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        """Iterate jobs in the order they would be popped."""
+        return iter(self.ordered())
+
+    def _base_key(self, job):
+        """Policy-specific virtual time before the priority offset."""
+        submitted = job['submitted']
+        if self.policy == 'sjf':
+            cost = estimated_cost(job)
+            # Unknown sizes are treated as average: a modest fixed penalty
+            penalty = SJF_MAX_PENALTY / 4 if cost is None else min(cost * SJF_WEIGHT, SJF_MAX_PENALTY)
+            return submitted + penalty
+        if self.policy == 'round_robin':
+            host = job_host(job)
+            tag = max(self._host_clock.get(host, 0), submitted) + RR_QUANTUM
+            self._host_clock[host] = tag
+            return tag
+        if self.policy == 'deadline':
+            return job.get('deadline') or submitted + DEFAULT_SLACK
+        return submitted
+
+    def _push_entry(self, job, base):
+        entry = [base - job.get('priority', 0) * PRIORITY_STEP, next(self._seq), job, base]
+        self._entries[job['id']] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _invalidate(self, job_id):
+        """Detach a job's heap entry; returns (job, base key) or (None, None)."""
+        entry = self._entries.pop(job_id, None)
+        if entry is None:
+            return None, None
+        job, base = entry[2], entry[3]
+        entry[2] = None
+        if len(self._heap) > 2 * len(self._entries) + 32:
+            self._heap = [e for e in self._heap if e[2] is not None]
+            heapq.heapify(self._heap)
+        return job, base
+
+    def push(self, job):
+        """
+        Add a job dict. Missing id/submitted/priority fields are filled in.
+
+        Returns:
+            JobRecord: The job, stored compactly
+        """
+        job = JobRecord.from_dict(job)
+        with self._lock:
+            job.setdefault('id', uuid.uuid4().hex[:12])
+            job.setdefault('submitted', time.time())
+            job.setdefault('priority', 0)
+            if job['id'] in self._entries:
+                self._invalidate(job['id'])
+            self._push_entry(job, self._base_key(job))
+            return job
+
+    def extend(self, jobs):
+        """Add several jobs, preserving their submission order."""
+        with self._lock:
+            for job in sorted(jobs, key=lambda j: j.get('submitted', 0)):
+                self.push(job)
+
+    def _prune(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+
+    def peek(self):
+        """Return the next job without removing it, or None."""
+        with self._lock:
+            self._prune()
+            return self._heap[0][2] if self._heap else None
+
+    def pop(self):
+        """Remove and return the next job, or None if empty."""
+        with self._lock:
+            self._prune()
+            if not self._heap:
+                return None
+            job = heapq.heappop(self._heap)[2]
+            del self._entries[job['id']]
+            return job
+
+    def get(self, job_id):
+        """Return a queued job by id, or None."""
+        entry = self._entries.get(job_id)
+        return entry[2] if entry else None
+
+    def remove(self, job_id):
+        """Remove a job by id and return it (None if not queued)."""
+        with self._lock:
+            return self._invalidate(job_id)[0]
+
+    def set_priority(self, job_id, priority):
+        """Change a job's priority at runtime."""
+        with self._lock:
+            job, base = self._invalidate(job_id)
+            if job is None:
+                return None
+            job['priority'] = priority
+            # Keep its place in the policy order; only the offset changes
+            self._push_entry(job, base)
+            return job
+
+    def bump(self, job_id, delta=1):
+        """Raise (positive delta) or lower (negative delta) a job's priority."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        return self.set_priority(job_id, job.get('priority', 0) + delta)
+
+    def update_estimate(self, job_id, duration=None, filesize=None):
+        """Record size estimates from metadata; re-keys the job under SJF."""
+        with self._lock:
+            job = self.get(job_id)
+            if job is None:
+                return
+            if duration:
+                job['duration'] = duration
+            if filesize:
+                job['filesize'] = filesize
+            if self.policy == 'sjf':
+                self._invalidate(job_id)
+                self._push_entry(job, self._base_key(job))
+
+    def set_policy(self, policy):
+        """Switch ordering policy and rebuild the heap (O(n))."""
+        with self._lock:
+            if policy not in POLICIES or policy == self.policy:
+                return
+            self.policy = policy
+            jobs = self.snapshot()
+            self._heap = []
+            self._entries = {}
+            self._host_clock = {}
+            for job in sorted(jobs, key=lambda j: j['submitted']):
+                self._push_entry(job, self._base_key(job))
+
+    def clear(self):
+        """Remove all jobs."""
+        with self._lock:
+            self._heap = []
+            self._entries = {}
+            self._host_clock = {}
+
+    def snapshot(self):
+        """List of queued jobs (unordered, cheap) for persistence."""
+        with self._lock:
+            return [entry[2] for entry in self._entries.values()]
+
+    def ordered(self):
+        """List of queued jobs in pop order (O(n log n), for display)."""
+        with self._lock:
+            return [entry[2] for entry in sorted(self._entries.values(), key=lambda e: (e[0], e[1]))]
+
+
+class DownloadSlot:
+    """
+    The one running-download slot.
+
+    Starts are requested from the UI, from the single-instance handoff
+    thread and from API threads; claim() is atomic, so exactly one of any
+    number of concurrent callers gets the slot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._busy = False
+
+    @property
+    def busy(self):
+        return self._busy
+
+    def claim(self):
+        """Mark a download as running; False if one already is."""
+        with self._lock:
+            if self._busy:
+                return False
+            self._busy = True
+            return True
+
+    def release(self):
+        """Free the slot for the next job."""
+        with self._lock:
+            self._busy = False
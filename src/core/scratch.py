@@ -0,0 +1,191 @@
+"""Scratch staging area for intermediate download I/O."""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+# Leftovers of unfinished downloads that never resume
+MAX_AGE = 2 * 24 * 3600
+
+# Suffixes of files that are still being written
+PARTIAL_SUFFIXES = ('.part', '.ytdl', '.temp', '.yardtmp')
+
+COPY_CHUNK = 4 * 1024 * 1024
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _is_partial(name):
+    stem, ext = os.path.splitext(name)
+    return ext in PARTIAL_SUFFIXES or os.path.splitext(stem)[1] in PARTIAL_SUFFIXES \
+        or '.temp.' in name or '.part-Frag' in name
+
+
+def _same_filesystem(src, dest_dir):
+    try:
+        return os.stat(src).st_dev == os.stat(dest_dir).st_dev
+    except OSError:
+        return False
+
+
+def _hash_file(path):
+    digest = hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def finalize_file(src, dest_dir):
+    """
+    Move a finished file into dest_dir.
+
+    Same filesystem: a single atomic rename. Otherwise the file is streamed
+    to a temporary name next to the destination, fsynced, verified against
+    the source hash and only then renamed into place.
+
+    Returns:
+        str: Final path
+    """
+    dest = os.path.join(dest_dir, os.path.basename(src))
+    if _same_filesystem(src, dest_dir):
+        os.replace(src, dest)
+        return dest
+
+    temp = dest + '.yardtmp'
+    digest = hashlib.blake2b()
+    try:
+        with open(src, 'rb') as fin, open(temp, 'wb') as fout:
+            for chunk in iter(lambda: fin.read(COPY_CHUNK), b''):
+                digest.update(chunk)
+                fout.write(chunk)
+            fout.flush()
+            os.fsync(fout.fileno())
+        if os.path.getsize(temp) != os.path.getsize(src) or _hash_file(temp) != digest.hexdigest():
+            raise OSError(f"Verification failed copying {os.path.basename(src)}")
+        shutil.copystat(src, temp)
+        os.replace(temp, dest)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+    os.remove(src)
+    return dest
+
+
+class ScratchSpace:
+    """
+    Size-capped scratch directory on fast storage.
+
+    Each job gets its own subdirectory keyed by URL, so a retried job finds
+    its .part files again. Finished files are moved to the destination with
+    finalize(); finished or abandoned job directories are reclaimed.
+    """
+
+    def __init__(self, root, max_bytes=20 * 1024 ** 3):
+        """
+        Initialize scratch space.
+
+        Args:
+            root: Scratch directory (created if missing)
+            max_bytes: Upper bound for everything kept under root
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._in_use = set()
+        self._lock = threading.RLock()
+
+    def job_dir(self, url):
+        """Scratch subdirectory for a job (stable across retries)."""
+        key = hashlib.sha1(url.strip().encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.root, f'job-{key}')
+
+    def usage(self):
+        return _dir_size(self.root) if os.path.isdir(self.root) else 0
+
+    def acquire(self, url, expected_bytes=0):
+        """
+        Reserve a job directory if the job fits in the cap.
+
+        Returns:
+            str or None: Job directory, or None to write straight to the destination
+        """
+        with self._lock:
+            job = self.job_dir(url)
+            self._in_use.add(job)  # Never reclaim the directory we're about to reuse
+            self._reclaim(expected_bytes)
+            self._in_use.discard(job)
+            if expected_bytes and self.usage() - _dir_size(job) + expected_bytes > self.max_bytes:
+                return None
+            try:
+                os.makedirs(job, exist_ok=True)
+            except OSError:
+                return None
+            self._in_use.add(job)
+            return job
+
+    def release(self, job, keep=False):
+        """
+        Done with a job directory.
+
+        Args:
+            keep: Leave partial files for a retry to resume
+        """
+        with self._lock:
+            self._in_use.discard(job)
+            if not keep:
+                shutil.rmtree(job, ignore_errors=True)
+
+    def finalize(self, job, dest_dir):
+        """
+        Move finished files from a job directory into dest_dir.
+
+        Returns:
+            list: Final paths
+        """
+        os.makedirs(dest_dir, exist_ok=True)
+        moved = []
+        for name in sorted(os.listdir(job)):
+            src = os.path.join(job, name)
+            if os.path.isfile(src) and not _is_partial(name):
+                moved.append(finalize_file(src, dest_dir))
+        return moved
+
+    def reclaim(self, needed=0):
+        """Delete stale job directories, oldest first, until needed bytes fit."""
+        with self._lock:
+            self._reclaim(needed)
+
+    def _reclaim(self, needed):
+        if not os.path.isdir(self.root):
+            return
+        jobs = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith('job-') and os.path.isdir(path) and path not in self._in_use:
+                try:
+                    jobs.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        jobs.sort()
+
+        now = time.time()
+        usage = self.usage()
+        for mtime, path in jobs:
+            if now - mtime > MAX_AGE or usage + needed > self.max_bytes:
+                size = _dir_size(path)
+                shutil.rmtree(path, ignore_errors=True)
+                usage -= size
@@ -0,0 +1,190 @@
+"""Pool of long-lived yt-dlp network sessions shared across jobs."""
+
+import functools
+import inspect
+import json
+import threading
+import time
+
+import yt_dlp
+
+# Options that shape connections, cookies and extractor state; jobs that
+# agree on all of them can share a session
+SESSION_KEYS = (
+    'cookiefile', 'cookiesfrombrowser', 'js_runtimes', 'remote_components', 'extractor_args',
+    'proxy', 'source_address', 'socket_timeout', 'http_headers', 'impersonate',
+    'nocheckcertificate', 'legacyserverconnect', 'client_certificate', 'client_certificate_key',
+    'compat_opts', 'usenetrc', 'username', 'password',
+)
+
+
+@functools.lru_cache(maxsize=None)
+def pooling_supported():
+    """
+    Whether this yt-dlp has the private state sessions are swapped into.
+
+    Session and YardYoutubeDL replace YoutubeDL's lazily built cookiejar and
+    _request_director (functools.cached_property) and its _ies_instances and
+    _close_hooks; if a yt-dlp update renames any of them, jobs run unpooled.
+    """
+    cls = yt_dlp.YoutubeDL
+    if not all(isinstance(inspect.getattr_static(cls, name, None), functools.cached_property)
+               for name in ('cookiejar', '_request_director')):
+        return False
+    try:
+        probe = cls({'quiet': True, 'no_warnings': True}, auto_init=False)
+    except Exception:
+        return False
+    supported = (isinstance(getattr(probe, '_ies_instances', None), dict)
+                 and isinstance(getattr(probe, '_close_hooks', None), list))
+    probe.close()
+    return supported
+
+
+def fingerprint(opts):
+    """Stable key for the session-relevant part of a YoutubeDL options dict."""
+    relevant = {k: opts[k] for k in SESSION_KEYS if opts.get(k) is not None}
+    return json.dumps(relevant, sort_keys=True, default=repr)
+
+
+class Session:
+    """
+    Connections, cookie jar and extractor instances for one fingerprint.
+
+    A session is leased by one YoutubeDL at a time (extractor instances
+    point back at the YoutubeDL using them), but outlives it, so the next
+    job reuses keep-alive connections, logins and cached player code.
+    """
+
+    def __init__(self, key, opts, cookies=None):
+        self.key = key
+        params = {k: opts[k] for k in SESSION_KEYS if opts.get(k) is not None}
+        # Owns the request director; never downloads anything itself
+        self.owner = yt_dlp.YoutubeDL({**params, 'quiet': True, 'no_warnings': True},
+                                      auto_init=False)
+        if cookies and params.get('cookiefile') and not params.get('cookiesfrombrowser'):
+            # Shared with every other session using this file
+            self.owner.__dict__['cookiejar'] = cookies.jar(params['cookiefile'])
+        self.cookiejar = self.owner.cookiejar
+        self.director = self.owner._request_director
+        self.extractors = {}  # ie_key -> InfoExtractor instance
+        self.uses = 0
+        self.released_at = time.monotonic()
+
+    def close(self):
+        self.owner.close()
+        self.extractors.clear()
+
+
+class SessionPool:
+    """
+    Thread-safe pool of Sessions keyed by options fingerprint.
+
+    lease() hands out an idle session with a matching fingerprint or
+    creates one; concurrent jobs with the same options get separate
+    sessions. Sessions are closed after max_uses leases (so server-side
+    state and memory don't grow forever) or when idle for idle_timeout;
+    expired sessions are swept on every lease and release, and by a reaper
+    timer while any session is idle, so connections don't outlive the last
+    job for a site.
+    """
+
+    def __init__(self, max_uses=50, max_idle=4, idle_timeout=300, cookies=None):
+        """
+        Initialize pool.
+
+        Args:
+            max_uses: Leases after which a session is closed instead of reused
+            max_idle: Idle sessions kept per fingerprint
+            idle_timeout: Seconds an idle session is kept
+            cookies: CookieService sharing one jar per cookies file (optional)
+        """
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.cookies = cookies
+        self._idle = {}  # key -> [Session], most recently released last
+        self._lock = threading.Lock()
+        self._reaper = None
+        self.created = self.reused = 0
+
+    def _sweep(self):
+        """Remove sessions idle for longer than idle_timeout; return them (lock held)."""
+        now = time.monotonic()
+        stale = []
+        for key in list(self._idle):
+            idle = self._idle[key]
+            keep = [s for s in idle if now - s.released_at <= self.idle_timeout]
+            stale.extend(s for s in idle if now - s.released_at > self.idle_timeout)
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+        return stale
+
+    def _schedule_reaper(self):
+        """Arm the reaper for the oldest idle session (lock held)."""
+        if self._reaper is not None or not self._idle:
+            return
+        oldest = min(s.released_at for idle in self._idle.values() for s in idle)
+        delay = max(oldest + self.idle_timeout - time.monotonic(), 0) + 1
+        self._reaper = threading.Timer(delay, self._reap)
+        self._reaper.daemon = True
+        self._reaper.start()
+
+    def _reap(self):
+        with self._lock:
+            self._reaper = None
+            stale = self._sweep()
+            self._schedule_reaper()
+        for s in stale:
+            s.close()
+
+    def lease(self, opts):
+        """Take a session for opts; give it back with release()."""
+        key = fingerprint(opts)
+        session = None
+        with self._lock:
+            stale = self._sweep()
+            idle = self._idle.get(key)
+            if idle:
+                session = idle.pop()
+                if not idle:
+                    del self._idle[key]
+                self.reused += 1
+            else:
+                self.created += 1
+        for s in stale:
+            s.close()
+        if session is None:
+            return Session(key, opts, self.cookies)
+        if self.cookies and opts.get('cookiefile') and not opts.get('cookiesfrombrowser'):
+            self.cookies.jar(opts['cookiefile'])  # Pick up edits to the file
+        return session
+
+    def release(self, session):
+        """Return a leased session to the pool (or close it if it's used up)."""
+        session.uses += 1
+        session.released_at = time.monotonic()
+        with self._lock:
+            stale = self._sweep()
+            idle = self._idle.get(session.key, [])
+            if session.uses < self.max_uses and len(idle) < self.max_idle:
+                self._idle[session.key] = idle + [session]
+                self._schedule_reaper()
+                session = None
+        for s in stale:
+            s.close()
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        """Close every idle session."""
+        with self._lock:
+            sessions = [s for idle in self._idle.values() for s in idle]
+            self._idle.clear()
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+        for s in sessions:
+            s.close()
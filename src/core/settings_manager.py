@@ -1,29 +1,26 @@
 """Settings persistence manager."""
 
-import json
-import os
+from core.persistence import JsonStore
 
 
 class SettingsManager:
     """Manages application settings persistence."""
     
+    SCHEMA_VERSION = 1
+    
     def __init__(self, settings_file):
         self.settings_file = settings_file
+        self.store = JsonStore(settings_file, self.SCHEMA_VERSION, default=dict)
     
     def load(self):
         """Load settings from disk."""
-        try:
-            if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r') as f:
-                    return json.load(f)
-        except Exception:
-            pass
-        return {}
+        settings = self.store.load()
+        return settings if isinstance(settings, dict) else {}
     
     def save(self, settings):
-        """Save settings to disk."""
-        try:
-            with open(self.settings_file, 'w') as f:
-                json.dump(settings, f)
-        except Exception:
-            pass
+        """Save settings to disk (debounced, atomic)."""
+        self.store.set(settings)
+    
+    def flush(self):
+        """Write pending settings changes immediately."""
+        self.store.flush()
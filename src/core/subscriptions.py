@@ -0,0 +1,262 @@
+"""Channel and playlist subscriptions polled incrementally for new entries."""
+
+import random
+import re
+import threading
+import time
+import uuid
+
+from core.persistence import JsonStore
+
+DEFAULT_INTERVAL = 6 * 3600
+JITTER = 0.2  # +/- fraction of the interval
+
+# Entry IDs remembered per newest-first subscription (older ones are never reached)
+MAX_SEEN = 500
+
+# Entries listed when a subscription is first checked (marked seen, not queued)
+BASELINE_ENTRIES = 50
+
+# Safety net for oldest-first sources, whose first check lists them in full
+MAX_SCAN = 5000
+
+# Entries an oldest-first source is re-listed from before where the last check ended
+RESCAN_OVERLAP = 5
+
+_CHANNEL_RE = re.compile(r'youtube\.com/(@[^/?#]+|channel/[^/?#]+|c/[^/?#]+|user/[^/?#]+)/?$')
+
+
+def normalize_source(url):
+    """
+    Canonical URL for a subscription source.
+
+    Bare YouTube channel URLs point at the channel home page, which lists
+    tabs rather than videos; subscribe to the uploads tab instead.
+    """
+    url = url.strip().split('#')[0]
+    match = _CHANNEL_RE.search(url.split('?')[0])
+    if match:
+        return f"https://www.youtube.com/{match.group(1)}/videos"
+    return url
+
+
+def is_newest_first(url):
+    """Channels and upload feeds list newest entries first; playlists usually don't."""
+    return bool(re.search(r'youtube\.com/(@|channel/|c/|user/)', url)) or 'list=UU' in url
+
+
+def entry_url(entry):
+    """Download URL for a flat playlist entry."""
+    url = entry.get('url') or entry.get('webpage_url')
+    if url and url.startswith('http'):
+        return url
+    if entry.get('ie_key') == 'Youtube' and entry.get('id'):
+        return f"https://www.youtube.com/watch?v={entry['id']}"
+    return url
+
+
+class SubscriptionManager:
+    """
+    Persisted subscriptions and an incremental poller.
+
+    Each check lists the source lazily and stops at the first entry it has
+    seen before, so a channel with one new upload costs a page or two of
+    requests instead of a full crawl. Oldest-first sources (playlists) grow
+    at the end instead: they are listed from where the previous check ended,
+    and not at all past the first page if the reported entry count hasn't
+    changed. Checks are spread out with jitter so many subscriptions don't
+    all fire at once.
+    """
+
+    def __init__(self, subscriptions_file, list_func, on_new, log_callback=None):
+        """
+        Initialize subscription manager.
+
+        Args:
+            subscriptions_file: JSON file with subscriptions and seen IDs
+            list_func: Called as list_func(url, on_info, start) and yields flat entries in
+                source order from index start, calling on_info(info) with the
+                playlist's own info dict first
+            on_new: Called as on_new(subscription, entries) with new entries, oldest first
+            log_callback: Called for logging messages (optional)
+        """
+        self.store = JsonStore(subscriptions_file, default=list)
+        self.list_func = list_func
+        self.on_new = on_new
+        self.log = log_callback or (lambda msg: None)
+        self._subs = [dict(s) for s in self.store.load()]
+        for sub in self._subs:
+            # Saved before 'baselined' existed: a clean earlier check was the baseline
+            sub.setdefault('baselined', bool(sub['seen']) or (sub['last_checked'] is not None
+                                                               and not sub['error']))
+            sub.setdefault('scanned', 0)  # Unknown: the next check lists it all
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._subs)
+
+    def all(self):
+        """Copies of all subscriptions."""
+        with self._lock:
+            return [dict(s) for s in self._subs]
+
+    def _save(self):
+        self.store.set([dict(s) for s in self._subs])
+
+    def add(self, url, settings, title=None, interval=DEFAULT_INTERVAL):
+        """
+        Subscribe to a channel or playlist.
+
+        Returns:
+            dict or None: New subscription, or None if already subscribed
+        """
+        url = normalize_source(url)
+        with self._lock:
+            if any(s['url'] == url for s in self._subs):
+                return None
+            sub = {
+                'id': uuid.uuid4().hex[:12],
+                'url': url,
+                'title': title,
+                'settings': dict(settings),
+                'interval': interval,
+                'newest_first': is_newest_first(url),
+                'seen': [],
+                'baselined': False,  # First successful check done
+                'scanned': 0,  # Entries an oldest-first source had at the last check
+                'last_checked': None,
+                'next_check': time.time(),
+                'error': None,
+            }
+            self._subs.append(sub)
+            self._save()
+        self._wake.set()
+        return dict(sub)
+
+    def remove(self, sub_id):
+        """Unsubscribe."""
+        with self._lock:
+            self._subs = [s for s in self._subs if s['id'] != sub_id]
+            self._save()
+
+    def check_all(self):
+        """Make every subscription due now."""
+        with self._lock:
+            for sub in self._subs:
+                sub['next_check'] = 0
+        self._wake.set()
+
+    def _scan(self, sub):
+        """
+        List entries not seen before, newest first.
+
+        Returns:
+            tuple: (new entries, whether this is the baseline check, source title or None,
+                entries an oldest-first source has been listed up to)
+        """
+        seen = set(sub['seen'])
+        baseline = not sub['baselined']
+        start = 0
+        if not sub['newest_first'] and not baseline:
+            start = max(0, sub['scanned'] - RESCAN_OVERLAP)
+        source = {}
+        new = []
+        scanned = start
+        for i, entry in enumerate(self.list_func(sub['url'], source.update, start)):
+            if i == 0 and start and source.get('playlist_count') == sub['scanned']:
+                return [], baseline, source.get('title'), sub['scanned']  # Nothing appended
+            scanned = start + i + 1
+            entry_id = entry.get('id') or entry_url(entry)
+            if not entry_id:
+                continue
+            if entry_id in seen:
+                if sub['newest_first']:
+                    break  # Everything after this was seen on an earlier check
+                continue
+            new.append(entry)
+            if (baseline and sub['newest_first'] and len(new) >= BASELINE_ENTRIES) or i >= MAX_SCAN:
+                break
+        if start and scanned == start:
+            # Shorter than last time (entries removed): list it from the top
+            return self._scan(dict(sub, scanned=0))
+        if not sub['newest_first']:
+            new.reverse()  # Oldest-first source: newest entries are at the end
+        return new, baseline, source.get('title'), scanned
+
+    def check(self, sub_id):
+        """
+        Check one subscription now.
+
+        Returns:
+            int: Number of new entries handed to on_new
+        """
+        with self._lock:
+            sub = next((dict(s) for s in self._subs if s['id'] == sub_id), None)
+        if sub is None:
+            return 0
+
+        error = None
+        new, baseline, title, scanned = [], False, None, sub['scanned']
+        try:
+            new, baseline, title, scanned = self._scan(sub)
+        except Exception as e:
+            error = str(e).replace('ERROR: ', '')[:200]
+            self.log(f"⚠ Subscription check failed: {error[:80]}")
+
+        now = time.time()
+        with self._lock:
+            live = next((s for s in self._subs if s['id'] == sub_id), None)
+            if live is None:
+                return 0  # Removed while checking
+            ids = [e.get('id') or entry_url(e) for e in new]
+            # Oldest-first sources may be re-listed in full if they shrink
+            limit = MAX_SEEN if live['newest_first'] else MAX_SCAN
+            live['seen'] = (ids + [i for i in live['seen'] if i not in ids])[:limit]
+            live['last_checked'] = now
+            live['error'] = error
+            if not error:
+                live['baselined'] = True
+                live['scanned'] = scanned
+            if title and not live['title']:
+                live['title'] = sub['title'] = title
+            live['next_check'] = now + live['interval'] * random.uniform(1 - JITTER, 1 + JITTER)
+            self._save()
+
+        if error:
+            return 0
+        if baseline:
+            # First check: remember what exists, only future uploads are queued
+            self.log(f"Subscribed: {sub.get('title') or sub['url']} ({len(new)} existing)")
+            return 0
+        if new:
+            self.on_new(sub, list(reversed(new)))
+        return len(new)
+
+    def start(self):
+        """Start the background poller."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            now = time.time()
+            with self._lock:
+                due = [s['id'] for s in self._subs if s['next_check'] <= now]
+                upcoming = min((s['next_check'] for s in self._subs), default=now + 3600)
+            for sub_id in due:
+                if self._stopped.is_set():
+                    return
+                self.check(sub_id)
+            if not due:
+                self._wake.wait(timeout=max(1.0, min(upcoming - now, 3600)))
+                self._wake.clear()
@@ -0,0 +1,365 @@
+"""Compatibility-mode encoding and derived outputs (ffmpeg postprocessors)."""
+
+import contextlib
+import os
+import re
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from yt_dlp.postprocessor.common import PostProcessor
+from yt_dlp.postprocessor.ffmpeg import FFmpegExtractAudioPP, FFmpegPostProcessor
+from yt_dlp.utils import PostProcessingError, prepend_extension, replace_extension
+
+VIDEO_FORMATS = ('MP4', 'MKV', 'WEBM')
+AUDIO_FORMATS = ('MP3', 'M4A', 'WAV')
+
+# Codecs each container takes as-is: (video, audio); None accepts anything
+CONTAINER_CODECS = {
+    'mp4': ({'h264', 'hevc', 'av1'}, {'aac', 'mp3', 'alac'}),
+    'mkv': (None, None),
+    'webm': ({'vp8', 'vp9', 'av1'}, {'opus', 'vorbis'}),
+    'mp3': (set(), {'mp3'}),
+    'm4a': (set(), {'aac', 'alac'}),
+    'wav': (set(), set()),
+}
+
+# Source formats to prefer per audio target, so the codec already matches
+# and extraction is a remux instead of a transcode
+AUDIO_SOURCE_FORMATS = {
+    'm4a': 'bestaudio[ext=m4a]/bestaudio/best',
+    'mp3': 'bestaudio[acodec=mp3]/bestaudio/best',
+}
+
+# Source codecs an audio target takes without re-encoding
+AUDIO_REMUX_CODECS = {'m4a': {'aac', 'alac'}, 'mp3': {'mp3'}}
+
+# Audio encoder per container when the source codec doesn't fit
+AUDIO_ENCODERS = {
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '192k'],
+    'm4a': ['-c:a', 'aac', '-b:a', '192k'],
+    'wav': ['-c:a', 'pcm_s16le'],
+}
+
+_STREAM_RE = re.compile(r'Stream #\d+:\d+.*?: (Video|Audio): (\w+)')
+
+
+def parse_outputs(text):
+    """
+    Parse an "also save as" list such as "MP3, wav".
+
+    Returns:
+        list: Known format names, upper-case, without duplicates
+    """
+    outputs = []
+    for token in re.split(r'[\s,;+]+', text or ''):
+        fmt = token.strip().lstrip('.').upper()
+        if fmt in VIDEO_FORMATS + AUDIO_FORMATS and fmt not in outputs:
+            outputs.append(fmt)
+    return outputs
+
+
+def encode_threads(jobs):
+    """ffmpeg threads per encode when jobs encodes share the CPU."""
+    return max(1, (os.cpu_count() or 1) // max(1, jobs))
+
+
+class EncodeCounter:
+    """
+    Counts ffmpeg encodes running in this process.
+
+    Compat encodes, derived outputs and pooled audio transcodes all register
+    here, so each new encode can size its thread count for the others.
+    """
+
+    def __init__(self):
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._active
+
+    @contextlib.contextmanager
+    def running(self):
+        """Register one encode; yields the number running, this one included."""
+        with self._lock:
+            self._active += 1
+            jobs = self._active
+        try:
+            yield jobs
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+ENCODES = EncodeCounter()
+
+
+def downloads_video(audio, outputs=None):
+    """Whether a job fetches video: audio jobs do when an extra output is a video format."""
+    return not audio or any(f not in AUDIO_FORMATS for f in outputs or [])
+
+# Output profiles per container: (log label, video args, audio args, muxer args)
+COMPAT_PROFILES = {
+    # MP4: H.264 + AAC (maximum compatibility)
+    'mp4': ("H.264/AAC for MP4",
+            ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23'],
+            ['-c:a', 'aac', '-b:a', '192k'],
+            ['-movflags', '+faststart']),  # moov atom first, for progressive playback
+    # WEBM: VP9 + Opus (standard for WebM)
+    'webm': ("VP9/Opus for WebM",
+             ['-c:v', 'libvpx-vp9', '-crf', '30', '-b:v', '0'],
+             ['-c:a', 'libopus', '-b:a', '128k'],
+             []),
+    # MKV: H.264 + AAC (widely compatible, MKV supports everything)
+    'mkv': ("H.264/AAC for MKV",
+            ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '23'],
+            ['-c:a', 'aac', '-b:a', '192k'],
+            []),
+}
+
+
+class CompatEncodePP(FFmpegPostProcessor):
+    """
+    Re-encode to a compat profile at a constant framerate.
+
+    For merged formats this takes the place of FFmpegMergerPP and reads the
+    separately downloaded streams directly, so merging and re-encoding
+    happen in a single ffmpeg pass with no merged intermediate file.
+    """
+
+    def __init__(self, downloader=None, target_ext='mp4', video_args=None, audio_args=None,
+                 calibration=None):
+        super().__init__(downloader)
+        self.target_ext = target_ext
+        self.calibration = calibration
+        _, default_video, default_audio, self.muxer_args = COMPAT_PROFILES[target_ext]
+        self.video_args = list(video_args or default_video)
+        self.audio_args = list(audio_args or default_audio)
+
+    def set_downloader(self, downloader):
+        super().set_downloader(downloader)
+        # ffmpeg_location comes from the downloader's params
+        self._paths = self._determine_executables()
+
+    def _encode_args(self, video_args=None):
+        return [*(video_args or self.video_args), '-vsync', 'cfr', *self.audio_args, *self.muxer_args]
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        inputs = info.get('__files_to_merge')
+        filename = info['filepath']
+
+        if inputs:
+            # Merged format: filepath is where the merged file would have gone
+            args = []
+            for i, fmt in enumerate(info['requested_formats']):
+                if fmt.get('vcodec') != 'none':
+                    args.extend(['-map', f'{i}:v:0'])
+                if fmt.get('acodec') != 'none':
+                    args.extend(['-map', f'{i}:a:0'])
+            sources = list(inputs)
+            self.to_screen(f'Merging and encoding formats into "{filename}"')
+        else:
+            args = []
+            sources = [filename]
+            self.to_screen(f'Encoding "{filename}" to {self.target_ext}')
+
+        outpath = replace_extension(filename, self.target_ext, info.get('ext'))
+        temp_path = prepend_extension(outpath, 'temp')
+        if self.calibration:
+            # Machine-tuned settings, sized for the transcodes already running
+            with self.calibration.session(self.target_ext) as video_args:
+                self.run_ffmpeg_multiple_files(sources, temp_path, args + self._encode_args(video_args))
+        else:
+            self.run_ffmpeg_multiple_files(sources, temp_path, args + self._encode_args())
+        os.replace(temp_path, outpath)
+
+        info['filepath'] = outpath
+        info['ext'] = self.target_ext
+        # Sources are deleted afterwards unless the user asked to keep them
+        return [f for f in sources if f != outpath], info
+
+
+class DeriveOutputsPP(FFmpegPostProcessor):
+    """
+    Write extra output formats from the file that was just downloaded.
+
+    Each target is produced by its own ffmpeg process, all in parallel.
+    Streams whose codec the target container accepts are copied; only the
+    others are re-encoded.
+    """
+
+    def __init__(self, downloader=None, targets=(), compat=False, max_workers=None):
+        """
+        Args:
+            targets: Output extensions, e.g. ['mp3', 'wav']
+            compat: Encode video at a constant framerate when it can't be copied
+            max_workers: Concurrent ffmpeg processes (defaults to one per target)
+        """
+        super().__init__(downloader)
+        self.targets = [t.lower() for t in targets]
+        self.compat = compat
+        self.max_workers = max_workers
+
+    def _stream_codecs(self, path):
+        """Return {'video': codec, 'audio': codec} for the first streams of path."""
+        try:
+            result = subprocess.run([self.executable, '-hide_banner', '-i', path],
+                                    capture_output=True, text=True, errors='replace')
+        except OSError as e:
+            raise PostProcessingError(f'Unable to inspect {path}: {e}')
+        codecs = {'video': None, 'audio': None}
+        for kind, codec in _STREAM_RE.findall(result.stderr):
+            if codecs[kind.lower()] is None:
+                codecs[kind.lower()] = codec
+        return codecs
+
+    def _target_args(self, ext, codecs):
+        """ffmpeg args converting a source with codecs into ext."""
+        video_ok, audio_ok = CONTAINER_CODECS[ext]
+        args = []
+
+        if ext in COMPAT_PROFILES and codecs['video']:
+            _, video_args, audio_args, muxer_args = COMPAT_PROFILES[ext]
+            args += muxer_args
+            if video_ok is None or codecs['video'] in video_ok:
+                args += ['-map', '0:v:0', '-c:v', 'copy']
+            else:
+                args += ['-map', '0:v:0', *video_args]
+                if self.compat:
+                    args += ['-vsync', 'cfr']
+        else:
+            audio_args = AUDIO_ENCODERS[ext]
+            args += ['-vn']
+
+        if codecs['audio']:
+            args += ['-map', '0:a:0']
+            if audio_ok is None or codecs['audio'] in audio_ok:
+                args += ['-c:a', 'copy']
+            else:
+                args += audio_args
+        return args
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        source = info['filepath']
+        codecs = self._stream_codecs(source)
+        jobs = []
+        for ext in self.targets:
+            if not codecs['video' if ext in COMPAT_PROFILES else 'audio']:
+                self.report_warning(f'Skipping {ext}: the source has no matching stream')
+                continue
+            outpath = replace_extension(source, ext, info.get('ext'))
+            if outpath == source:
+                # The source itself is wanted; stop later conversions deleting it
+                info['__keep_source'] = True
+                continue
+            jobs.append((ext, outpath, self._target_args(ext, codecs)))
+        if not jobs:
+            return [], info
+
+        def derive(job):
+            ext, outpath, args = job
+            temp_path = prepend_extension(outpath, 'temp')
+            with ENCODES.running() as running:
+                self.run_ffmpeg(source, temp_path, args + ['-threads', str(encode_threads(running))])
+            os.replace(temp_path, outpath)
+
+        self.to_screen(f'Deriving {", ".join(job[0] for job in jobs)} from "{source}"')
+        with ThreadPoolExecutor(max_workers=self.max_workers or len(jobs)) as pool:
+            futures = [(job, pool.submit(derive, job)) for job in jobs]
+            errors = []
+            for (ext, outpath, _), future in futures:
+                try:
+                    future.result()
+                    # Moved alongside the main output afterwards
+                    info['__files_to_move'][outpath] = None
+                except Exception as e:
+                    errors.append(f'{ext}: {e}')
+        if errors:
+            raise PostProcessingError(f'Extra outputs failed ({"; ".join(errors)})')
+        return [], info
+
+
+class TranscodePool:
+    """
+    Bounded pool for ffmpeg transcodes that run behind the downloads.
+
+    submit() blocks while the backlog is full, so downloads can't run
+    arbitrarily far ahead of conversion and fill the disk.
+    """
+
+    def __init__(self, max_workers=None, backlog=None):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='transcode')
+        self._slots = threading.Semaphore(backlog or self.max_workers * 2)
+
+    def submit(self, func, *args):
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(self._run, func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    @staticmethod
+    def _run(func, *args):
+        with ENCODES.running():
+            return func(*args)
+
+    @staticmethod
+    def wait(futures):
+        """Wait for futures; return a list of error messages."""
+        errors = []
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append(str(e))
+        return errors
+
+
+class PooledExtractAudioPP(FFmpegExtractAudioPP):
+    """
+    FFmpegExtractAudio that remuxes inline and transcodes in the background.
+
+    Meant to run after files are moved into place ('after_move'): when the
+    source codec already suits the target it is remuxed right away; other
+    tracks are handed to a TranscodePool so the next track can download
+    while this one converts. Callers wait on `futures` before reporting
+    the job done.
+    """
+
+    def __init__(self, downloader=None, preferredcodec=None, preferredquality=None, pool=None):
+        super().__init__(downloader, preferredcodec, preferredquality)
+        self.pool = pool
+        self.futures = []
+
+    def _is_remux(self, info):
+        if self.mapping == 'best':
+            return True
+        codec = self.get_audio_codec(info['filepath'])
+        return codec in AUDIO_REMUX_CODECS.get(self.mapping, {self.mapping})
+
+    def _transcode(self, info):
+        files_to_delete, info = FFmpegExtractAudioPP.run(self, info)
+        if not self.get_param('keepvideo', False) and not info.get('__keep_source'):
+            for path in files_to_delete:
+                with contextlib.suppress(OSError):
+                    os.remove(path)
+        return info['filepath']
+
+    @PostProcessor._restrict_to(images=False)
+    def run(self, info):
+        if self.pool is None or self._is_remux(info):
+            # Unwrapped: this run() already reports progress hooks
+            files_to_delete, info = FFmpegExtractAudioPP.run.__wrapped__(self, info)
+            return ([] if info.get('__keep_source') else files_to_delete), info
+        self.to_screen(f'Queued conversion of "{info["filepath"]}" to {self.mapping}')
+        self.futures.append(self.pool.submit(self._transcode, self._copy_infodict(info)))
+        return [], info
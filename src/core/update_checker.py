@@ -1,76 +1,118 @@
 """GitHub update checker with caching."""
 
-import json
-import os
+import threading
 import time
-import urllib.request
-import urllib.error
 from packaging import version
 
+from core.http_client import get_http_client
+from core.persistence import JsonStore
+
 
 class UpdateChecker:
     """Checks for application updates on GitHub."""
-    
-    def __init__(self, current_version, cache_file, repo_owner, repo_name):
+
+    def __init__(self, current_version, cache_file, repo_owner, repo_name,
+                 api_base="https://api.github.com", http_client=None):
         """
         Initialize update checker.
-        
+
         Args:
             current_version: Current app version string
             cache_file: Path to cache file
             repo_owner: GitHub repository owner
             repo_name: GitHub repository name
+            api_base: GitHub API root (overridable for a local stand-in)
+            http_client: HttpClient to use (defaults to the shared client)
         """
         self.current_version = current_version
         self.cache_file = cache_file
         self.repo_owner = repo_owner
         self.repo_name = repo_name
-    
+        self.api_base = api_base.rstrip('/')
+        self.http = http_client or get_http_client()
+        self.store = JsonStore(cache_file, schema_version=1, default=dict)
+
+    def _load_cache(self):
+        """Load cached release info."""
+        cache = self.store.load()
+        return dict(cache) if isinstance(cache, dict) else {}
+
+    def _save_cache(self, cache):
+        """Save cached release info (debounced, atomic)."""
+        self.store.set(cache)
+
+    def _release_url(self, latest_version):
+        return f"https://github.com/{self.repo_owner}/{self.repo_name}/releases/tag/v{latest_version}"
+
     def check(self, force=False):
         """
         Check for updates.
-        
+
         Args:
-            force: If True, bypass cache and always check GitHub API
-        
+            force: If True, bypass the daily cache and revalidate with GitHub
+
         Returns:
             dict or None: {'version': str, 'url': str} if update available, None otherwise
         """
         try:
+            cache = self._load_cache()
             latest_version = None
             download_url = None
-            
+
             # Check cache (don't check more than once per day) unless forced
-            if not force and os.path.exists(self.cache_file):
-                try:
-                    with open(self.cache_file, 'r') as f:
-                        cache = json.load(f)
-                        if time.time() - cache.get('last_check', 0) < 86400:  # 24 hours
-                            latest_version = cache.get('latest')
-                            download_url = f"https://github.com/{self.repo_owner}/{self.repo_name}/releases/tag/v{latest_version}"
-                except Exception:
-                    pass
-            
-            # Fetch from API if not cached or forced
+            if not force and time.time() - cache.get('last_check', 0) < 86400:  # 24 hours
+                latest_version = cache.get('latest')
+                download_url = cache.get('url') or self._release_url(latest_version)
+
+            # Conditional request: an unchanged release costs a bodiless 304
             if latest_version is None:
-                url = f"https://api.github.com/repos/{self.repo_owner}/{self.repo_name}/releases/latest"
-                req = urllib.request.Request(url)
-                req.add_header('User-Agent', 'Yard-UpdateChecker')
-                
-                with urllib.request.urlopen(req, timeout=5) as response:
-                    data = json.loads(response.read())
+                url = f"{self.api_base}/repos/{self.repo_owner}/{self.repo_name}/releases/latest"
+                headers = {'Accept': 'application/vnd.github+json'}
+                if cache.get('latest'):
+                    if cache.get('etag'):
+                        headers['If-None-Match'] = cache['etag']
+                    if cache.get('last_modified'):
+                        headers['If-Modified-Since'] = cache['last_modified']
+
+                response = self.http.get(url, headers=headers, timeout=5)
+
+                if response.status == 304:
+                    latest_version = cache['latest']
+                    download_url = cache.get('url') or self._release_url(latest_version)
+                elif response.status == 200:
+                    data = response.json()
                     latest_version = data['tag_name'].lstrip('v')
                     download_url = data['html_url']
-                    
-                    # Save cache
-                    with open(self.cache_file, 'w') as f:
-                        json.dump({'last_check': time.time(), 'latest': latest_version}, f)
-            
+                    cache['etag'] = response.headers.get('etag')
+                    cache['last_modified'] = response.headers.get('last-modified')
+                else:
+                    return None
+
+                cache.update({'last_check': time.time(), 'latest': latest_version, 'url': download_url})
+                self._save_cache(cache)
+
+            if not latest_version:
+                return None
+
             # Compare versions
             if version.parse(latest_version) > version.parse(self.current_version):
                 return {'version': latest_version, 'url': download_url}
-            
+
             return None
-            
-        except (urllib.error.URLError, Exception):
+
+        except Exception:
             return None
+
+    def check_async(self, callback, force=False, delay=0):
+        """
+        Run check() on a background thread and pass the result to callback.
+
+        Args:
+            callback: Called with the check() result
+            force: Passed through to check()
+            delay: Seconds to wait before checking (keeps it off the startup path)
+        """
+        timer = threading.Timer(delay, lambda: callback(self.check(force=force)))
+        timer.daemon = True
+        timer.start()
+        return timer
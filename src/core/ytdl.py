@@ -0,0 +1,255 @@
+"""yt-dlp integration points shared by all downloader code paths."""
+
+import threading
+
+import yt_dlp
+from yt_dlp.networking.exceptions import HTTPError
+from yt_dlp.postprocessor.ffmpeg import FFmpegMergerPP
+from yt_dlp.utils import DownloadError
+
+from core.host_limiter import host_key
+
+
+class YtdlLogger:
+    """Quiet yt-dlp logger that reports retried requests to a callback."""
+
+    def __init__(self, on_retry=None):
+        self.on_retry = on_retry
+
+    def debug(self, msg):
+        if self.on_retry and 'Retrying' in msg:
+            self.on_retry()
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        self.debug(msg)
+
+    def error(self, msg):
+        pass
+
+
+class CombinedProgress:
+    """
+    Folds progress from concurrently downloading streams into one figure.
+
+    Adds a 'combined' dict to each yt-dlp progress dict with summed bytes,
+    speed and ETA plus a per-stream breakdown.
+    """
+
+    def __init__(self):
+        self._streams = {}  # filename -> stream state
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._streams.clear()
+
+    def update(self, d):
+        """Record d and attach the combined view as d['combined']."""
+        name = d.get('filename') or d.get('tmpfilename')
+        if not name:
+            return d
+        with self._lock:
+            if name not in self._streams and self._streams and \
+                    all(s['finished'] for s in self._streams.values()):
+                self._streams.clear()  # Previous item (e.g. playlist entry) is done
+
+            info = d.get('info_dict') or {}
+            stream = self._streams.setdefault(name, {
+                'filename': name,
+                'kind': 'audio' if info.get('vcodec') == 'none' else 'video',
+                'downloaded': 0, 'total': None, 'speed': 0, 'finished': False,
+            })
+            stream['total'] = d.get('total_bytes') or d.get('total_bytes_estimate') or stream['total']
+            if d['status'] == 'finished':
+                stream['finished'] = True
+                stream['downloaded'] = stream['total'] or d.get('downloaded_bytes') or stream['downloaded']
+                stream['speed'] = 0
+            else:
+                stream['downloaded'] = d.get('downloaded_bytes') or stream['downloaded']
+                stream['speed'] = d.get('speed') or 0
+
+            streams = list(self._streams.values())
+            downloaded = sum(s['downloaded'] for s in streams)
+            totals = [s['total'] for s in streams]
+            total = sum(totals) if all(totals) else None
+            speed = sum(s['speed'] for s in streams)
+            d['combined'] = {
+                'downloaded_bytes': downloaded,
+                'total_bytes': total,
+                'fraction': downloaded / total if total else None,
+                'speed': speed,
+                'eta': (total - downloaded) / speed if total and speed else None,
+                'pending': sum(not s['finished'] for s in streams),
+                'streams': [{
+                    'kind': s['kind'],
+                    'fraction': s['downloaded'] / s['total'] if s['total'] else None,
+                    'finished': s['finished'],
+                } for s in streams],
+            }
+        return d
+
+
+class YardYoutubeDL(yt_dlp.YoutubeDL):
+    """
+    YoutubeDL that routes every HTTP request through the shared host limiter.
+
+    When a format is merged from separate streams (e.g. bestvideo+bestaudio),
+    the streams are downloaded concurrently instead of one after the other;
+    the merge postprocessor waits for all of them.
+
+    With a compat_encoder (CompatEncodePP) every video is re-encoded by it;
+    for merged formats it replaces the stream-copy merge, so merging and
+    encoding are one ffmpeg pass.
+
+    With an http_cache (HttpCache) extractor page and API responses are
+    served from disk where possible; cache hits skip the host limiter.
+
+    With a session_pool (SessionPool) connections, the cookie jar and
+    extractor instances come from a pooled Session and go back to the pool
+    on close() instead of being torn down.
+
+    With a format_planner, each video's format string is chosen from its
+    own resolved info as it is processed, so playlist entries are planned
+    one by one instead of from the playlist's format-less info.
+    """
+
+    def __init__(self, params=None, limiter=None, parallel_streams=True, compat_encoder=None,
+                 http_cache=None, session_pool=None, format_planner=None, **kwargs):
+        self.limiter = limiter
+        self.format_planner = format_planner
+        self.http_cache = http_cache
+        self.session_pool = session_pool
+        self.session = session_pool.lease(params or {}) if session_pool else None
+        self.parallel_streams = parallel_streams
+        self.compat_encoder = compat_encoder
+        self._component_ids = None
+        self._component_threads = []
+        self._component_errors = []
+        self._abort_components = threading.Event()
+        try:
+            super().__init__(params, **kwargs)
+        except BaseException:
+            if self.session:
+                session_pool.release(self.session)
+            raise
+        if self.session:
+            # Stand in for yt-dlp's lazily built per-instance state
+            self.__dict__['cookiejar'] = self.session.cookiejar
+            self.__dict__['_request_director'] = self.session.director
+            self._ies_instances = self.session.extractors
+        self.add_progress_hook(self._check_abort)
+        if compat_encoder:
+            compat_encoder.set_downloader(self)
+
+    def get_info_extractor(self, ie_key):
+        ie = super().get_info_extractor(ie_key)
+        if ie._downloader is not self:
+            ie.set_downloader(self)  # Pooled instance last used by an earlier job
+        return ie
+
+    def close(self):
+        if self.session is None:
+            return super().close()
+        session, self.session = self.session, None
+        self.save_cookies()
+        # The director belongs to the session; keep its connections open
+        self.__dict__.pop('_request_director', None)
+        for close_hook in self._close_hooks:
+            close_hook()
+        self.session_pool.release(session)
+
+    def urlopen(self, req):
+        if self.http_cache is not None:
+            # Logged-in and anonymous responses differ, so key by cookies file
+            return self.http_cache.fetch(req, self._urlopen_limited, scope=self.params.get('cookiefile'))
+        return self._urlopen_limited(req)
+
+    def _urlopen_limited(self, req):
+        if self.limiter is None:
+            return super().urlopen(req)
+
+        url = req if isinstance(req, str) else getattr(req, 'url', None) or req.get_full_url()
+        host = host_key(url)
+        self.limiter.throttle(host)
+        try:
+            response = super().urlopen(req)
+        except HTTPError as e:
+            self.limiter.report(host, e.status, e.response.headers.get('Retry-After'))
+            raise
+        self.limiter.report(host, response.status)
+        return response
+
+    def _check_abort(self, d):
+        """Stop sibling streams once one of them has failed."""
+        if self._abort_components.is_set() and d.get('status') == 'downloading':
+            raise DownloadError("Aborted: another stream of this format failed")
+
+    def process_video_result(self, info_dict, download=True):
+        if self.format_planner and info_dict.get('formats'):
+            spec = self.format_planner(info_dict)
+            if spec:
+                self.format_selector = self.build_format_selector(spec)
+        return super().process_video_result(info_dict, download)
+
+    def process_info(self, info_dict):
+        formats = info_dict.get('requested_formats')
+        if not (self.parallel_streams and formats and len(formats) > 1):
+            return super().process_info(info_dict)
+
+        self._component_ids = {f.get('format_id') for f in formats}
+        self._abort_components.clear()
+        try:
+            return super().process_info(info_dict)
+        except BaseException:
+            self._abort_components.set()
+            raise
+        finally:
+            self._component_ids = None
+            self._join_components()
+
+    def dl(self, name, info, subtitle=False, test=False):
+        if subtitle or test or name == '-' or not self._component_ids \
+                or info.get('format_id') not in self._component_ids:
+            return super().dl(name, info, subtitle, test)
+
+        # One stream of a merged format: start it and let the caller move on
+        # to the next one; post_process() collects the results
+        def run():
+            try:
+                success, _ = super(YardYoutubeDL, self).dl(name, info)
+                if not success:
+                    raise DownloadError(f"Download of format {info.get('format_id')} failed")
+            except BaseException as e:
+                self._component_errors.append(e)
+                self._abort_components.set()
+
+        thread = threading.Thread(target=run, daemon=True)
+        self._component_threads.append(thread)
+        thread.start()
+        return True, True
+
+    def _join_components(self):
+        """Wait for in-flight streams; re-raise the first failure."""
+        threads, self._component_threads = self._component_threads, []
+        for thread in threads:
+            thread.join()
+        errors, self._component_errors = self._component_errors, []
+        # Report the root failure, not the siblings we aborted because of it
+        errors.sort(key=lambda e: str(e).startswith("Aborted: another stream"))
+        if errors:
+            raise errors[0]
+
+    def post_process(self, filename, info, files_to_move=None):
+        # Merging needs every stream on disk
+        self._join_components()
+        if self.compat_encoder:
+            pps = info.setdefault('__postprocessors', [])
+            mergers = [i for i, pp in enumerate(pps) if isinstance(pp, FFmpegMergerPP)]
+            if mergers:
+                pps[mergers[0]] = self.compat_encoder
+            else:
+                pps.append(self.compat_encoder)
+        return super().post_process(filename, info, files_to_move)
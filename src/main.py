@@ -3,30 +3,69 @@
 A modern video/audio downloader with queue management and clean UI.
 """
 
+import sys
+
+# Hand off to a running instance before loading flet or yt-dlp
+from core.constants import LOCK_FILE
+from utils.instance import InstanceServer, forward_to_primary
+
+if __name__ == "__main__" and forward_to_primary(LOCK_FILE, sys.argv[1:]):
+    sys.exit(0)
+
 import flet as ft
+import os
+import secrets
 import threading
+import uuid
 import webbrowser
 
+from yt_dlp.utils import format_bytes, formatSeconds
+
 # Core imports
 from core.constants import (
-    APP_VERSION, SETTINGS_FILE, QUEUE_FILE, UPDATE_CHECK_FILE, LOCK_FILE,
+    APP_VERSION, SETTINGS_FILE, QUEUE_FILE, UPDATE_CHECK_FILE, HOST_LIMITS_FILE, FAILED_JOBS_FILE,
+    FRAGMENT_TUNING_FILE, ENCODER_CALIBRATION_FILE, SUBSCRIPTIONS_FILE, HTTP_CACHE_DIR,
+    ENCODE_SPEEDS_FILE,
     BG, BG_SUBTLE, BORDER, ACCENT, GREEN, RED, YELLOW, TEXT, TEXT_SEC, TEXT_DIM, DEFAULT_FOLDER
 )
 from core.settings_manager import SettingsManager
 from core.queue_manager import QueueManager
+from core.persistence import flush_all
 from core.downloader import Downloader
+from core.prefetcher import Prefetcher
+from core.host_limiter import HostLimiter
+from core.fragment_tuner import FragmentTuner
+from core.encoder_calibration import PRIORITIES as ENCODE_PRIORITIES, EncoderCalibration
+from core.retry import RetryPolicy, FailedJobs, CATEGORY_LABELS
+from core.scheduler import DownloadSlot, JobScheduler, POLICIES
+from core.bulk_import import extract_urls, parse_import, read_import_file, validate_urls
+from core.transcode import downloads_video, parse_outputs
+from core.scratch import ScratchSpace
+from core.bandwidth import QualityPlanner, parse_finish_by
+from core.forecast import EncodeSpeeds, QueueForecast
+from core.http_cache import HttpCache, MODES as HTTP_CACHE_MODES
+from core.subscriptions import SubscriptionManager, entry_url
+from core.api import ApiServer, DEFAULT_PORT as API_PORT
+from core.events import (
+    DROP_NEWEST, EventBus, EventMetrics, JobFinished, JobRetrying, JobStarted, LogMessage,
+    PostProcess, Progress, QueueChanged, StartNext,
+)
 from core.update_checker import UpdateChecker
 
 # UI imports
 from ui.components import (
-    create_url_input, create_paste_button, create_add_queue_button,
+    create_url_input, create_paste_button, create_add_queue_button, create_import_button,
+    create_subscribe_button, create_subscription_item,
     create_download_button, create_progress_bar, create_status_text,
     create_queue_count_text, create_open_folder_button, create_log_area,
     create_audio_checkbox, create_playlist_checkbox, create_compat_checkbox,
     create_quality_dropdown, create_format_dropdown, create_folder_display,
     create_folder_button, create_queue_item, create_info_button,
     create_shortcuts_info, create_update_banner, create_cookies_file_display,
-    create_cookies_button, create_clear_cookies_button, create_custom_args_input
+    create_cookies_button, create_clear_cookies_button, create_custom_args_input,
+    create_policy_dropdown, create_outputs_input, create_retry_failed_button,
+    create_scratch_display, create_scratch_button, create_clear_scratch_button,
+    create_http_cache_checkbox, create_finish_by_input, create_encode_priority_dropdown
 )
 from ui.dialogs import create_about_dialog
 
@@ -52,16 +91,32 @@ def main(page: ft.Page):
     # Initialize managers
     settings_mgr = SettingsManager(SETTINGS_FILE)
     queue_mgr = QueueManager(QUEUE_FILE)
+    failed_jobs = FailedJobs(FAILED_JOBS_FILE)
+    retry_policy = RetryPolicy()
     
     # Application state
     class State:
-        downloading = False
+        slot = DownloadSlot()  # Claimed before a download thread starts
         last_download_path = None
-        queue = []
+        queue = JobScheduler()
         settings_visible = True  # Settings panel visibility
+        scratch_limit_gb = 20  # Cap for the scratch folder (settings file only)
+        http_cache_mode = 'cache'  # 'record'/'replay' for offline benchmarks (settings file only)
+        http_cache_limit_mb = 200
+        paused = False  # Finish the running job, then hold the queue
+        current = None  # {'id', 'url', 'settings'} of the running job
+        next_job_id = None
+        api = None  # Local job API (settings file only)
+        api_port = API_PORT
+        api_token = None
     
     state = State()
     
+    # Downloads publish here; UI, notifications, persistence, metrics and the
+    # job API each consume from their own bounded queue
+    bus = EventBus()
+    metrics = EventMetrics()
+    
     def toggle_settings():
         """Toggle settings panel visibility."""
         state.settings_visible = not state.settings_visible
@@ -82,6 +137,11 @@ def main(page: ft.Page):
     url_input = create_url_input(lambda e: start_download())
     paste_btn = create_paste_button(lambda e: on_paste())
     add_queue_btn = create_add_queue_button(lambda e: on_add_to_queue())
+    subscribe_btn = create_subscribe_button(lambda e: on_subscribe())
+    import_btn = create_import_button(lambda _: import_picker.pick_files(
+        allowed_extensions=["txt", "html", "htm", "json"],
+        dialog_title="Import URLs from file"
+    ))
     dl_btn = create_download_button(lambda e: on_download())
     
     progress = create_progress_bar()
@@ -90,6 +150,7 @@ def main(page: ft.Page):
     open_folder_btn = create_open_folder_button(
         lambda e: open_folder(state.last_download_path or folder_path.value)
     )
+    retry_failed_btn = create_retry_failed_button(lambda e: retry_failed())
     
     log_area = create_log_area()
     info_btn = create_info_button(lambda e: create_about_dialog(page, APP_VERSION))
@@ -99,7 +160,10 @@ def main(page: ft.Page):
     compat_cb = create_compat_checkbox()
     
     quality_dd = create_quality_dropdown()
+    finish_by_input = create_finish_by_input()
     format_dd = create_format_dropdown()
+    outputs_input = create_outputs_input()
+    policy_dd = create_policy_dropdown(POLICIES, lambda e: on_policy_change())
     
     folder_path = ft.TextField(value=DEFAULT_FOLDER, visible=False)
     folder_display = create_folder_display(DEFAULT_FOLDER)
@@ -107,7 +171,12 @@ def main(page: ft.Page):
     # Advanced settings
     cookies_path = ft.TextField(value="", visible=False)
     cookies_display = create_cookies_file_display()
+    scratch_path = ft.TextField(value="", visible=False)
+    scratch_display = create_scratch_display()
     custom_args_input = create_custom_args_input()
+    http_cache_cb = create_http_cache_checkbox(lambda e: on_http_cache_change())
+    encode_priority_dd = create_encode_priority_dropdown(
+        ENCODE_PRIORITIES, lambda e: on_encode_priority_change())
     
     picker = ft.FilePicker(on_result=lambda e: on_folder(e))
     page.overlay.append(picker)
@@ -115,17 +184,31 @@ def main(page: ft.Page):
     cookies_picker = ft.FilePicker(on_result=lambda e: on_cookies_file(e))
     page.overlay.append(cookies_picker)
     
+    import_picker = ft.FilePicker(on_result=lambda e: on_import_file(e))
+    page.overlay.append(import_picker)
+    
+    scratch_picker = ft.FilePicker(on_result=lambda e: on_scratch_folder(e))
+    page.overlay.append(scratch_picker)
+    
     folder_btn = create_folder_button(lambda _: picker.get_directory_path())
     cookies_btn = create_cookies_button(lambda _: cookies_picker.pick_files(
         allowed_extensions=["txt"],
         dialog_title="Select cookies.txt file"
     ))
     clear_cookies_btn = create_clear_cookies_button(lambda e: clear_cookies())
+    scratch_btn = create_scratch_button(lambda _: scratch_picker.get_directory_path(
+        dialog_title="Select scratch folder on a fast local disk"
+    ))
+    clear_scratch_btn = create_clear_scratch_button(lambda e: clear_scratch())
 
     
     # Helper functions
     def log(msg):
-        """Add message to log area."""
+        """Add message to log area (non-blocking; rendered by the UI subscriber)."""
+        bus.publish(LogMessage(msg))
+    
+    def append_log(msg):
+        """Append to the log area."""
         log_area.value = (log_area.value or "") + f"{msg}\n"
         page.update()
     
@@ -141,131 +224,358 @@ def main(page: ft.Page):
         queue_count.visible = len(state.queue) > 0
         
         queue_list.controls.clear()
-        for i, item in enumerate(state.queue):
-            url = item['url'] if isinstance(item, dict) else item
-            settings = item.get('settings', {}) if isinstance(item, dict) else {}
-            
+        ordered = state.queue.ordered()
+        forecast.set_queue(ordered)
+        for i, (item, eta) in enumerate(zip(ordered, forecast.item_etas())):
+            job_id = item['id']
             queue_list.controls.append(
-                create_queue_item(i, url, settings, lambda e, idx=i: remove_from_queue(idx))
+                create_queue_item(
+                    i, item['url'], item.get('settings', {}),
+                    lambda e, jid=job_id: remove_from_queue(jid),
+                    priority=item.get('priority', 0),
+                    on_bump=lambda e, delta, jid=job_id: bump_in_queue(jid, delta),
+                    eta=formatSeconds(int(eta)),
+                )
             )
         
         queue_section.visible = len(state.queue) > 0
         page.update()
     
-    def remove_from_queue(index):
+    def queue_changed():
+        """Announce a queue change: the UI redraws it and persistence saves it."""
+        bus.publish(QueueChanged(len(state.queue), state.paused))
+    
+    def remove_from_queue(job_id):
         """Remove item from queue."""
-        if 0 <= index < len(state.queue):
-            state.queue.pop(index)
-            queue_mgr.save(state.queue)
-            update_queue_display()
+        item = state.queue.remove(job_id)
+        if item is not None:
+            prefetcher.cancel(item['url'], item.get('settings', {}).get('playlist', False))
+            queue_changed()
             set_status(f"Removed from queue ({len(state.queue)} remaining)", TEXT_SEC)
     
+    def bump_in_queue(job_id, delta):
+        """Raise or lower a queued item's priority."""
+        if state.queue.bump(job_id, delta) is not None:
+            queue_changed()
+    
+    def on_policy_change():
+        """Handle queue ordering policy change."""
+        state.queue.set_policy(policy_dd.value)
+        queue_changed()
+        save_current_settings()
+    
     def clear_queue(e):
         """Clear all queue items."""
         state.queue.clear()
+        prefetcher.cancel()
         queue_mgr.clear()
-        update_queue_display()
+        queue_changed()
         set_status("Queue cleared", TEXT_SEC)
     
     # Download callbacks
+    def queue_eta_suffix():
+        """Status text suffix with the whole queue's ETA."""
+        if not state.queue:
+            return ""
+        return f" · queue {formatSeconds(int(forecast.queue_eta()))}"
+    
     def progress_hook(d):
-        """Handle download progress updates."""
-        if d['status'] == 'downloading':
-            try:
-                pct = d.get('_percent_str', '0%').replace('%', '').strip()
-                progress.value = float(pct) / 100
-                
-                speed = d.get('_speed_str', '').strip()
-                eta = d.get('_eta_str', '').strip()
-                
-                msg = f"{d.get('_percent_str', '').strip()}"
-                if speed:
-                    msg += f" · {speed}"
-                if eta:
-                    msg += f" · {eta}"
-                set_status(msg, TEXT)
-            except Exception:
-                pass
-        elif d['status'] == 'finished':
+        """Publish download progress (runs on the download thread)."""
+        bus.publish(Progress.from_hook(state.current['id'] if state.current else None, d))
+    
+    def postprocessor_hook(d):
+        """Publish post-processing updates (runs on the download thread)."""
+        bus.publish(PostProcess.from_hook(state.current['id'] if state.current else None, d))
+    
+    # Event consumers
+    def show_progress(data):
+        """Render a progress event."""
+        streams = data['streams']
+        if data['status'] == 'downloading':
+            fraction = data['fraction']
+            if fraction is not None:
+                progress.value = fraction
+                msg = f"{fraction * 100:.1f}%"
+            else:
+                msg = format_bytes(data['downloaded_bytes'] or 0)
+            if len(streams) > 1:
+                # Video and audio downloading side by side
+                parts = [
+                    f"{s['kind'].capitalize()} {s['fraction'] * 100:.0f}%"
+                    for s in streams if s['fraction'] is not None
+                ]
+                msg += f" ({', '.join(parts)})"
+            if data['speed']:
+                msg += f" · {format_bytes(data['speed'])}/s"
+            if data['eta'] is not None:
+                msg += f" · {formatSeconds(int(data['eta']))}"
+            set_status(msg + queue_eta_suffix(), TEXT)
+        elif data['status'] == 'finished':
+            if data['pending']:
+                kind = streams[-1]['kind'] if streams else 'stream'
+                append_log(f"{kind.capitalize()} stream finished, waiting for the rest...")
+                return
             progress.value = 1
             set_status("Download complete, processing...", TEXT_SEC)
             if compat_cb.value:
-                log("Download finished, converting to constant framerate...")
+                append_log("Download finished, converting to constant framerate...")
             else:
-                log("Download finished, merging formats...")
+                append_log("Download finished, merging formats...")
     
-    def postprocessor_hook(d):
-        """Handle post-processing updates."""
-        if d['status'] == 'started':
-            postprocessor_name = d.get('postprocessor', 'Unknown')
-            log(f"Post-processing: {postprocessor_name}")
+    def show_postprocessor(data):
+        """Render a post-processing event."""
+        if data['status'] == 'started':
+            append_log(f"Post-processing: {data['postprocessor'] or 'Unknown'}")
             set_status("Converting to editor-compatible format...", TEXT_SEC)
-        elif d['status'] == 'processing':
-            info = d.get('info_dict', {})
-            filename = info.get('filepath', 'video')
-            if filename:
-                import os
-                basename = os.path.basename(filename)
-                log(f"Re-encoding: {basename[:50]}...")
+        elif data['status'] == 'processing':
+            if data['filename']:
+                append_log(f"Re-encoding: {os.path.basename(data['filename'])[:50]}...")
                 set_status("Re-encoding video (VFR → CFR)...", TEXT_SEC)
-        elif d['status'] == 'finished':
-            log("✓ Post-processing complete")
+        elif data['status'] == 'finished':
+            append_log("✓ Post-processing complete")
             set_status("Video optimized for editing", GREEN)
     
-    # Initialize downloader
-    downloader = Downloader(progress_hook, postprocessor_hook, log)
+    def show_started():
+        """Reset progress for a new job."""
+        progress.value = 0
+        progress.color = ACCENT
+        open_folder_btn.visible = False
+        set_status("Starting...", TEXT_SEC)
     
-    def do_download(url, audio, quality, fmt, playlist, compat, path):
-        """Execute download in background thread."""
-        state.downloading = True
-        state.last_download_path = path
-        
-        # Get advanced settings
-        cookies = cookies_path.value if cookies_path.value else None
-        custom_args = custom_args_input.value if custom_args_input.value.strip() else None
-        
-        result = downloader.download(url, audio, quality, fmt, playlist, compat, path, 
-                                     cookies, custom_args)
-        
+    def show_result(result):
+        """Render a finished job."""
         if result['success']:
             progress.color = GREEN
-            title = result['title']
-            set_status(f"✓ {title[:40]}...", GREEN)
+            set_status(f"✓ {result['title'][:40]}...", GREEN)
             open_folder_btn.visible = True
-            show_notification("Download Complete", f"{title[:50]}")
-            save_current_settings()
         elif result['error'] == 'Cancelled':
             progress.color = YELLOW
             set_status("Cancelled", YELLOW)
         else:
             progress.color = RED
-            set_status("Failed", RED)
-        
-        state.downloading = False
-        
-        # Process queue
-        if state.queue:
-            next_item = state.queue.pop(0)
-            queue_mgr.save(state.queue)
-            update_queue_display()
-            
-            if isinstance(next_item, dict):
-                url_input.value = next_item['url']
-                settings = next_item.get('settings', {})
-                apply_item_settings(settings)
-            else:
-                url_input.value = next_item
-            
-            page.update()
-            start_download()
-        else:
+            label = CATEGORY_LABELS.get(result['category'], "Error")
+            set_status(f"Failed · {label}", RED)
+            update_failed_display()
+        if not state.slot.busy:
             dl_btn.text = "Download"
             dl_btn.icon = ft.Icons.DOWNLOAD
             dl_btn.bgcolor = ACCENT
-            queue_mgr.clear()
             page.update()
+    
+    def on_ui_event(event):
+        """UI subscriber: every page update happens here, in publish order."""
+        if isinstance(event, LogMessage):
+            append_log(event.message)
+        elif isinstance(event, Progress):
+            show_progress(event.data)
+        elif isinstance(event, PostProcess):
+            show_postprocessor(event.data)
+        elif isinstance(event, QueueChanged):
+            update_queue_display()
+        elif isinstance(event, JobStarted):
+            show_started()
+        elif isinstance(event, JobRetrying):
+            set_status(f"{event.label} · retrying in {event.delay:.0f}s", YELLOW)
+        elif isinstance(event, JobFinished):
+            show_result(event.result)
+        elif isinstance(event, StartNext):
+            if not state.paused:
+                start_next_in_queue()
+    
+    def on_notification_event(event):
+        """Notification subscriber (plyer can block for seconds)."""
+        if event.result['success']:
+            show_notification("Download Complete", f"{event.result['title'][:50]}")
+    
+    def on_persistence_event(event):
+        """Persistence subscriber: queue and settings writes."""
+        if isinstance(event, QueueChanged):
+            queue_mgr.save(state.queue.snapshot())
+            return
+        if event.result['success']:
+            save_current_settings()  # Keeps the throughput estimate current
+        if not state.queue:
+            queue_mgr.clear()
+    
+    def on_metrics_event(event):
+        """Metrics subscriber: counters and the queue forecast."""
+        metrics.record(event)
+        if isinstance(event, JobStarted):
+            forecast.start_job(event.job['settings'], event.info)
+        elif isinstance(event, Progress):
+            forecast.on_progress(event.data)
+        elif isinstance(event, PostProcess):
+            data = event.data
+            forecast.speeds.record(data['postprocessor'], data['status'], data['filename'],
+                                   data['duration'], now=event.time)
+        elif isinstance(event, JobFinished):
+            forecast.finish_job()
+    
+    # A slow repaint or disk never stalls a transfer: queues are bounded,
+    # progress ticks and queue changes coalesce, and overflow drops events
+    bus.subscribe(on_ui_event, maxsize=1000, name='ui')
+    bus.subscribe(on_notification_event, JobFinished, maxsize=8, policy=DROP_NEWEST,
+                  name='notifications')
+    bus.subscribe(on_persistence_event, (QueueChanged, JobFinished), maxsize=64, name='persistence')
+    bus.subscribe(on_metrics_event, (JobStarted, Progress, PostProcess, JobFinished), maxsize=1000,
+                  name='metrics')
+    
+    # Initialize downloader
+    host_limiter = HostLimiter(HOST_LIMITS_FILE)
+    fragment_tuner = FragmentTuner(FRAGMENT_TUNING_FILE, host_limiter)
+    encoder_calibration = EncoderCalibration(ENCODER_CALIBRATION_FILE)
+    downloader = Downloader(progress_hook, postprocessor_hook, log, host_limiter=host_limiter,
+                            fragment_tuner=fragment_tuner, encoder_calibration=encoder_calibration)
+    quality_planner = QualityPlanner(downloader.throughput)
+    forecast = QueueForecast(downloader.throughput, EncodeSpeeds(ENCODE_SPEEDS_FILE))
+    
+    # Speculative info extraction for URLs that are likely to be downloaded next
+    def on_prefetched(url, playlist, info):
+        """Feed metadata size estimates to the scheduler."""
+        for item in state.queue.snapshot():
+            if item['url'] == url:
+                state.queue.update_estimate(
+                    item['id'],
+                    duration=info.get('duration'),
+                    filesize=info.get('filesize') or info.get('filesize_approx'),
+                )
+    
+    prefetcher = Prefetcher(
+        lambda url, playlist: downloader.fetch_info(url, playlist, cookies_path.value or None),
+        on_result=on_prefetched,
+    )
+    
+    # Channel/playlist subscriptions checked in the background
+    def on_subscription_entries(sub, entries):
+        """Queue new uploads from a subscription with its saved settings."""
+        settings = dict(sub['settings'], playlist=False)  # Entries are single videos
+        added = enqueue_urls([entry_url(e) for e in entries if entry_url(e)], settings)
+        if added:
+            log(f"📡 {added} new from {sub.get('title') or sub['url']}")
+        update_subscriptions_display()
+    
+    subscriptions = SubscriptionManager(
+        SUBSCRIPTIONS_FILE,
+        lambda url, on_info, start: downloader.list_entries(
+            url, cookies_path.value or None, on_info, start),
+        on_subscription_entries,
+        log,
+    )
+    
+    def do_download(url, audio, quality, fmt, playlist, compat, path, outputs=None):
+        """Execute download in background thread (the running slot is already claimed)."""
+        state.last_download_path = path
+        
+        # Get advanced settings
+        cookies = cookies_path.value if cookies_path.value else None
+        custom_args = custom_args_input.value if custom_args_input.value.strip() else None
+        
+        info = prefetcher.take(url, playlist, timeout=60)
+        bus.publish(JobStarted(state.current, info))
+        retries = 0
+        while True:
+            job_quality = quality
+            if quality == "Auto" and downloads_video(audio, outputs) and not playlist:
+                job_quality, info = plan_quality(url, playlist, cookies, info)
+            # Playlist info has no formats: Auto is planned per entry as each starts
+            result = downloader.download(url, audio, job_quality, fmt, playlist, compat, path, 
+                                         cookies, custom_args, info=info, outputs=outputs,
+                                         plan_entry=plan_entry_quality if playlist else None)
+            if result['success'] or result['error'] == 'Cancelled':
+                break
+            
+            delay = retry_policy.next_delay(result['category'], retries)
+            if delay is None:
+                break
+            retries += 1
+            label = CATEGORY_LABELS.get(result['category'], "Error")
+            log(f"{label}, retrying in {delay:.0f}s (attempt {retries + 1})")
+            bus.publish(JobRetrying(state.current['id'], label, delay, retries + 1))
+            if downloader.wait(delay):
+                result = {'success': False, 'title': None, 'error': 'Cancelled', 'category': None}
+                break
+            # Re-extract: format URLs may have expired; .part data is resumed
+            info = None
+        
+        if not result['success'] and result['error'] != 'Cancelled':
+            failed_jobs.add(
+                {'url': url, 'settings': {
+                    'audio': audio, 'quality': quality, 'format': fmt,
+                    'playlist': playlist, 'compat': compat, 'folder': path,
+                    'outputs': outputs or [],
+                }},
+                result['error'], result['category'], retries + 1,
+            )
+        
+        # Rendering, notification and saving happen on the subscribers' threads;
+        # the UI renders this result before it starts the next job
+        bus.publish(JobFinished(state.current, result, retries + 1))
+        release_download_slot()
+        if state.queue and state.paused:
+            log(f"⏸ Queue paused ({len(state.queue)} pending)")
+        bus.publish(StartNext())
 
     
+    def plan_quality(url, playlist, cookies, info):
+        """
+        Resolve Auto quality from measured throughput, backlog and finish-by time.
+        
+        Re-planned at every job start (and retry), so later jobs follow the
+        current throughput estimate.
+        
+        Returns:
+            tuple: (quality setting, info dict or None)
+        """
+        if info is None:
+            try:
+                info = downloader.fetch_info(url, playlist, cookies)
+            except Exception:
+                return "Best", None  # download() reports the error
+        height, reason = quality_planner.plan(
+            info, state.queue.snapshot(), parse_finish_by(finish_by_input.value))
+        quality = f"{height}p" if height else "Best"
+        log(f"Auto quality: {quality} ({reason})")
+        return quality, info
+    
+    def plan_entry_quality(entry):
+        """Plan Auto quality for one playlist entry from its resolved formats (height or None)."""
+        height, reason = quality_planner.plan(
+            entry, state.queue.snapshot(), parse_finish_by(finish_by_input.value))
+        log(f"Auto quality for {(entry.get('title') or 'entry')[:40]}: "
+            f"{f'{height}p' if height else 'Best'} ({reason})")
+        return height
+    
+    def claim_download_slot():
+        """Atomically mark a download as running; False if one already is."""
+        return state.slot.claim()
+    
+    def release_download_slot():
+        """Free the running slot for the next job."""
+        state.current = None
+        state.slot.release()
+    
+    def start_next_in_queue():
+        """Pop the next queued item and start downloading it, unless a download is running."""
+        if not claim_download_slot():
+            return
+        next_item = state.queue.pop()
+        if next_item is None:
+            release_download_slot()
+            return
+        queue_changed()
+        
+        # Look ahead: warm the item after this one while it downloads
+        upcoming = state.queue.peek()
+        if upcoming:
+            prefetcher.submit(upcoming['url'], upcoming.get('settings', {}).get('playlist', False))
+        
+        url_input.value = next_item['url']
+        apply_item_settings(next_item.get('settings', {}))
+        state.next_job_id = next_item['id']
+        
+        page.update()
+        start_download(claimed=True)
+    
     def apply_item_settings(settings):
         """Apply settings from queue item."""
         is_audio = settings.get('audio', False)
@@ -289,26 +599,33 @@ def main(page: ft.Page):
         
         playlist_cb.value = settings.get('playlist', False)
         compat_cb.value = settings.get('compat', True)
+        outputs_input.value = ", ".join(settings.get('outputs', []))
         if settings.get('folder'):
             folder_path.value = settings['folder']
 
     
-    def start_download():
-        """Start download process."""
+    def start_download(claimed=False):
+        """
+        Start download process, or cancel the running one.
+        
+        Args:
+            claimed: The caller already holds the running slot
+        """
         url = url_input.value.strip()
         if not url:
+            if claimed:
+                release_download_slot()
             set_status("Enter a URL", YELLOW)
             return
         
-        if state.downloading:
+        if not claimed and not claim_download_slot():
             downloader.cancel()
             set_status("Cancelling...", YELLOW)
             return
         
-        progress.value = 0
-        progress.color = ACCENT
-        open_folder_btn.visible = False
-        set_status("Starting...", TEXT_SEC)
+        state.current = {'id': state.next_job_id or uuid.uuid4().hex[:12], 'url': url,
+                         'settings': current_item_settings()}
+        state.next_job_id = None
         
         dl_btn.text = "Cancel"
         dl_btn.icon = ft.Icons.CLOSE
@@ -320,7 +637,8 @@ def main(page: ft.Page):
         threading.Thread(
             target=do_download,
             args=(url, audio_cb.value, quality_dd.value, format_dd.value,
-                  playlist_cb.value, compat_cb.value, folder_path.value),
+                  playlist_cb.value, compat_cb.value, folder_path.value,
+                  parse_outputs(outputs_input.value)),
             daemon=True
         ).start()
     
@@ -333,49 +651,292 @@ def main(page: ft.Page):
         try:
             import pyperclip
             clip = pyperclip.paste()
-            if clip:
+            if clip and len(extract_urls(clip)) > 1:
+                # Multi-line block of links: import them all
+                threading.Thread(target=bulk_import, args=(clip,), daemon=True).start()
+            elif clip:
                 url_input.value = clip
                 page.update()
+                prefetcher.submit(clip.strip(), playlist_cb.value)
         except Exception:
             pass
     
+    def on_import_file(e):
+        """Handle import file selection."""
+        if e.files and len(e.files) > 0:
+            path = e.files[0].path
+            
+            def do_import():
+                try:
+                    text = read_import_file(path)
+                except Exception as ex:
+                    log(f"⚠ Could not read {os.path.basename(path)}: {ex}")
+                    return
+                bulk_import(text)
+            
+            threading.Thread(target=do_import, daemon=True).start()
+    
+    def bulk_import(text):
+        """Parse, validate and enqueue many URLs at once (background thread)."""
+        existing = [item['url'] for item in state.queue.snapshot()]
+        urls, duplicates = parse_import(text, existing)
+        if duplicates:
+            log(f"Skipped {duplicates} duplicate URL(s)")
+        if not urls:
+            set_status("No new URLs to import", YELLOW)
+            return
+        
+        settings = current_item_settings()
+        cookies = cookies_path.value or None
+        log(f"Validating {len(urls)} URL(s)...")
+        checked = [0]
+        
+        def on_result(result):
+            checked[0] += 1
+            set_status(f"Validating {checked[0]}/{len(urls)}...", TEXT_SEC)
+        
+        results = validate_urls(urls, lambda url: downloader.probe(url, cookies),
+                                max_workers=4, on_result=on_result)
+        
+        failed = [r for r in results if not r['ok']]
+        for r in failed:
+            log(f"✗ {r['url'][:50]} · {r['error'][:80]}")
+        
+        valid = [r for r in results if r['ok']]
+        added = enqueue_urls([r['url'] for r in valid], settings,
+                             durations={r['url']: r['duration'] for r in valid})
+        log(f"📋 Imported {added} URL(s), {len(failed)} failed validation")
+        set_status(f"Imported {added} URL(s)", GREEN if not failed else YELLOW)
+    
+    def current_item_settings():
+        """Snapshot of the settings panel for a new queue item."""
+        return {
+            'audio': audio_cb.value,
+            'quality': quality_dd.value,
+            'format': format_dd.value,
+            'playlist': playlist_cb.value,
+            'compat': compat_cb.value,
+            'outputs': parse_outputs(outputs_input.value),
+            'folder': folder_path.value
+        }
+    
+    def update_failed_display():
+        """Show the retry button while there are failed jobs."""
+        count = len(failed_jobs)
+        retry_failed_btn.text = f"Retry failed ({count})"
+        retry_failed_btn.visible = count > 0
+        page.update()
+    
+    def retry_failed():
+        """Re-queue every failed job with its original settings."""
+        jobs = failed_jobs.take_all()
+        update_failed_display()
+        added = enqueue_items(jobs)
+        log(f"Re-queued {added} failed job(s)")
+    
+    def enqueue_items(items):
+        """
+        Add queue items ({'url', 'settings', ...}), skipping duplicates and
+        non-HTTP entries.
+        
+        Returns:
+            int: Number of items added
+        """
+        existing_urls = {item['url'] for item in state.queue.snapshot()}
+        
+        added = 0
+        for item in items:
+            url = item.get('url', '').strip()
+            if not url.startswith('http') or url in existing_urls:
+                continue
+            existing_urls.add(url)
+            item['url'] = url
+            item.setdefault('settings', current_item_settings())
+            state.queue.push(item)
+            prefetcher.submit(url, item['settings'].get('playlist', False))
+            added += 1
+        
+        if added:
+            queue_changed()
+            
+            # Auto-start if not downloading; started from the UI subscriber so
+            # enqueues from background threads don't touch the form
+            if not state.paused:
+                bus.publish(StartNext())
+        return added
+    
+    def enqueue_urls(urls, settings=None, durations=None):
+        """
+        Add URLs to the queue with shared settings.
+        
+        Args:
+            urls: URLs to add
+            settings: Per-item settings (defaults to the settings panel)
+            durations: Known durations by URL, used by shortest-first ordering
+        
+        Returns:
+            int: Number of items added
+        """
+        settings = settings or current_item_settings()
+        items = []
+        for url in urls:
+            item = {'url': url.strip(), 'settings': dict(settings)}
+            if durations and durations.get(item['url']):
+                item['duration'] = durations[item['url']]
+            items.append(item)
+        return enqueue_items(items)
+    
     def on_add_to_queue():
         """Add URL to queue."""
         url = url_input.value.strip()
         if url and url.startswith('http'):
-            # Check duplicates
-            existing_urls = [
-                item['url'] if isinstance(item, dict) else item
-                for item in state.queue
-            ]
-            if url in existing_urls:
+            url_input.value = ""
+            if not enqueue_urls([url]):
+                url_input.value = url
                 log("⚠ Duplicate URL - Already in queue")
                 set_status("Duplicate URL detected", YELLOW)
                 page.update()
                 return
             
-            queue_item = {
-                'url': url,
-                'settings': {
-                    'audio': audio_cb.value,
-                    'quality': quality_dd.value,
-                    'format': format_dd.value,
-                    'playlist': playlist_cb.value,
-                    'compat': compat_cb.value,
-                    'folder': folder_path.value
-                }
-            }
-            
-            state.queue.append(queue_item)
-            queue_mgr.save(state.queue)
-            update_queue_display()
-            url_input.value = ""
-            set_status(f"Added to queue ({len(state.queue)} pending)", ACCENT)
+            if state.queue:
+                set_status(f"Added to queue ({len(state.queue)} pending)", ACCENT)
             page.update()
-            
-            # Auto-start if not downloading
-            if not state.downloading:
-                start_download()
+    
+    def on_subscribe():
+        """Subscribe to the channel or playlist in the URL field."""
+        url = url_input.value.strip()
+        if not url.startswith('http'):
+            set_status("Enter a channel or playlist URL to subscribe", YELLOW)
+            return
+        
+        sub = subscriptions.add(url, current_item_settings())
+        if sub is None:
+            set_status("Already subscribed", YELLOW)
+            return
+        url_input.value = ""
+        log(f"📡 Subscribed to {sub['url']} - new uploads will be queued")
+        set_status(f"Subscribed ({len(subscriptions)} total)", ACCENT)
+        update_subscriptions_display()
+    
+    def update_subscriptions_display():
+        """Update subscriptions UI."""
+        subscriptions_list.controls.clear()
+        for sub in subscriptions.all():
+            subscriptions_list.controls.append(
+                create_subscription_item(sub, lambda e, sid=sub['id']: unsubscribe(sid))
+            )
+        subscriptions_section.visible = len(subscriptions) > 0
+        page.update()
+    
+    def unsubscribe(sub_id):
+        """Remove a subscription."""
+        subscriptions.remove(sub_id)
+        update_subscriptions_display()
+        set_status(f"Unsubscribed ({len(subscriptions)} remaining)", TEXT_SEC)
+    
+    def check_subscriptions(e):
+        """Check every subscription for new uploads now."""
+        subscriptions.check_all()
+        set_status("Checking subscriptions...", TEXT_SEC)
+    
+    class ApiControl:
+        """The app side of the local job API (called on API threads)."""
+        
+        @staticmethod
+        def jobs():
+            ordered = state.queue.ordered()
+            forecast.set_queue(ordered)
+            queue = [dict(job.to_dict(), position=i, eta=eta)
+                     for i, (job, eta) in enumerate(zip(ordered, forecast.item_etas()))]
+            current = dict(state.current, eta=forecast.job_eta()) if state.current else None
+            return {'current': current, 'paused': state.paused, 'queue': queue}
+        
+        @staticmethod
+        def job(job_id):
+            if state.current and state.current['id'] == job_id:
+                return dict(state.current, running=True)
+            job = state.queue.get(job_id)
+            return job.to_dict() if job else None
+        
+        @staticmethod
+        def submit(items):
+            panel = current_item_settings()
+            for item in items:
+                item['id'] = uuid.uuid4().hex[:12]
+                item['settings'] = dict(panel, **item['settings'])
+            enqueue_items(items)
+            running = state.current['id'] if state.current else None
+            added = [i['id'] for i in items if state.queue.get(i['id']) or i['id'] == running]
+            return {'added': added, 'skipped': [i['url'] for i in items if i['id'] not in added]}
+        
+        @staticmethod
+        def cancel(job_id):
+            if state.current and state.current['id'] == job_id and state.slot.busy:
+                downloader.cancel()
+                return True
+            if state.queue.get(job_id) is None:
+                return False
+            remove_from_queue(job_id)
+            return True
+        
+        @staticmethod
+        def set_priority(job_id, priority):
+            job = state.queue.set_priority(job_id, priority)
+            if job is None:
+                return None
+            queue_changed()
+            return job.to_dict()
+        
+        @staticmethod
+        def bump(job_id, delta):
+            job = state.queue.get(job_id)
+            return ApiControl.set_priority(job_id, job.get('priority', 0) + delta) if job else None
+        
+        @staticmethod
+        def pause():
+            state.paused = True
+            log("⏸ Queue paused")
+            queue_changed()
+        
+        @staticmethod
+        def resume():
+            state.paused = False
+            log("▶ Queue resumed")
+            queue_changed()
+            bus.publish(StartNext())
+        
+        @staticmethod
+        def metrics():
+            return dict(metrics.snapshot(), subscribers=bus.stats())
+    
+    def start_api():
+        """Serve the local job API (enabled with 'api_enabled' in the settings file)."""
+        if not state.api_token:
+            state.api_token = secrets.token_hex(16)
+            save_current_settings()
+        api = ApiServer(ApiControl, state.api_token, state.api_port)
+        try:
+            api.start()
+        except OSError as e:
+            log(f"⚠ Job API unavailable: {e}")
+            return
+        state.api = api
+        bus.subscribe(lambda event: api.publish(event.name, event.to_dict(), event.coalesce_key),
+                      (JobStarted, JobRetrying, JobFinished, Progress, PostProcess, LogMessage,
+                       QueueChanged),
+                      maxsize=1000, name='api')
+        log(f"Job API on http://127.0.0.1:{api.port} (token in settings file)")
+    
+    def on_instance_message(message):
+        """Handle URLs handed over by a second launch of the app."""
+        added = enqueue_urls(message.get('urls', []))
+        if added:
+            log(f"📥 Received {added} URL(s) from another launch")
+        try:
+            page.window.to_front()
+        except Exception:
+            pass
+        page.update()
     
     def on_audio_change():
         """Handle audio checkbox change."""
@@ -430,8 +991,54 @@ def main(page: ft.Page):
         cookies_display.value = "No cookies file"
         log("Cookies file cleared")
         page.update()
+    
+    def set_scratch(folder):
+        """Stage downloads in folder (None to write straight to the destination)."""
+        if folder:
+            scratch = ScratchSpace(os.path.join(folder, 'yard-scratch'),
+                                   int(state.scratch_limit_gb * 1024 ** 3))
+            threading.Thread(target=scratch.reclaim, daemon=True).start()
+            downloader.scratch = scratch
+        else:
+            downloader.scratch = None
+        scratch_path.value = folder or ""
+        scratch_display.value = folder or "Off"
+    
+    def on_scratch_folder(e):
+        """Handle scratch folder selection."""
+        if e.path:
+            set_scratch(e.path)
+            log(f"Scratch folder: {e.path}")
+            page.update()
+    
+    def clear_scratch():
+        """Stop staging downloads in a scratch folder."""
+        set_scratch(None)
+        log("Scratch folder cleared")
+        page.update()
 
     
+    def set_http_cache(enabled):
+        """Serve extractor requests from the on-disk cache (or stop doing so)."""
+        if enabled:
+            downloader.http_cache = HttpCache(HTTP_CACHE_DIR, int(state.http_cache_limit_mb * 1024 ** 2),
+                                              state.http_cache_mode)
+        else:
+            downloader.http_cache = None
+        http_cache_cb.value = enabled
+    
+    def on_http_cache_change():
+        """Handle request cache toggle."""
+        set_http_cache(http_cache_cb.value)
+        log("Request cache on" if http_cache_cb.value else "Request cache off")
+        save_current_settings()
+        page.update()
+    
+    def on_encode_priority_change():
+        """Handle compat encoding priority change (applies to the next encode)."""
+        encoder_calibration.priority = encode_priority_dd.value
+        save_current_settings()
+    
     def save_current_settings():
         """Save current settings to disk."""
         settings = {
@@ -443,12 +1050,24 @@ def main(page: ft.Page):
             'folder': folder_path.value,
             'cookies_file': cookies_path.value,
             'custom_args': custom_args_input.value,
+            'extra_outputs': outputs_input.value,
+            'scratch_dir': scratch_path.value,
+            'scratch_limit_gb': state.scratch_limit_gb,
+            'finish_by': finish_by_input.value,
+            'throughput_estimate': downloader.throughput.rate,
+            'http_cache': http_cache_cb.value,
+            'http_cache_mode': state.http_cache_mode,
+            'http_cache_limit_mb': state.http_cache_limit_mb,
+            'queue_policy': policy_dd.value,
+            'encode_priority': encode_priority_dd.value,
+            'api_enabled': state.api is not None,
+            'api_port': state.api_port,
+            'api_token': state.api_token,
         }
         settings_mgr.save(settings)
     
     def apply_saved_settings(settings):
         """Apply loaded settings to UI."""
-        import os
         if settings.get('audio_only'):
             audio_cb.value = True
             format_dd.options = [
@@ -486,6 +1105,14 @@ def main(page: ft.Page):
         if settings.get('quality'):
             quality_dd.value = settings.get('quality')
         
+        if settings.get('queue_policy') in POLICIES:
+            policy_dd.value = settings['queue_policy']
+            state.queue.set_policy(policy_dd.value)
+        
+        if settings.get('encode_priority') in ENCODE_PRIORITIES:
+            encode_priority_dd.value = settings['encode_priority']
+            encoder_calibration.priority = encode_priority_dd.value
+        
         if settings.get('folder') and os.path.exists(settings.get('folder')):
             folder_path.value = settings['folder']
             folder_display.value = settings['folder']
@@ -497,6 +1124,33 @@ def main(page: ft.Page):
         
         if settings.get('custom_args'):
             custom_args_input.value = settings['custom_args']
+        
+        if settings.get('scratch_dir') and os.path.isdir(settings['scratch_dir']):
+            state.scratch_limit_gb = settings.get('scratch_limit_gb', state.scratch_limit_gb)
+            set_scratch(settings['scratch_dir'])
+        
+        if settings.get('finish_by'):
+            finish_by_input.value = settings['finish_by']
+        
+        if settings.get('throughput_estimate'):
+            # Seed Auto quality until this session has measured the link
+            downloader.throughput.observe(settings['throughput_estimate'])
+        
+        if settings.get('http_cache'):
+            if settings.get('http_cache_mode') in HTTP_CACHE_MODES:
+                state.http_cache_mode = settings['http_cache_mode']
+            state.http_cache_limit_mb = settings.get('http_cache_limit_mb', state.http_cache_limit_mb)
+            set_http_cache(True)
+            if state.http_cache_mode != 'cache':
+                log(f"Request cache in {state.http_cache_mode} mode")
+        
+        if settings.get('extra_outputs'):
+            outputs_input.value = settings['extra_outputs']
+        
+        if settings.get('api_enabled'):
+            state.api_port = settings.get('api_port', state.api_port)
+            state.api_token = settings.get('api_token')
+            start_api()
 
     
     # Build UI layout
@@ -523,11 +1177,11 @@ def main(page: ft.Page):
                 info_btn,
             ]),
             ft.Container(height=20),
-            ft.Row([url_input, paste_btn, add_queue_btn, dl_btn], spacing=8),
+            ft.Row([url_input, paste_btn, add_queue_btn, subscribe_btn, import_btn, dl_btn], spacing=8),
             ft.Container(height=16),
             progress,
             ft.Container(height=8),
-            ft.Row([status, ft.Container(expand=True), queue_count, open_folder_btn]),
+            ft.Row([status, ft.Container(expand=True), queue_count, retry_failed_btn, open_folder_btn]),
             ft.Container(height=20),
             ft.Text("Log", size=12, color=TEXT_SEC),
             ft.Container(height=6),
@@ -560,6 +1214,29 @@ def main(page: ft.Page):
         visible=False,
     )
     
+    subscriptions_list = ft.Column([], spacing=0)
+    
+    subscriptions_section = ft.Container(
+        content=ft.Column([
+            ft.Row([
+                ft.Text("Subscriptions", size=14, weight=ft.FontWeight.W_600, color=TEXT),
+                ft.Container(expand=True),
+                ft.TextButton(
+                    "Check now",
+                    style=ft.ButtonStyle(color=ACCENT),
+                    on_click=check_subscriptions
+                ),
+            ]),
+            ft.Container(height=8),
+            subscriptions_list,
+        ]),
+        bgcolor=BG_SUBTLE,
+        border_radius=6,
+        padding=16,
+        margin=ft.margin.only(left=28, right=28, bottom=16),
+        visible=False,
+    )
+    
     right_panel = ft.Container(
         content=ft.Column([
             ft.Text("Settings", size=16, weight=ft.FontWeight.W_600, color=TEXT),
@@ -570,17 +1247,27 @@ def main(page: ft.Page):
             ft.Container(height=2),
             compat_cb,
             ft.Container(height=20),
-            quality_dd,
+            ft.Row([quality_dd, finish_by_input], spacing=8),
             ft.Container(height=12),
             format_dd,
+            ft.Container(height=12),
+            outputs_input,
             ft.Container(height=20),
             ft.Row([folder_display, folder_btn], spacing=8),
+            ft.Container(height=12),
+            policy_dd,
             ft.Container(height=20),
             # Advanced settings
             ft.Text("Advanced", size=14, weight=ft.FontWeight.W_600, color=TEXT),
             ft.Container(height=12),
             ft.Row([cookies_display, cookies_btn, clear_cookies_btn], spacing=4),
             ft.Container(height=8),
+            ft.Row([scratch_display, scratch_btn, clear_scratch_btn], spacing=4),
+            ft.Container(height=8),
+            http_cache_cb,
+            ft.Container(height=12),
+            encode_priority_dd,
+            ft.Container(height=12),
             custom_args_input,
             ft.Container(height=4),
             ft.Text(
@@ -606,6 +1293,7 @@ def main(page: ft.Page):
             ft.Column([
                 left_panel,
                 queue_section,
+                subscriptions_section,
             ], expand=7, spacing=0),  
             divider,
             settings_panel_wrapper,
@@ -613,6 +1301,8 @@ def main(page: ft.Page):
     )
     
     # Update checker
+    update_checker = UpdateChecker(APP_VERSION, UPDATE_CHECK_FILE, "razikdontcare", "yard")
+    
     def check_updates(force=False):
         """Check for updates in background."""
         if force:
@@ -620,9 +1310,10 @@ def main(page: ft.Page):
         else:
             log("Checking for updates...")
         
-        checker = UpdateChecker(APP_VERSION, UPDATE_CHECK_FILE, "razikdontcare", "yard")
-        update = checker.check(force=force)
-        
+        show_update_result(update_checker.check(force=force), force)
+    
+    def show_update_result(update, force=False):
+        """Report update check result in the UI."""
         if update:
             log(f"Current version: {APP_VERSION}")
             log(f"Latest version: {update['version']}")
@@ -656,7 +1347,12 @@ def main(page: ft.Page):
     manual_update_check.checker_func = check_updates
 
     
-    threading.Thread(target=check_updates, daemon=True).start()
+    # Deferred so the network round-trip never competes with startup
+    update_checker.check_async(show_update_result, delay=5)
+    
+    # First run on this machine: benchmark compat encoder settings once
+    encoder_calibration.calibrate_async(
+        delay=15, on_done=lambda _: log("Encoder settings calibrated for this machine"))
     
     # Load saved settings
     saved = settings_mgr.load()
@@ -668,34 +1364,60 @@ def main(page: ft.Page):
     def on_window_close(e):
         """Cleanup on exit."""
         try:
+            instance_server.stop()
+            if state.api:
+                state.api.stop()
+            subscriptions.stop()
+            downloader.close()
             release_lock(LOCK_FILE)
-            if not state.queue:
+            bus.close()
+            if state.queue:
+                queue_mgr.save(state.queue.snapshot())  # Don't rely on a pending event
+            else:
                 queue_mgr.clear()
+            flush_all()
         except Exception:
             pass
     
     page.on_disconnect = on_window_close
     
-    # Acquire lock
-    if not acquire_lock(LOCK_FILE):
+    # Acquire lock and listen for handoffs from later launches
+    instance_server = InstanceServer(on_instance_message)
+    try:
+        instance_server.start()
+    except OSError:
+        pass
+    if not acquire_lock(LOCK_FILE, instance_server.port, instance_server.token):
         log("⚠ Another instance of Yard is already running")
         set_status("Warning: Multiple instances detected", YELLOW)
         page.update()
     
+    # Load failed jobs from previous sessions
+    update_failed_display()
+    
     # Load queue
-    state.queue = queue_mgr.load()
+    state.queue.extend(queue_mgr.load())
     if state.queue:
-        update_queue_display()
+        queue_changed()
         log(f"📋 Restored {len(state.queue)} queued items")
     
+    # Start polling subscriptions once the queue is restored
+    update_subscriptions_display()
+    subscriptions.start()
+    
+    # URLs passed on the command line
+    launch_urls = [a for a in sys.argv[1:] if a.startswith('http')]
+    if launch_urls:
+        enqueue_urls(launch_urls)
+    
     # Auto-paste on startup
     try:
         import pyperclip
-        import os
         clip = pyperclip.paste()
         if clip and clip.startswith("http"):
             url_input.value = clip
             page.update()
+            prefetcher.submit(clip.strip(), playlist_cb.value)
     except Exception:
         pass
 
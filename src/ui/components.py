@@ -1,5 +1,7 @@
 """Reusable UI component factory functions."""
 
+import time
+
 import flet as ft
 from core.constants import (
     BG_CONTROL, BORDER, ACCENT, TEXT, TEXT_DIM, TEXT_SEC,
@@ -44,6 +46,37 @@ def create_add_queue_button(on_click):
     )
 
 
+def create_retry_failed_button(on_click):
+    """Create retry failed jobs button."""
+    return ft.TextButton(
+        "Retry failed",
+        icon=ft.Icons.REPLAY,
+        style=ft.ButtonStyle(color=YELLOW),
+        visible=False,
+        on_click=on_click,
+    )
+
+
+def create_subscribe_button(on_click):
+    """Create subscribe to channel/playlist button."""
+    return ft.IconButton(
+        icon=ft.Icons.RSS_FEED,
+        icon_color=TEXT_SEC,
+        tooltip="Subscribe (queue new uploads automatically)",
+        on_click=on_click,
+    )
+
+
+def create_import_button(on_click):
+    """Create bulk import button."""
+    return ft.IconButton(
+        icon=ft.Icons.PLAYLIST_ADD,
+        icon_color=TEXT_SEC,
+        tooltip="Import URLs from file",
+        on_click=on_click,
+    )
+
+
 def create_download_button(on_click):
     """Create download button."""
     return ft.ElevatedButton(
@@ -108,6 +141,17 @@ def create_audio_checkbox(on_change):
     )
 
 
+def create_http_cache_checkbox(on_change):
+    """Create extractor request cache checkbox."""
+    return ft.Checkbox(
+        label="Cache page and API requests",
+        value=False,
+        fill_color=ACCENT,
+        tooltip="Speeds up retries and re-scans; media is never cached",
+        on_change=on_change,
+    )
+
+
 def create_playlist_checkbox():
     """Create playlist checkbox."""
     return ft.Checkbox(
@@ -141,6 +185,7 @@ def create_quality_dropdown():
         color=TEXT,
         options=[
             ft.dropdown.Option("Best"),
+            ft.dropdown.Option("Auto"),
             ft.dropdown.Option("1080p"),
             ft.dropdown.Option("720p"),
             ft.dropdown.Option("480p")
@@ -148,6 +193,22 @@ def create_quality_dropdown():
     )
 
 
+def create_finish_by_input():
+    """Create "finish by" time input for Auto quality."""
+    return ft.TextField(
+        label="Finish by",
+        hint_text="HH:MM",
+        width=140,
+        bgcolor=BG_CONTROL,
+        border_color=BORDER,
+        focused_border_color=ACCENT,
+        border_radius=6,
+        text_size=13,
+        color=TEXT,
+        tooltip="Auto quality picks formats so the queue is done by this time",
+    )
+
+
 def create_format_dropdown():
     """Create format dropdown."""
     return ft.Dropdown(
@@ -168,6 +229,55 @@ def create_format_dropdown():
     )
 
 
+def create_outputs_input():
+    """Create extra output formats field."""
+    return ft.TextField(
+        label="Also save as",
+        hint_text="e.g., MP3, WAV",
+        hint_style=ft.TextStyle(color=TEXT_DIM, size=10),
+        tooltip="Extra formats derived from the same download",
+        width=140,
+        bgcolor=BG_CONTROL,
+        border_color=BORDER,
+        focused_border_color=ACCENT,
+        border_radius=6,
+        text_size=13,
+        color=TEXT,
+    )
+
+
+def create_policy_dropdown(policies, on_change):
+    """Create queue ordering policy dropdown."""
+    return ft.Dropdown(
+        label="Queue order",
+        value="fifo",
+        bgcolor=BG_CONTROL,
+        border_color=BORDER,
+        focused_border_color=ACCENT,
+        border_radius=6,
+        text_size=13,
+        color=TEXT,
+        options=[ft.dropdown.Option(key, label) for key, label in policies.items()],
+        on_change=on_change,
+    )
+
+
+def create_encode_priority_dropdown(priorities, on_change):
+    """Create compat encoding priority dropdown."""
+    return ft.Dropdown(
+        label="Compat encoding",
+        value="balanced",
+        bgcolor=BG_CONTROL,
+        border_color=BORDER,
+        focused_border_color=ACCENT,
+        border_radius=6,
+        text_size=13,
+        color=TEXT,
+        options=[ft.dropdown.Option(key, label) for key, label in priorities.items()],
+        on_change=on_change,
+    )
+
+
 def create_folder_display(default_folder):
     """Create folder display field."""
     return ft.TextField(
@@ -193,7 +303,7 @@ def create_folder_button(on_click):
     )
 
 
-def create_queue_item(index, url, settings, on_remove):
+def create_queue_item(index, url, settings, on_remove, priority=0, on_bump=None, eta=None):
     """Create a queue list item."""
     # Truncate URL for display
     display_url = url[:40] + "..." if len(url) > 43 else url
@@ -201,16 +311,78 @@ def create_queue_item(index, url, settings, on_remove):
     # Format indicator
     format_icon = "🎵" if settings.get('audio') else "🎬"
     
+    controls = [
+        ft.Text(f"{index+1}.", size=11, color=TEXT_DIM, width=20),
+        ft.Text(format_icon, size=11, width=20),
+        ft.Text(display_url, size=11, color=TEXT_SEC, expand=True),
+    ]
+    
+    if settings.get('outputs'):
+        controls.append(ft.Text("+" + "+".join(settings['outputs']), size=10, color=TEXT_DIM))
+    
+    if eta:
+        controls.append(ft.Text(f"~{eta}", size=10, color=TEXT_DIM, tooltip="Estimated time until done"))
+    
+    if priority:
+        controls.append(ft.Text(f"{priority:+d}", size=10, color=ACCENT if priority > 0 else TEXT_DIM))
+    
+    if on_bump:
+        controls.extend([
+            ft.IconButton(
+                icon=ft.Icons.ARROW_UPWARD,
+                icon_size=14,
+                icon_color=TEXT_DIM,
+                tooltip="Raise priority",
+                on_click=lambda e: on_bump(e, 1),
+            ),
+            ft.IconButton(
+                icon=ft.Icons.ARROW_DOWNWARD,
+                icon_size=14,
+                icon_color=TEXT_DIM,
+                tooltip="Lower priority",
+                on_click=lambda e: on_bump(e, -1),
+            ),
+        ])
+    
+    controls.append(
+        ft.IconButton(
+            icon=ft.Icons.CLOSE,
+            icon_size=14,
+            icon_color=RED,
+            tooltip="Remove",
+            on_click=on_remove,
+        )
+    )
+    
+    return ft.Container(
+        content=ft.Row(controls, spacing=4),
+        padding=ft.padding.symmetric(vertical=2),
+    )
+
+
+def create_subscription_item(sub, on_remove):
+    """Create a subscriptions list item."""
+    name = sub.get('title') or sub['url']
+    display_name = name[:40] + "..." if len(name) > 43 else name
+    
+    if sub.get('error'):
+        status = ft.Text("⚠ check failed", size=10, color=YELLOW, tooltip=sub['error'])
+    elif sub.get('last_checked'):
+        status = ft.Text(time.strftime("checked %H:%M", time.localtime(sub['last_checked'])),
+                         size=10, color=TEXT_DIM)
+    else:
+        status = ft.Text("pending", size=10, color=TEXT_DIM)
+    
     return ft.Container(
         content=ft.Row([
-            ft.Text(f"{index+1}.", size=11, color=TEXT_DIM, width=20),
-            ft.Text(format_icon, size=11, width=20),
-            ft.Text(display_url, size=11, color=TEXT_SEC, expand=True),
+            ft.Text("🎵" if sub.get('settings', {}).get('audio') else "🎬", size=11, width=20),
+            ft.Text(display_name, size=11, color=TEXT_SEC, expand=True, tooltip=sub['url']),
+            status,
             ft.IconButton(
                 icon=ft.Icons.CLOSE,
                 icon_size=14,
                 icon_color=RED,
-                tooltip="Remove",
+                tooltip="Unsubscribe",
                 on_click=on_remove,
             ),
         ], spacing=4),
@@ -302,6 +474,44 @@ def create_clear_cookies_button(on_click):
     )
 
 
+def create_scratch_display(default_value="Off"):
+    """Create scratch directory display field."""
+    return ft.TextField(
+        value=default_value,
+        label="Scratch folder (fast local disk)",
+        read_only=True,
+        bgcolor=BG_CONTROL,
+        border_color=BORDER,
+        border_radius=6,
+        text_size=11,
+        color=TEXT_SEC,
+        expand=True,
+        tooltip="Temporary files are written here; only finished files go to the save folder",
+    )
+
+
+def create_scratch_button(on_click):
+    """Create scratch directory selection button."""
+    return ft.IconButton(
+        icon=ft.Icons.SPEED,
+        icon_color=ACCENT,
+        bgcolor=BG_CONTROL,
+        tooltip="Select scratch folder",
+        on_click=on_click,
+    )
+
+
+def create_clear_scratch_button(on_click):
+    """Create clear scratch folder button."""
+    return ft.IconButton(
+        icon=ft.Icons.CLEAR,
+        icon_color=RED,
+        icon_size=16,
+        tooltip="Stop using a scratch folder",
+        on_click=on_click,
+    )
+
+
 def create_custom_args_input():
     """Create custom arguments input field."""
     return ft.TextField(
@@ -1,7 +1,9 @@
 """General utility helper functions."""
 
+import json
 import os
 import subprocess
+import tempfile
 import psutil
 
 
@@ -14,36 +16,61 @@ def open_folder(path):
             subprocess.run(['xdg-open', path])
 
 
-def acquire_lock(lock_file):
+def atomic_write_json(path, data):
     """
-    Create lock file with current PID.
+    Write JSON to path atomically.
+    
+    Data goes to a temp file in the same directory which then replaces the
+    target, so readers never see a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def acquire_lock(lock_file, port=None, token=None):
+    """
+    Create lock file with current PID and handoff endpoint.
+    
+    Args:
+        lock_file: Path of the lock file
+        port: Loopback port of the instance server (optional)
+        token: Shared secret later launches must present (optional)
     
     Returns:
         bool: True if lock acquired, False if another instance is running
     """
+    from utils.instance import read_lock_info
+    
     try:
         # Check if lock exists
         if os.path.exists(lock_file):
+            info = read_lock_info(lock_file)
+            old_pid = info.get('pid') if info else None
+            
+            # Check if process is still running
+            if old_pid and old_pid != os.getpid() and psutil.pid_exists(old_pid):
+                return False
+            
+            # Old process is dead or lock unreadable, remove stale lock
             try:
-                with open(lock_file, 'r') as f:
-                    old_pid = int(f.read().strip())
-                
-                # Check if process is still running
-                if psutil.pid_exists(old_pid):
-                    return False
-                else:
-                    # Old process is dead, remove stale lock
-                    os.remove(lock_file)
+                os.remove(lock_file)
             except Exception:
-                # Can't read lock file, remove it
-                try:
-                    os.remove(lock_file)
-                except Exception:
-                    pass
+                pass
         
         # Create new lock
-        with open(lock_file, 'w') as f:
-            f.write(str(os.getpid()))
+        atomic_write_json(lock_file, {'pid': os.getpid(), 'port': port, 'token': token})
         return True
     except Exception:
         # Couldn't create lock, but continue anyway
@@ -0,0 +1,139 @@
+"""Single-instance handoff over a local socket.
+
+This module is imported before flet and yt-dlp so a second launch can hand
+its URLs to the running instance and exit without loading either.
+"""
+
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+
+MAX_MESSAGE_BYTES = 8 * 1024 * 1024
+
+
+def read_lock_info(lock_file):
+    """
+    Read lock file contents.
+
+    Returns:
+        dict: {'pid': int, 'port': int or None, 'token': str or None}, or None
+    """
+    try:
+        with open(lock_file, 'r') as f:
+            raw = f.read().strip()
+    except OSError:
+        return None
+
+    try:
+        info = json.loads(raw)
+        if isinstance(info, int):  # Legacy lock file holding only the PID
+            return {'pid': info, 'port': None, 'token': None}
+        return info if isinstance(info, dict) else None
+    except ValueError:
+        return None
+
+
+def _collect_urls(args):
+    """Pick URLs out of argv; a lone '-' reads more URLs from stdin."""
+    urls = [a for a in args if a.startswith('http')]
+    if '-' in args:
+        urls.extend(line.strip() for line in sys.stdin if line.strip().startswith('http'))
+    return urls
+
+
+def forward_to_primary(lock_file, args, timeout=0.5):
+    """
+    Send args to an already running instance.
+
+    Args:
+        lock_file: Path of the single-instance lock file
+        args: Command line arguments (without program name)
+        timeout: Connect/reply timeout in seconds
+
+    Returns:
+        bool: True if a primary instance accepted the handoff
+    """
+    info = read_lock_info(lock_file)
+    if not info or not info.get('port') or info.get('pid') == os.getpid():
+        return False
+
+    message = {
+        'token': info.get('token'),
+        'args': list(args),
+        'urls': _collect_urls(args),
+        'cwd': os.getcwd(),
+    }
+
+    try:
+        with socket.create_connection(('127.0.0.1', int(info['port'])), timeout=timeout) as sock:
+            sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+            sock.shutdown(socket.SHUT_WR)
+            reply = sock.makefile('rb').readline()
+        return json.loads(reply or b'{}').get('ok', False)
+    except (OSError, ValueError):
+        return False
+
+
+class InstanceServer:
+    """Accepts handoff messages from later launches of the app."""
+
+    def __init__(self, on_message):
+        """
+        Initialize instance server.
+
+        Args:
+            on_message: Called with each decoded message dict
+                        ({'args': [...], 'urls': [...], 'cwd': str})
+        """
+        self.on_message = on_message
+        self.token = secrets.token_hex(16)
+        self.port = None
+        self._sock = None
+
+    def start(self):
+        """Bind to a free loopback port and start accepting connections."""
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(16)
+        self.port = self._sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self.port
+
+    def stop(self):
+        """Stop accepting connections."""
+        if self._sock:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _serve(self):
+        while self._sock:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                conn.settimeout(5)
+                data = conn.makefile('rb').readline(MAX_MESSAGE_BYTES)
+                message = json.loads(data)
+                if not secrets.compare_digest(str(message.get('token')), self.token):
+                    conn.sendall(b'{"ok": false}\n')
+                    return
+                message.pop('token', None)
+                conn.sendall(b'{"ok": true}\n')
+            except (OSError, ValueError):
+                return
+
+            try:
+                self.on_message(message)
+            except Exception:
+                pass
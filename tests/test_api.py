@@ -0,0 +1,136 @@
+"""Server-Sent Events fan-out: coalescing and ordering."""
+
+import json
+import socket
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from core.api import ApiServer, EventStream, _ApiHandler, clean_settings
+
+
+def _read_events(sock, until, timeout=5):
+    """Read SSE frames until an event named until arrives; return [(event, data)]."""
+    sock.settimeout(timeout)
+    buf = b''
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        buf += sock.recv(65536)
+        frames = []
+        for block in buf.decode().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+            if 'event' in fields:
+                frames.append((fields['event'], json.loads(fields['data'])))
+        if any(event == until for event, _ in frames):
+            return frames
+    raise AssertionError(f"no {until!r} event")
+
+
+@pytest.fixture
+def stream():
+    stream = EventStream(snapshot=lambda: {'queue': []}, interval=10)
+    stream.start()
+    yield stream
+    stream.stop()
+
+
+@pytest.fixture
+def client(stream):
+    server_side, client_side = socket.socketpair()
+    stream.attach(server_side)
+    yield client_side
+    client_side.close()
+
+
+def test_last_tick_precedes_finished_inside_the_coalescing_window(stream, client):
+    assert _read_events(client, 'state')[0] == ('state', {'queue': []})
+    # The first tick goes out at once and opens a 10 s coalescing window
+    stream.publish('progress', {'job': 'a', 'downloaded_bytes': 0}, coalesce_key='a')
+    _read_events(client, 'progress')
+    for done in range(1, 6):
+        stream.publish('progress', {'job': 'a', 'downloaded_bytes': done}, coalesce_key='a')
+    stream.publish('finished', {'job': 'a', 'success': True})
+
+    frames = _read_events(client, 'finished')
+    assert frames == [
+        ('progress', {'job': 'a', 'downloaded_bytes': 5}),
+        ('finished', {'job': 'a', 'success': True}),
+    ]
+
+
+def test_ticks_of_a_new_job_follow_its_started_event(stream, client):
+    _read_events(client, 'state')
+    stream.publish('progress', {'job': 'a', 'downloaded_bytes': 0}, coalesce_key='a')
+    _read_events(client, 'progress')
+    stream.publish('progress', {'job': 'a', 'downloaded_bytes': 9}, coalesce_key='a')
+    stream.publish('finished', {'job': 'a'})
+    stream.publish('started', {'job': 'b'})
+    stream.publish('progress', {'job': 'b', 'downloaded_bytes': 1}, coalesce_key='b')
+    stream.publish('log', {'message': 'x'})
+
+    frames = _read_events(client, 'log')
+    assert [(event, data['job']) for event, data in frames if 'job' in data] == [
+        ('progress', 'a'), ('finished', 'a'), ('started', 'b'), ('progress', 'b')]
+
+
+def test_clean_settings_keeps_known_keys():
+    assert clean_settings({'quality': '720p', 'outputs': 'mp3, wav', 'evil': 1}) == {
+        'quality': '720p', 'outputs': ['MP3', 'WAV']}
+    assert clean_settings(None) == {}
+
+
+@pytest.mark.parametrize('body', [
+    {'url': 'https://a/1', 'settings': 'x'},
+    {'urls': 'https://a/1'},
+    {'urls': [1]},
+    {'jobs': {'url': 'https://a/1'}},
+    {'jobs': ['https://a/1']},
+    {'url': 'https://a/1', 'settings': {'outputs': [['a']]}},
+    {'jobs': [{'url': 'https://a/1', 'settings': ['x']}]},
+])
+def test_malformed_submissions_are_rejected(body):
+    with pytest.raises(ValueError):
+        _ApiHandler._submitted_items(body)
+
+
+def test_submissions_are_normalized():
+    items = _ApiHandler._submitted_items({'urls': [' https://a/1 '], 'priority': 2,
+                                          'settings': {'outputs': ['mp3 ']}})
+    assert items == [{'url': 'https://a/1', 'settings': {'outputs': ['MP3']}, 'priority': 2}]
+
+
+class _Control:
+    def __init__(self):
+        self.submitted = []
+
+    def jobs(self):
+        return {'queue': []}
+
+    def submit(self, items):
+        self.submitted.extend(items)
+        return {'jobs': items}
+
+
+def test_bad_body_gets_400_over_http():
+    control = _Control()
+    api = ApiServer(control, 'secret', port=0)
+    port = api.start()
+    try:
+        def post(body):
+            request = urllib.request.Request(
+                f'http://127.0.0.1:{port}/jobs', json.dumps(body).encode(), method='POST',
+                headers={'Authorization': 'Bearer secret', 'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    return response.status, json.load(response)
+            except urllib.error.HTTPError as e:
+                return e.code, json.load(e)
+
+        assert post({'url': 'https://a/1', 'settings': 'x'}) == (400, {'error': "'settings' must be an object"})
+        assert post({'urls': 'https://a/1'})[0] == 400
+        assert post({'url': 'https://a/1'})[0] == 201
+        assert [item['url'] for item in control.submitted] == ['https://a/1']
+    finally:
+        api.stop()
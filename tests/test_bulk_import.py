@@ -0,0 +1,27 @@
+"""Bulk import parsing and duplicate detection."""
+
+from core.bulk_import import canonicalize_url, extract_urls, parse_import
+
+
+def test_canonical_form_ignores_tracking_and_short_links():
+    assert canonicalize_url('https://youtu.be/abc?si=x&t=10') == 'https://www.youtube.com/watch?v=abc'
+    assert canonicalize_url('HTTPS://Example.com:443/v?id=1&utm_source=x#top') == 'https://example.com/v?id=1'
+    assert canonicalize_url('ftp://example.com/a') is None
+
+
+def test_duplicates_are_found_by_canonical_form_but_urls_queued_as_written():
+    text = '''
+    https://youtu.be/abc?si=share
+    https://www.youtube.com/watch?v=abc
+    https://shop.example.com/clip?id=7&ref=campaign
+    https://shop.example.com/clip?id=7
+    https://www.youtube.com/watch?v=queued&feature=shared
+    '''
+    urls, duplicates = parse_import(text, existing=['https://www.youtube.com/watch?v=queued'])
+    assert urls == ['https://youtu.be/abc?si=share', 'https://shop.example.com/clip?id=7&ref=campaign']
+    assert duplicates == 3
+
+
+def test_links_come_from_html_bookmarks_and_json():
+    assert extract_urls('<a href="https://a/1">x</a> <A HREF="https://a/2">y</A>') == ['https://a/1', 'https://a/2']
+    assert extract_urls('{"roots": {"bar": {"children": [{"url": "https://a/3"}]}}}') == ['https://a/3']
@@ -0,0 +1,120 @@
+"""Coordinator leases, expiry, cancellation and the worker HTTP API."""
+
+import pytest
+
+from core.distributed import MAX_LEASES, Coordinator, CoordinatorError, Worker
+from core.queue_manager import QueueManager
+from core.scheduler import JobScheduler
+
+DONE = {'success': True, 'title': 'clip', 'error': None, 'category': None}
+CANCELLED = {'success': False, 'title': None, 'error': 'Cancelled', 'category': None}
+
+
+@pytest.fixture
+def results():
+    return []
+
+
+@pytest.fixture
+def coordinator(tmp_path, results):
+    return Coordinator(JobScheduler(), QueueManager(str(tmp_path / 'queue.json')), token='secret',
+                       lease_seconds=30, on_result=lambda job, result: results.append((job, result)))
+
+
+def _saved_urls(coordinator):
+    coordinator.queue_mgr.flush()
+    return sorted(job['url'] for job in QueueManager(coordinator.queue_mgr.queue_file).load())
+
+
+def test_lease_and_complete(coordinator, results):
+    job = coordinator.submit({'url': 'https://a/1', 'settings': {}})
+    lease = coordinator.lease('w1')
+    assert lease.job is job and coordinator.lease('w2') is None
+    # Leased jobs stay in the saved queue until they finish
+    assert _saved_urls(coordinator) == ['https://a/1']
+
+    assert coordinator.heartbeat(job['id'], 'w2') is None
+    assert coordinator.heartbeat(job['id'], 'w1', {'status': 'downloading'}) is lease
+    assert coordinator.complete(job['id'], 'w1', DONE)
+    assert results == [(job, DONE)]
+    assert not coordinator.complete(job['id'], 'w1', DONE)
+    assert _saved_urls(coordinator) == []
+
+
+def test_expired_lease_is_requeued_then_given_up(coordinator, results):
+    job = coordinator.submit({'url': 'https://a/1', 'settings': {}})
+    for attempt in range(1, MAX_LEASES + 1):
+        lease = coordinator.lease(f'w{attempt}')
+        assert lease.job['id'] == job['id']
+        assert coordinator.expire(now=lease.expires) == 1
+        assert lease.job['expired'] == attempt
+    assert len(coordinator.scheduler) == 0
+    assert len(results) == 1 and not results[0][1]['success']
+
+
+def test_worker_give_back_requeues_without_counting(coordinator, results):
+    job = coordinator.submit({'url': 'https://a/1', 'settings': {}})
+    coordinator.lease('w1')
+    assert coordinator.complete(job['id'], 'w1', CANCELLED)
+    assert results == []
+    assert coordinator.lease('w2').job['id'] == job['id']
+    assert job.get('expired') is None
+
+
+def test_cancelled_job_is_not_reported_as_failed(coordinator, results):
+    queued = coordinator.submit({'url': 'https://a/queued', 'settings': {}})
+    running = coordinator.submit({'url': 'https://a/running', 'settings': {}})
+    coordinator.lease('w1')  # Takes 'queued', submitted first
+    assert coordinator.cancel(running['id'])
+    assert coordinator.cancel(queued['id'])
+    assert coordinator.heartbeat(queued['id'], 'w1').cancelled
+    assert coordinator.complete(queued['id'], 'w1', CANCELLED)
+    assert results == []
+    assert len(coordinator.scheduler) == 0
+    assert not coordinator.cancel('missing')
+
+
+def test_worker_api_over_http(tmp_path, coordinator, results):
+    port = coordinator.start('127.0.0.1', 0)
+    try:
+        worker = Worker(f'http://127.0.0.1:{port}', 'secret', str(tmp_path / 'out'), worker_id='w1')
+        job = coordinator.submit({'url': 'https://a/1', 'settings': {'audio': True}})
+
+        status, body = worker._call('/lease', {})
+        assert status == 200 and body['job']['id'] == job['id']
+        assert body['job']['settings'] == {'audio': True}
+        assert worker._call('/lease', {}) == (204, None)
+
+        assert worker._call(f"/jobs/{job['id']}/heartbeat", {}) == (200, {'cancel': False})
+        assert worker._call(f"/jobs/{job['id']}/complete", {'result': DONE}) == (200, {})
+        assert worker._call(f"/jobs/{job['id']}/heartbeat", {})[0] == 410
+        assert [r for _, r in results] == [DONE]
+
+        intruder = Worker(f'http://127.0.0.1:{port}', 'wrong', str(tmp_path / 'out'))
+        with pytest.raises(CoordinatorError):
+            intruder._call('/lease', {})
+    finally:
+        coordinator.stop()
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'url': 'ftp://a/1'}, 'url required'),
+    ({'url': ['https://a/1']}, 'url required'),
+    ({'url': 'https://a/1', 'priority': 'high'}, "'priority' must be a number"),
+    ({'url': 'https://a/1', 'deadline': True}, "'deadline' must be a number"),
+    ({'url': 'https://a/1', 'settings': 'x'}, "'settings' must be an object of scalars or lists of scalars"),
+    ({'url': 'https://a/1', 'settings': {'outputs': [{'x': 1}]}},
+     "'settings' must be an object of scalars or lists of scalars"),
+])
+def test_submit_over_http_rejects_mistyped_fields(tmp_path, coordinator, body, error):
+    port = coordinator.start('127.0.0.1', 0)
+    try:
+        client = Worker(f'http://127.0.0.1:{port}', 'secret', str(tmp_path / 'out'))
+        assert client._call('/jobs', body) == (400, {'error': error})
+        assert len(coordinator.scheduler) == 0
+        status, reply = client._call('/jobs', {'url': 'https://a/1', 'priority': 2,
+                                               'settings': {'audio': True, 'outputs': ['MP3']}})
+        assert status == 201 and coordinator.scheduler.peek()['id'] == reply['id']
+        assert len(coordinator.scheduler) == 1
+    finally:
+        coordinator.stop()
@@ -0,0 +1,52 @@
+"""Encoder setting and thread count picks from calibration results."""
+
+import os
+
+import pytest
+
+from core.encoder_calibration import EncoderCalibration
+
+RESULTS = {
+    'threads': 8,
+    # Targets: speed 240 fps, balanced 90, quality 30
+    'x264': {'ultrafast': 900.0, 'superfast': 500.0, 'veryfast': 200.0, 'faster': 120.0,
+             'fast': 60.0, 'medium': 25.0},
+    'vp9': {'8': 200.0, '6': 90.0, '5': 40.0, '4': 20.0},
+    'x264_threads_preset': 'superfast',
+    # Stops scaling past 4 threads
+    'x264_threads': {'1': 120.0, '2': 230.0, '4': 480.0, '8': 500.0},
+}
+
+
+@pytest.fixture
+def calibration(monkeypatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+    calibration = EncoderCalibration(ffmpeg='ffmpeg')
+    calibration._results, calibration._loaded = RESULTS, True
+    return calibration
+
+
+def _option(args, name):
+    return args[args.index(name) + 1]
+
+
+@pytest.mark.parametrize('priority, preset', [
+    ('speed', 'superfast'), ('balanced', 'faster'), ('quality', 'fast')])
+def test_priority_picks_the_preset(calibration, priority, preset):
+    calibration.priority = priority
+    assert _option(calibration.video_args('mp4'), '-preset') == preset
+
+
+def test_threads_stop_where_scaling_does(calibration):
+    # 8 threads are only 4% faster than 4: leave the rest of the CPU alone
+    assert _option(calibration.video_args('mp4', jobs=1), '-threads') == '4'
+    # Two encodes get four cores each; 4 threads are still the fastest there
+    assert _option(calibration.video_args('mp4', jobs=2), '-threads') == '4'
+    # Three encodes: 2 cores each, still scaling, so use all of them
+    assert _option(calibration.video_args('mp4', jobs=3), '-threads') == '2'
+
+
+def test_results_without_thread_timings_use_the_cpu_share(calibration):
+    calibration._results = {k: v for k, v in RESULTS.items() if not k.startswith('x264_threads')}
+    assert _option(calibration.video_args('mp4', jobs=2), '-threads') == '4'
+    assert _option(calibration.video_args('webm', jobs=2), '-threads') == '4'
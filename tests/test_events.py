@@ -0,0 +1,139 @@
+"""Event bus backpressure, drop policies, coalescing and delivery order."""
+
+import threading
+import time
+
+import pytest
+
+from core.events import (DROP_NEWEST, DROP_OLDEST, EventBus, JobFinished, JobStarted, LogMessage, Progress,
+                         StartNext)
+
+JOB = {'id': 'a', 'url': 'https://a/1', 'settings': {}}
+DONE = {'success': True, 'title': 'clip', 'error': None, 'category': None}
+
+
+def _tick(done, status='downloading'):
+    return Progress('a', {'status': status, 'downloaded_bytes': done})
+
+
+class _Consumer:
+    """Handler that blocks until released, then records what it received."""
+
+    def __init__(self):
+        self.received = []
+        self.release = threading.Event()
+        self.busy = threading.Event()
+
+    def __call__(self, event):
+        self.busy.set()
+        self.release.wait(5)
+        self.received.append(event)
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.received) < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return [self.describe(event) for event in self.received]
+
+    @staticmethod
+    def describe(event):
+        if isinstance(event, Progress):
+            return ('progress', event.data['downloaded_bytes'])
+        if isinstance(event, LogMessage):
+            return ('log', event.message)
+        return (event.name,)
+
+
+@pytest.fixture
+def bus():
+    bus = EventBus()
+    yield bus
+    bus.close()
+
+
+def _stalled(bus, consumer, **kwargs):
+    """Subscribe consumer and park its thread on a first event."""
+    sub = bus.subscribe(consumer, **kwargs)
+    bus.publish(LogMessage('first'))
+    assert consumer.busy.wait(5)
+    return sub
+
+
+def test_publish_does_not_wait_for_a_slow_consumer(bus):
+    consumer = _Consumer()
+    sub = _stalled(bus, consumer, maxsize=10)
+    started = time.monotonic()
+    for i in range(1000):
+        bus.publish(LogMessage(str(i)))
+    assert time.monotonic() - started < 1
+    assert sub.stats()['queued'] == 10 and sub.dropped == 990
+    consumer.release.set()
+    # DROP_OLDEST keeps the newest
+    assert consumer.wait_for(11)[-1] == ('log', '999')
+
+
+def test_drop_newest_keeps_the_backlog(bus):
+    consumer = _Consumer()
+    sub = _stalled(bus, consumer, maxsize=2, policy=DROP_NEWEST)
+    for message in ('1', '2', '3'):
+        bus.publish(LogMessage(message))
+    consumer.release.set()
+    assert consumer.wait_for(3) == [('log', 'first'), ('log', '1'), ('log', '2')]
+    assert sub.dropped == 1
+
+
+@pytest.mark.parametrize('policy', [DROP_OLDEST, DROP_NEWEST])
+def test_control_events_are_never_dropped(bus, policy):
+    consumer = _Consumer()
+    sub = _stalled(bus, consumer, maxsize=2, policy=policy)
+    bus.publish(JobStarted(JOB))
+    for i in range(50):
+        bus.publish(LogMessage(str(i)))
+    bus.publish(JobFinished(JOB, DONE))
+    bus.publish(StartNext())
+    consumer.release.set()
+    received = consumer.wait_for(4)
+    assert [e for e in received if e[0] != 'log'] == [('started',), ('finished',), ('start_next',)]
+    assert sub.dropped >= 50 - 2
+
+
+def test_coalesced_tick_keeps_its_place_after_earlier_events(bus):
+    consumer = _Consumer()
+    sub = _stalled(bus, consumer)
+    bus.publish(_tick(1))
+    bus.publish(LogMessage('merging'))
+    bus.publish(_tick(2))
+    consumer.release.set()
+    assert consumer.wait_for(3) == [('log', 'first'), ('log', 'merging'), ('progress', 2)]
+    assert sub.coalesced == 1
+
+
+def test_status_changes_are_not_coalesced(bus):
+    consumer = _Consumer()
+    _stalled(bus, consumer)
+    bus.publish(_tick(1))
+    bus.publish(_tick(5, status='finished'))
+    bus.publish(_tick(6))
+    bus.publish(_tick(7))
+    consumer.release.set()
+    # The pending tick moves behind the status change it was published before
+    assert consumer.wait_for(3)[1:] == [('progress', 5), ('progress', 7)]
+
+
+def test_types_filter_and_failing_handler(bus):
+    consumer = _Consumer()
+    consumer.release.set()
+    bus.subscribe(consumer, types=JobFinished)
+
+    def broken(event):
+        raise RuntimeError
+
+    sub = bus.subscribe(broken, types=JobFinished)
+    bus.publish(LogMessage('ignored'))
+    bus.publish(JobFinished(JOB, DONE))
+    bus.publish(JobFinished(JOB, DONE))
+    assert consumer.wait_for(2) == [('finished',), ('finished',)]
+    deadline = time.monotonic() + 5
+    while sub.errors < 2 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert sub.errors == 2
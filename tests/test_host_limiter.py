@@ -0,0 +1,36 @@
+"""Per-host backoff on throttling responses and persisted limits."""
+
+import json
+
+from core.host_limiter import HostLimiter, host_key
+
+
+def _saved(path):
+    with open(path) as f:
+        return json.load(f)['data']
+
+
+def test_host_key_groups_cdn_shards():
+    assert host_key('https://rr3---sn-abc.googlevideo.com/videoplayback') == 'googlevideo.com'
+    assert host_key('https://www.bbc.co.uk/iplayer') == 'bbc.co.uk'
+
+
+def test_throttling_backs_off_and_persists(tmp_path):
+    path = str(tmp_path / 'limits.json')
+    limiter = HostLimiter(path, default_rate=20, default_concurrency=2)
+    limiter.report('site.com', 429, '0')
+    assert limiter.limits('site.com') == {'rate': 10, 'concurrency': 1}
+    limiter.report_throttled('site.com', 0)
+    limiter.store.flush()
+    assert _saved(path) == {'site.com': {'rate': 5, 'concurrency': 1}}
+
+
+def test_forbidden_leaves_limits_alone(tmp_path):
+    path = str(tmp_path / 'limits.json')
+    limiter = HostLimiter(path, default_rate=20, default_concurrency=2)
+    for _ in range(20):
+        limiter.report('site.com', 403)
+        limiter.report('site.com', 404)
+    assert limiter.limits('site.com') == {'rate': 20, 'concurrency': 2}
+    limiter.store.flush()
+    assert not tmp_path.joinpath('limits.json').exists()
@@ -0,0 +1,119 @@
+"""Compact job records, interned settings and trimmed info dicts."""
+
+import json
+import sys
+import tracemalloc
+
+import pytest
+
+from core.jobs import JobRecord, SettingsProfile, intern_settings, trim_info
+from core.queue_manager import QueueManager
+from core.scheduler import JobScheduler
+
+SETTINGS = {'audio': False, 'quality': '720p', 'format': 'MP4', 'playlist': False,
+            'compat': True, 'folder': '/tmp/yard', 'outputs': ['MP3']}
+
+
+def test_record_round_trips_through_dict_and_json():
+    job = {'id': 'abc', 'url': 'https://a/1', 'settings': dict(SETTINGS), 'priority': 2,
+           'submitted': 1.5, 'duration': 60, 'expired': 1}
+    record = JobRecord.from_dict(job)
+    assert JobRecord.from_dict(record) is record
+    data = record.to_dict()
+    assert data['settings']['outputs'] == ('MP3',)  # Frozen in the shared profile
+    assert json.loads(json.dumps(data)) == job
+    assert JobRecord.from_dict(json.loads(json.dumps(data))).to_dict() == data
+
+
+def test_record_behaves_like_a_dict():
+    record = JobRecord('https://a/1', SETTINGS)
+    assert record['url'] == 'https://a/1'
+    assert 'id' not in record and record.get('id') is None
+    assert record.setdefault('priority', 0) == 0 and 'priority' in record
+    record['attempt'] = 3  # Not a slot
+    assert record['attempt'] == 3 and record.get('missing', 'x') == 'x'
+    with pytest.raises(KeyError):
+        record['missing']
+
+
+def test_settings_are_interned_and_read_only():
+    a = JobRecord('https://a/1', dict(SETTINGS))
+    b = JobRecord('https://a/2', dict(SETTINGS))
+    assert a['settings'] is b['settings']
+    assert isinstance(a['settings'], SettingsProfile)
+    assert intern_settings(dict(SETTINGS, quality='Best')) is not a['settings']
+    with pytest.raises(TypeError):
+        a['settings']['quality'] = 'Best'
+    a['settings'] = dict(a['settings'], quality='Best')
+    assert a['settings']['quality'] == 'Best' and b['settings']['quality'] == '720p'
+
+
+def test_queue_survives_save_and_load(tmp_path):
+    path = str(tmp_path / 'queue.json')
+    queue = JobScheduler()
+    for i in range(5):
+        queue.push({'url': f'https://a/{i}', 'settings': SETTINGS, 'submitted': i})
+    manager = QueueManager(path)
+    manager.save(queue.snapshot())
+    manager.flush()
+
+    restored = JobScheduler()
+    restored.extend(QueueManager(path).load())
+    assert [job.to_dict() for job in restored.ordered()] == [job.to_dict() for job in queue.ordered()]
+
+
+def test_trim_info_drops_heavy_fields():
+    info = {'id': 'x', 'title': 't', 'formats': [{'format_id': '1'}],
+            'automatic_captions': {'en': []}, 'thumbnails': [{}], 'description': 'long',
+            'entries': [{'id': 'e', 'url': 'https://a/e', 'title': 'e', 'formats': [{}],
+                         'thumbnails': [{}]}]}
+    assert trim_info(info) is info
+    assert set(info) == {'id', 'title', 'formats', 'entries'}
+    assert info['entries'] == [{'id': 'e', 'url': 'https://a/e', 'title': 'e'}]
+    assert trim_info(None) is None
+
+
+def test_records_use_less_memory_than_dicts():
+    count = 2000
+    # Strings are shared by both layouts; only the per-job containers are measured
+    urls = [sys.intern(f'https://a/{i}') for i in range(count)]
+    ids = [f'{i:012x}' for i in range(count)]
+    intern_settings(SETTINGS)
+
+    def measure(make):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        items = [make(i) for i in range(count)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+        assert len(items) == count
+        return size / count
+
+    per_dict = measure(lambda i: {'id': ids[i], 'url': urls[i],
+                                  'settings': dict(SETTINGS, outputs=list(SETTINGS['outputs'])),
+                                  'priority': 0, 'submitted': float(i)})
+    per_record = measure(lambda i: JobRecord(urls[i], SETTINGS, id=ids[i], priority=0,
+                                             submitted=float(i)))
+    assert per_record < per_dict * 0.5
+
+
+@pytest.mark.parametrize('custom_args, refetched', [(None, False), ('--split-chapters', True)])
+def test_custom_args_use_the_full_info(tmp_path, monkeypatch, custom_args, refetched):
+    downloader_module = pytest.importorskip('core.downloader')
+    downloader = downloader_module.Downloader(None, None, lambda msg: None)
+    fetches = []
+
+    def stop(*args, **kwargs):
+        raise RuntimeError("stop before downloading")
+
+    def fetch_info(url, playlist=False, cookies_file=None, quiet=True, trim=True):
+        fetches.append(trim)
+        stop()
+
+    monkeypatch.setattr(downloader, 'fetch_info', fetch_info)
+    monkeypatch.setattr(downloader, '_ydl', stop)
+    prefetched = trim_info({'id': 'x', 'title': 't', '_type': 'video', 'chapters': [{}]})
+    downloader.download('https://a/1', False, 'Best', 'MP4', False, False, str(tmp_path),
+                        custom_args=custom_args, info=prefetched)
+    assert fetches == ([False] if refetched else [])
@@ -0,0 +1,108 @@
+"""JsonStore debouncing, atomic writes and schema migration."""
+
+import json
+import os
+import time
+
+import pytest
+
+from core import persistence
+from core.persistence import JsonStore, flush_all
+from utils.helpers import atomic_write_json
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Count the atomic writes JsonStore performs."""
+    calls = []
+
+    def counting_write(path, data):
+        calls.append(path)
+        atomic_write_json(path, data)
+
+    monkeypatch.setattr(persistence, 'atomic_write_json', counting_write)
+    return calls
+
+
+def test_changes_are_debounced_into_one_write(tmp_path, writes):
+    path = str(tmp_path / 'queue.json')
+    store = JsonStore(path, default=list, debounce=0.2)
+    for i in range(20):
+        store.set(list(range(i)))
+    assert writes == []
+    time.sleep(0.6)
+    assert writes == [path]
+    with open(path) as f:
+        assert json.load(f) == {'schema': 1, 'data': list(range(19))}
+
+
+def test_flush_writes_pending_changes_now(tmp_path, writes):
+    path = str(tmp_path / 'settings.json')
+    store = JsonStore(path, debounce=60)
+    store.set({'quality': '720p'})
+    flush_all()
+    assert writes == [path]
+    assert JsonStore(path).load() == {'quality': '720p'}
+    store.flush()
+    assert writes == [path]  # Nothing left to write
+
+
+def test_failed_write_keeps_previous_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'queue.json')
+    atomic_write_json(path, {'schema': 1, 'data': ['old']})
+
+    def unserializable(*args, **kwargs):
+        raise TypeError("not JSON serializable")
+
+    monkeypatch.setattr(json, 'dump', unserializable)
+    with pytest.raises(TypeError):
+        atomic_write_json(path, {'schema': 1, 'data': ['new']})
+    monkeypatch.undo()
+
+    with open(path) as f:
+        assert json.load(f)['data'] == ['old']
+    assert os.listdir(tmp_path) == ['queue.json']  # Temp file cleaned up
+
+
+def test_unversioned_file_is_migrated(tmp_path):
+    path = str(tmp_path / 'queue.json')
+    with open(path, 'w') as f:
+        json.dump(['https://example.com/a'], f)
+    store = JsonStore(path, schema_version=1, default=list,
+                      migrations={0: lambda data: [{'url': u} for u in data]})
+    assert store.load() == [{'url': 'https://example.com/a'}]
+
+
+def test_unreadable_file_falls_back_to_default(tmp_path):
+    path = str(tmp_path / 'settings.json')
+    with open(path, 'w') as f:
+        f.write('{truncated')
+    assert JsonStore(path, default=dict).load() == {}
+
+
+def test_delete_cancels_pending_write(tmp_path, writes):
+    path = str(tmp_path / 'queue.json')
+    store = JsonStore(path, default=list, debounce=0.2)
+    store.set(['x'])
+    store.delete()
+    time.sleep(0.5)
+    assert writes == []
+    assert not os.path.exists(path)
+    assert store.get() == []
+
+
+def test_newer_schema_is_set_aside_not_misread(tmp_path):
+    path = str(tmp_path / 'queue.json')
+    newer = {'schema': 3, 'data': {'jobs': [{'url': 'https://example.com/a'}]}}
+    atomic_write_json(path, newer)
+    store = JsonStore(path, schema_version=2, default=list)
+    assert store.load() == []
+    with open(path + '.schema3') as f:
+        assert json.load(f) == newer
+
+    store.set([{'url': 'https://example.com/b'}])
+    store.flush()
+    with open(path) as f:
+        assert json.load(f) == {'schema': 2, 'data': [{'url': 'https://example.com/b'}]}
+    with open(path + '.schema3') as f:
+        assert json.load(f) == newer
@@ -0,0 +1,141 @@
+"""Heap scheduler ordering, priorities and policies, and the download slot."""
+
+import threading
+
+from core.scheduler import (DEFAULT_SLACK, PRIORITY_STEP, SJF_MAX_PENALTY, DownloadSlot,
+                            JobScheduler)
+
+
+def _job(url, submitted, **fields):
+    return dict(url=url, settings={}, submitted=submitted, **fields)
+
+
+def _urls(queue):
+    return [job['url'] for job in queue.ordered()]
+
+
+def _drain(queue):
+    urls = []
+    while True:
+        job = queue.pop()
+        if job is None:
+            return urls
+        urls.append(job['url'])
+
+
+def test_fifo_pops_in_submission_order():
+    queue = JobScheduler()
+    queue.extend([_job('https://a/3', 3), _job('https://a/1', 1), _job('https://a/2', 2)])
+    assert len(queue) == 3
+    assert queue.peek()['url'] == 'https://a/1'
+    assert _drain(queue) == ['https://a/1', 'https://a/2', 'https://a/3']
+    assert queue.pop() is None
+
+
+def test_priority_jumps_ahead_but_ages():
+    queue = JobScheduler()
+    queue.push(_job('https://a/old', 0))
+    queue.push(_job('https://a/urgent', PRIORITY_STEP / 2, priority=1))
+    queue.push(_job('https://a/late-urgent', 3 * PRIORITY_STEP, priority=1))
+    # One level outranks up to PRIORITY_STEP seconds of waiting, no more
+    assert _urls(queue) == ['https://a/urgent', 'https://a/old', 'https://a/late-urgent']
+
+
+def test_set_priority_remove_and_bump():
+    queue = JobScheduler()
+    a = queue.push(_job('https://a/a', 1))
+    b = queue.push(_job('https://a/b', 2))
+    c = queue.push(_job('https://a/c', 3))
+    queue.set_priority(c['id'], 5)
+    assert _urls(queue) == ['https://a/c', 'https://a/a', 'https://a/b']
+    assert queue.remove(a['id']) is a
+    assert queue.remove(a['id']) is None
+    queue.bump(b['id'], 10)
+    assert _drain(queue) == ['https://a/b', 'https://a/c']
+
+
+def test_shortest_first_uses_estimates():
+    queue = JobScheduler('sjf')
+    long = queue.push(_job('https://a/long', 0, duration=3 * 3600))
+    queue.push(_job('https://a/short', 10, duration=60))
+    queue.push(_job('https://a/unknown', 5))
+    assert _urls(queue)[0] == 'https://a/short'
+    queue.update_estimate(long['id'], duration=30)
+    assert _urls(queue)[:2] == ['https://a/long', 'https://a/short']
+
+
+def test_round_robin_interleaves_sites():
+    queue = JobScheduler('round_robin')
+    queue.extend([_job(f'https://www.big.com/{i}', i) for i in range(3)]
+                 + [_job('https://small.org/0', 10)])
+    assert [u.split('/')[2] for u in _drain(queue)][:2] == ['www.big.com', 'small.org']
+
+
+def test_deadline_first():
+    queue = JobScheduler('deadline')
+    queue.push(_job('https://a/no-deadline', 0))
+    queue.push(_job('https://a/soon', 100, deadline=1000))
+    queue.push(_job('https://a/later', 50, deadline=DEFAULT_SLACK * 2))
+    assert _urls(queue) == ['https://a/soon', 'https://a/no-deadline', 'https://a/later']
+
+
+def test_set_policy_reorders_existing_jobs():
+    queue = JobScheduler()
+    queue.push(_job('https://a/long', 0, duration=7200))
+    queue.push(_job('https://a/short', 1, duration=10))
+    assert _urls(queue) == ['https://a/long', 'https://a/short']
+    queue.set_policy('sjf')
+    assert _urls(queue) == ['https://a/short', 'https://a/long']
+
+
+def test_many_removals_keep_heap_bounded():
+    queue = JobScheduler()
+    jobs = [queue.push(_job(f'https://a/{i}', i)) for i in range(1000)]
+    for job in jobs[:990]:
+        queue.remove(job['id'])
+    assert len(queue) == 10
+    assert len(queue._heap) <= 2 * len(queue) + 32 + 1
+    assert _drain(queue) == [f'https://a/{i}' for i in range(990, 1000)]
+
+
+def test_big_playlist_does_not_starve_a_single_clip():
+    queue = JobScheduler('round_robin')
+    queue.extend([_job(f'https://www.youtube.com/watch?v={i}', 0) for i in range(500)])
+    queue.push(_job('https://vimeo.com/1', 1))
+    assert 'vimeo.com' in [u.split('/')[2] for u in _drain(queue)[:2]]
+
+
+def test_huge_job_is_delayed_but_not_starved():
+    queue = JobScheduler('sjf')
+    queue.push(_job('https://a/huge', 0, duration=100 * 3600))
+    queue.push(_job('https://a/short-soon', 10, duration=60))
+    queue.push(_job('https://a/short-later', SJF_MAX_PENALTY + 60, duration=60))
+    assert _urls(queue) == ['https://a/short-soon', 'https://a/huge', 'https://a/short-later']
+
+
+def test_demote_moves_a_job_back():
+    queue = JobScheduler()
+    a = queue.push(_job('https://a/a', 1))
+    queue.push(_job('https://a/b', 2))
+    queue.bump(a['id'], -1)
+    assert _urls(queue) == ['https://a/b', 'https://a/a']
+    assert queue.get(a['id'])['priority'] == -1
+
+
+def test_only_one_concurrent_claim_gets_the_slot():
+    slot = DownloadSlot()
+    barrier = threading.Barrier(16)
+    wins = []
+
+    def claim():
+        barrier.wait()
+        wins.append(slot.claim())
+
+    threads = [threading.Thread(target=claim) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert wins.count(True) == 1 and slot.busy
+    slot.release()
+    assert not slot.busy and slot.claim()
@@ -0,0 +1,78 @@
+"""Incremental subscription checks against a fake source listing."""
+
+import pytest
+
+from core.subscriptions import RESCAN_OVERLAP, SubscriptionManager
+
+
+class _Source:
+    """Lists a mutable list of entry IDs the way Downloader.list_entries does."""
+
+    def __init__(self, ids, report_count=True):
+        self.ids = list(ids)
+        self.report_count = report_count
+        self.listed = []  # Entries yielded per call
+
+    def __call__(self, url, on_info, start=0):
+        info = {'title': 'Source'}
+        if self.report_count:
+            info['playlist_count'] = len(self.ids)
+        on_info(info)
+        self.listed.append(0)
+        for entry_id in self.ids[start:]:
+            self.listed[-1] += 1
+            yield {'id': entry_id, 'url': f'https://a/{entry_id}'}
+
+
+@pytest.fixture
+def queued():
+    return []
+
+
+def _manager(tmp_path, source, queued):
+    return SubscriptionManager(str(tmp_path / 'subs.json'), source,
+                               lambda sub, entries: queued.extend(e['id'] for e in entries))
+
+
+def test_oldest_first_source_resumes_where_it_stopped(tmp_path, queued):
+    source = _Source([f'v{i}' for i in range(100)], report_count=False)
+    manager = _manager(tmp_path, source, queued)
+    sub = manager.add('https://example.com/playlist?list=PL1', {})
+    assert manager.check(sub['id']) == 0  # Baseline
+    assert source.listed == [100]
+
+    source.ids += ['v100', 'v101']
+    assert manager.check(sub['id']) == 2
+    assert queued == ['v100', 'v101']
+    assert source.listed[-1] == RESCAN_OVERLAP + 2
+    assert manager.all()[0]['scanned'] == 102
+
+
+def test_unchanged_count_stops_after_the_first_entry(tmp_path, queued):
+    source = _Source([f'v{i}' for i in range(100)])
+    manager = _manager(tmp_path, source, queued)
+    sub = manager.add('https://example.com/playlist?list=PL1', {})
+    manager.check(sub['id'])
+    assert manager.check(sub['id']) == 0
+    assert source.listed[-1] == 1
+
+
+def test_shrunk_source_is_listed_again_from_the_top(tmp_path, queued):
+    source = _Source([f'v{i}' for i in range(100)], report_count=False)
+    manager = _manager(tmp_path, source, queued)
+    sub = manager.add('https://example.com/playlist?list=PL1', {})
+    manager.check(sub['id'])
+    source.ids = source.ids[:50] + ['new']
+    assert manager.check(sub['id']) == 1
+    assert queued == ['new']
+    assert manager.all()[0]['scanned'] == 51
+
+
+def test_newest_first_channel_stops_at_the_first_seen_entry(tmp_path, queued):
+    source = _Source([f'v{i}' for i in range(100, 0, -1)])
+    manager = _manager(tmp_path, source, queued)
+    sub = manager.add('https://www.youtube.com/@someone', {})
+    manager.check(sub['id'])
+    source.ids.insert(0, 'v101')
+    assert manager.check(sub['id']) == 1
+    assert queued == ['v101'] and source.listed[-1] == 2
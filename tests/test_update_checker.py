@@ -0,0 +1,78 @@
+"""Conditional update checks against a local stand-in for the GitHub API."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.http_client import HttpClient
+from core.update_checker import UpdateChecker
+
+ETAG = '"release-2-0-0"'
+
+
+class _FakeGitHub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    requests = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.send_header('ETag', ETAG)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'tag_name': 'v2.0.0',
+                           'html_url': 'https://github.com/o/r/releases/tag/v2.0.0'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def github():
+    _FakeGitHub.requests = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeGitHub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_check_is_cached_then_revalidated(tmp_path, github):
+    client = HttpClient()
+    cache_file = str(tmp_path / 'update_cache.json')
+    checker = UpdateChecker('1.1.1', cache_file, 'o', 'r', api_base=github, http_client=client)
+
+    update = checker.check()
+    assert update == {'version': '2.0.0', 'url': 'https://github.com/o/r/releases/tag/v2.0.0'}
+    assert 'If-None-Match' not in _FakeGitHub.requests[0]
+
+    # Within a day the cache answers without a request
+    assert checker.check() == update
+    assert len(_FakeGitHub.requests) == 1
+
+    # Forced checks send the ETag and accept a 304
+    assert checker.check(force=True) == update
+    assert _FakeGitHub.requests[1]['If-None-Match'] == ETAG
+    client.close()
+
+
+def test_up_to_date_and_unreachable(tmp_path, github):
+    client = HttpClient()
+    checker = UpdateChecker('2.0.0', str(tmp_path / 'a.json'), 'o', 'r', api_base=github,
+                            http_client=client)
+    assert checker.check() is None
+
+    offline = UpdateChecker('1.0.0', str(tmp_path / 'b.json'), 'o', 'r',
+                            api_base='http://127.0.0.1:9', http_client=client)
+    assert offline.check() is None
+    client.close()
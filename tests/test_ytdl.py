@@ -0,0 +1,63 @@
+"""YardYoutubeDL hooks and session pooling checks that don't need the network."""
+
+import pytest
+import yt_dlp
+
+from core import sessions
+from core.downloader import Downloader, video_format
+from core.ytdl import YardYoutubeDL
+
+
+def _entry(video_id, heights):
+    formats = [{'format_id': f'{h}p', 'url': f'http://127.0.0.1:9/{video_id}/{h}.mp4', 'ext': 'mp4',
+                'height': h, 'vcodec': 'avc1', 'acodec': 'mp4a', 'tbr': h} for h in heights]
+    return {'id': video_id, 'title': video_id, 'extractor': 'test', 'extractor_key': 'Test',
+            'webpage_url': f'http://127.0.0.1:9/{video_id}', 'formats': formats}
+
+
+def test_format_planner_picks_each_playlist_entry_separately():
+    planned = []
+
+    def plan(entry):
+        planned.append(entry['id'])
+        return video_format(480 if entry['id'] == 'long' else None)
+
+    playlist = {'_type': 'playlist', 'id': 'pl', 'title': 'pl', 'extractor': 'test',
+                'extractor_key': 'Test', 'webpage_url': 'http://127.0.0.1:9/pl',
+                'entries': [_entry('long', [1080, 720, 480]), _entry('short', [1080, 720, 480])]}
+    with YardYoutubeDL({'quiet': True, 'format': video_format(None)}, format_planner=plan) as ydl:
+        result = ydl.process_ie_result(playlist, download=False)
+    assert planned == ['long', 'short']
+    assert [entry['format_id'] for entry in result['entries']] == ['480p', '1080p']
+
+
+@pytest.fixture
+def fresh_check():
+    sessions.pooling_supported.cache_clear()
+    yield
+    sessions.pooling_supported.cache_clear()
+
+
+def test_pooling_is_supported_by_the_installed_yt_dlp(fresh_check):
+    assert sessions.pooling_supported()
+    downloader = Downloader(None, None, lambda msg: None)
+    with downloader._ydl({'quiet': True}) as ydl:
+        assert ydl.session is not None
+    downloader.close()
+
+
+def test_renamed_internals_fall_back_to_unpooled(fresh_check, monkeypatch):
+    class RenamedInternals(yt_dlp.YoutubeDL):
+        @property
+        def cookiejar(self):
+            return super().cookiejar
+
+    monkeypatch.setattr(sessions.yt_dlp, 'YoutubeDL', RenamedInternals)
+    assert not sessions.pooling_supported()
+    logs = []
+    downloader = Downloader(None, None, logs.append)
+    assert downloader.sessions is None and 'pooling disabled' in logs[0]
+    monkeypatch.undo()
+    with downloader._ydl({'quiet': True}) as ydl:
+        assert ydl.session is None
+    downloader.close()